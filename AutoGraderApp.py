@@ -17,12 +17,12 @@ else:
 import os
 sys.path.append(os.path.dirname(os.path.realpath(__file__)) + "/src")
 
-from AutoGrader import AutoGrader
+from AutoGrader import AutoGrader, ArchiveExtractor
 import SpelmanLogo
 import json
 
-AUTO_GRADER_APP_VERSION = "0.98r"
-#requires AutoGrader V 0.94 or later
+AUTO_GRADER_APP_VERSION = "0.99g"
+#requires AutoGrader V 1.00 or later
 
 
 """
@@ -49,6 +49,22 @@ AUTO_GRADER_APP_VERSION = "0.98r"
 0.98p - javascript grade entry added
 0.98q - working directory set to directory of source file
 0.98r - added 'import tkinter.messagebox as messagebox', which seems to be required beginning with Python 3.6
+0.98s - number of concurrent grading workers added
+0.98t - persistent build cache (cache_directory, max_cache_size_mb options)
+0.98u - unchanged submissions are not re-run (cached results); report can be rendered from cached results only
+0.98v - source directory indexed in a single walk; directories matching 'skip_dirs' are not searched
+0.98w - number of concurrent C++ compiler jobs added
+0.98x - optional precompiled headers for C++ submissions
+0.98y - compile time and memory limits for C++ submissions
+0.98z - optional syntax check of Python submissions before they are run
+0.99 - optional fork server for Python submissions (warm interpreter)
+0.99a - number of concurrent test runs per submission added
+0.99b - CPU time, memory, file size and process limits of each run (0: no limit)
+0.99c - zip, tar and gzip archives extracted in-process (no unzip command), concurrently and again when they change
+0.99d - optional lean report (shared highlighter asset files) and gzip compressed report
+0.99e - source listings highlighted by the grader (no highlighter script in the report) added
+0.99f - optional lazy report for large classes (sections rendered on demand, navigation list)
+0.99g - optional report per student with an index page; regrading of selected students
 
 To Do: - 
 #Need to provide an option for manual entry instead of test data (which won't work for a gussing game, for example)
@@ -66,6 +82,13 @@ class Application:
     LANGUAGE_SELECTED       = 1<<2
     DEFAULT_MAX_RUN_TIME    = 3     #allow scripts to run for this long by default
     DEFAULT_MAX_OUTPUT_LINES = 100  #max # of output lines by compiler and executing code included in the output html file
+    DEFAULT_NUM_WORKERS = 1         #number of submissions graded concurrently
+    DEFAULT_TEST_JOBS = 1           #number of test data files of a submission run concurrently
+    DEFAULT_COMPILE_JOBS = 0        #number of C++ submissions compiled concurrently (0: one per CPU)
+    DEFAULT_MAX_COMPILE_TIME = 60   #allow the compiler to run for this long (wall-clock and CPU seconds)
+    DEFAULT_MAX_COMPILE_MEMORY_MB = 2048    #memory limit of the compiler
+    DEFAULT_CACHE_DIRECTORY = os.path.join(os.path.expanduser('~'), '.autograder_cache')   #persistent build cache
+    DEFAULT_MAX_CACHE_SIZE_MB = 512 #size limit of the cache
     OPTIONS_FILE = 'src/ag_options.json'
 
     #color constants
@@ -101,9 +124,59 @@ class Application:
         except: #if the int() fails (invalid integer), force to DEFAULT_MAX_OUTPUT_LINES
             self.MaxOutputLinesSpinBox.delete(0, END)
             self.MaxOutputLinesSpinBox.insert(0, self.ag_options['max_output_lines'])
+
+        try:
+            self.ag_options['num_workers'] = max(1, int(self.NumWorkersSpinBox.get()))
+        except: #if the int() fails (invalid integer), restore the previous value
+            self.NumWorkersSpinBox.delete(0, END)
+            self.NumWorkersSpinBox.insert(0, str(self.ag_options['num_workers']))
+
+        try:
+            self.ag_options['test_jobs'] = max(1, int(self.TestJobsSpinBox.get()))
+        except: #if the int() fails (invalid integer), restore the previous value
+            self.TestJobsSpinBox.delete(0, END)
+            self.TestJobsSpinBox.insert(0, str(self.ag_options['test_jobs']))
+
+        #run limits (0: no limit)
+        for key, spinBox in self.RunLimitSpinBoxes:
+            try:
+                self.ag_options[key] = max(0, int(spinBox.get()))
+            except: #if the int() fails (invalid integer), restore the previous value
+                spinBox.delete(0, END)
+                spinBox.insert(0, str(self.ag_options[key]))
        
+        try:
+            self.ag_options['cpp_compile_jobs'] = max(0, int(self.CompileJobsSpinBox.get()))
+        except: #if the int() fails (invalid integer), restore the previous value
+            self.CompileJobsSpinBox.delete(0, END)
+            self.CompileJobsSpinBox.insert(0, str(self.ag_options['cpp_compile_jobs']))
+
+        self.ag_options['cpp_precompiled_headers'] = self.cppPrecompiledHeaders.get()
+        self.ag_options['py_syntax_check'] = self.pySyntaxCheck.get()
+        self.ag_options['py_fork_server'] = self.pyForkServer.get()
+
+        try:
+            self.ag_options['cpp_max_compile_time'] = max(0, int(self.MaxCompileTimeSpinBox.get()))
+        except: #if the int() fails (invalid integer), restore the previous value
+            self.MaxCompileTimeSpinBox.delete(0, END)
+            self.MaxCompileTimeSpinBox.insert(0, str(self.ag_options['cpp_max_compile_time']))
+
+        try:
+            self.ag_options['cpp_max_compile_memory_mb'] = max(0, int(self.MaxCompileMemorySpinBox.get()))
+        except: #if the int() fails (invalid integer), restore the previous value
+            self.MaxCompileMemorySpinBox.delete(0, END)
+            self.MaxCompileMemorySpinBox.insert(0, str(self.ag_options['cpp_max_compile_memory_mb']))
+
         TestDataFiles = [] if self.NoInputCheckBox.get() == 1 else (self.TestDataFiles)
         self.ag_options['include_source_in_output'] = self.IncludeSource.get()
+        self.ag_options['lean_report'] = self.LeanReport.get()
+        self.ag_options['compress_report'] = self.CompressReport.get()
+        self.ag_options['pre_highlight'] = self.PreHighlight.get()
+        self.ag_options['lazy_report'] = self.LazyReport.get()
+        self.ag_options['shard_report'] = self.ShardReport.get()
+        self.ag_options['reuse_cached_results'] = self.ReuseResults.get()
+        #only the shards of a report per student can be regraded selectively
+        Regrade = [x.strip() for x in self.EntryRegrade.get().split(',') if x.strip() != ''] if self.ag_options['shard_report'] else []
 
         self.ag_options['py_top_level_module'] = self.pyTopLevelModule.get().strip()
         if self.LangChoice == 'Python':
@@ -115,12 +188,16 @@ class Application:
         self.ag_options['top_level_directory'] = self.EntrySourceDirectory.get().strip()
 
         #check to see if the output file exists.  If it does, ask if it should be overwritten
+        #(a compressed report is written to the output file name + '.gz')
         OutputFile = self.EntryOutputFile.get().strip()
-        if os.path.isfile(OutputFile):
+        ReportFile = OutputFile
+        if self.ag_options['compress_report'] and not ReportFile.endswith('.gz'):
+            ReportFile += '.gz'
+        if os.path.isfile(ReportFile):
             if self.python2:
-                choice = tkMessageBox.askyesno("Output File Exists", "Overwrite '" + OutputFile + "'?")
+                choice = tkMessageBox.askyesno("Output File Exists", "Overwrite '" + ReportFile + "'?")
             else:
-                choice = messagebox.askyesno("Output File Exists", "Overwrite '" + OutputFile + "'?")
+                choice = messagebox.askyesno("Output File Exists", "Overwrite '" + ReportFile + "'?")
             if choice == False:     #do not overwrite; simply exit
                 return
 
@@ -133,24 +210,24 @@ class Application:
         elif self.LangChoice == 'Python':
             AutoUnzip = self.ag_options['py_auto_unzip']
             
-        zipFiles = self.autoGrader._findFilesInDir(self.ag_options['top_level_directory'], ".zip")
-        for zipFile in zipFiles:
-            #is there a directory corresponding to the .zip filename?
-            dirname = os.path.splitext(zipFile)[0]
-            if os.path.isdir(dirname) == False:     #no directory exists with the name of the zip file (assume it has not been unzipped)
+        index = self.autoGrader.indexSubmissions(self.ag_options['top_level_directory'], self.ag_options['cache_directory'], self.ag_options['skip_dirs'])
+        extractor = self.autoGrader.archiveExtractor()
+        archives = []
+        for archive in index.topLevelFiles(ArchiveExtractor.EXTENSIONS):
+            #has the archive been extracted since it last changed?
+            if not extractor.isCurrent(archive):
                 if AutoUnzip == True:
                     choice = True
                 else:
                     if self.python2:
-                        choice = tkMessageBox.askyesno("zip File Found in Source Directory", "Would you like to unzip the file '" + zipFile + "'?")
+                        choice = tkMessageBox.askyesno("Archive Found in Source Directory", "Would you like to extract the file '" + archive + "'?")
                     else:
-                        choice = messagegox.askyesno("zip File Found in Source Directory", "Would you like to unzip the file '" + zipFile + "'?")
+                        choice = messagebox.askyesno("Archive Found in Source Directory", "Would you like to extract the file '" + archive + "'?")
                         
                 if choice == True:
-                    #cmd = 'mkdir "' + dirname + '"'
-                    cmd = 'unzip "' + zipFile + '" -d "' + dirname + '"'
-                    print (cmd)
-                    os.system(cmd)
+                    archives.append(archive)
+        #extract the archives concurrently
+        self.autoGrader.extractArchives(archives, self.ag_options['num_workers'], extractor)
 
 
         #interpreter selection
@@ -174,6 +251,25 @@ class Application:
         print ("maxRunTime: " + str(self.ag_options['max_run_time']))
         print ("interpreter:" + interpreter)
         print ("maxOutputLines" +str(self.ag_options['max_output_lines']))
+        print ("numWorkers: " + str(self.ag_options['num_workers']))
+        print ("testJobs: " + str(self.ag_options['test_jobs']))
+        print ("run limits: CPU time " + str(self.ag_options['run_max_cpu_time']) + ", memory (MB) " + str(self.ag_options['run_max_memory_mb']) +
+            ", file size (MB) " + str(self.ag_options['run_max_file_size_mb']) + ", processes " + str(self.ag_options['run_max_processes']))
+        print ("compileJobs: " + str(self.ag_options['cpp_compile_jobs']))
+        print ("precompiledHeaders: " + str(self.ag_options['cpp_precompiled_headers']))
+        print ("maxCompileTime: " + str(self.ag_options['cpp_max_compile_time']))
+        print ("maxCompileMemory (MB): " + str(self.ag_options['cpp_max_compile_memory_mb']))
+        print ("syntaxCheck: " + str(self.ag_options['py_syntax_check']))
+        print ("forkServer: " + str(self.ag_options['py_fork_server']))
+        print ("cacheDirectory: " + self.ag_options['cache_directory'])
+        print ("renderOnly: " + str(self.RenderOnly.get()))
+        print ("reuseResults: " + str(self.ag_options['reuse_cached_results']))
+        print ("leanReport: " + str(self.ag_options['lean_report']))
+        print ("compressReport: " + str(self.ag_options['compress_report']))
+        print ("preHighlight: " + str(self.ag_options['pre_highlight']))
+        print ("lazyReport: " + str(self.ag_options['lazy_report']))
+        print ("shardReport: " + str(self.ag_options['shard_report']))
+        print ("regrade: " + str(Regrade))
 
         #save user options
         self.save_user_options(self.OPTIONS_FILE)
@@ -181,7 +277,20 @@ class Application:
         self.autoGrader.processFiles(testDataFiles=TestDataFiles, sourceDirectory=self.ag_options['top_level_directory'],
             sourceFilename=sourceFilename, outputFile=OutputFile, language=self.LangChoice,
             IncludeSourceInOutput=bool(self.ag_options['include_source_in_output']), maxRunTime=self.ag_options['max_run_time'],
-            interpreter=interpreter, maxOutputLines=self.ag_options['max_output_lines'], AutoGraderVersion=AUTO_GRADER_APP_VERSION)
+            interpreter=interpreter, maxOutputLines=self.ag_options['max_output_lines'], AutoGraderVersion=AUTO_GRADER_APP_VERSION,
+            numWorkers=self.ag_options['num_workers'], cacheDirectory=self.ag_options['cache_directory'],
+            maxCacheSize=self.ag_options['max_cache_size_mb']*1024*1024, renderOnly=bool(self.RenderOnly.get()),
+            skipDirs=self.ag_options['skip_dirs'], compileJobs=self.ag_options['cpp_compile_jobs'],
+            precompiledHeaders=bool(self.ag_options['cpp_precompiled_headers']),
+            maxCompileTime=self.ag_options['cpp_max_compile_time'], maxCompileCpuTime=self.ag_options['cpp_max_compile_time'],
+            maxCompileMemory=self.ag_options['cpp_max_compile_memory_mb']*1024*1024,
+            syntaxCheck=bool(self.ag_options['py_syntax_check']), forkServer=bool(self.ag_options['py_fork_server']),
+            testJobs=self.ag_options['test_jobs'], maxCpuTime=self.ag_options['run_max_cpu_time'],
+            maxMemory=self.ag_options['run_max_memory_mb']*1024*1024, maxFileSize=self.ag_options['run_max_file_size_mb']*1024*1024,
+            maxProcesses=self.ag_options['run_max_processes'], leanReport=bool(self.ag_options['lean_report']),
+            compressReport=bool(self.ag_options['compress_report']), preHighlight=bool(self.ag_options['pre_highlight']),
+            lazyReport=bool(self.ag_options['lazy_report']), shardReport=bool(self.ag_options['shard_report']), regrade=Regrade,
+            reuseResults=bool(self.ag_options['reuse_cached_results']))
             
 
     def EnableStartButton(self):
@@ -389,6 +498,41 @@ class Application:
         self.IncludeSource = IntVar()
         Checkbutton(self.MainTab, text="Include source in output", variable=self.IncludeSource, justify=LEFT).grid(row=6, column=6, columnspan=1, padx=0, pady=0, ipady=0, sticky=W)
         self.IncludeSource.set(self.ag_options['include_source_in_output'])
+
+        #render only is not saved with the user options; it applies to the next run only
+        self.RenderOnly = IntVar()
+        Checkbutton(self.MainTab, text="Render from cached results only", variable=self.RenderOnly, justify=LEFT).grid(row=7, column=6, columnspan=1, padx=0, pady=0, ipady=0, sticky=W)
+        self.RenderOnly.set(0)
+
+        self.LeanReport = IntVar()
+        Checkbutton(self.MainTab, text="Shared highlighter files (lean report)", variable=self.LeanReport, justify=LEFT).grid(row=8, column=6, columnspan=1, padx=0, pady=0, ipady=0, sticky=W)
+        self.LeanReport.set(self.ag_options['lean_report'])
+
+        self.CompressReport = IntVar()
+        Checkbutton(self.MainTab, text="Compress report (.gz)", variable=self.CompressReport, justify=LEFT).grid(row=9, column=6, columnspan=1, padx=0, pady=0, ipady=0, sticky=W)
+        self.CompressReport.set(self.ag_options['compress_report'])
+
+        self.PreHighlight = IntVar()
+        Checkbutton(self.MainTab, text="Highlight source when grading", variable=self.PreHighlight, justify=LEFT).grid(row=10, column=6, columnspan=1, padx=0, pady=0, ipady=0, sticky=W)
+        self.PreHighlight.set(self.ag_options['pre_highlight'])
+
+        self.LazyReport = IntVar()
+        Checkbutton(self.MainTab, text="Render students on demand (large classes)", variable=self.LazyReport, justify=LEFT).grid(row=11, column=6, columnspan=1, padx=0, pady=0, ipady=0, sticky=W)
+        self.LazyReport.set(self.ag_options['lazy_report'])
+
+        self.ShardReport = IntVar()
+        Checkbutton(self.MainTab, text="One report per student + index page", variable=self.ShardReport, justify=LEFT).grid(row=12, column=6, columnspan=1, padx=0, pady=0, ipady=0, sticky=W)
+        self.ShardReport.set(self.ag_options['shard_report'])
+
+        #the students to regrade are not saved with the user options; they apply to the next run only
+        Label(self.MainTab, text="Regrade only, with one report per student (names, comma separated):").grid(row=13, column=6, columnspan=2, padx=0, pady=0, sticky=W)
+        self.EntryRegrade = Entry(self.MainTab, width=40)
+        self.EntryRegrade.grid(row=14, column=6, ipady=0, padx=5, columnspan=5, sticky=W)
+
+        #off by default: a recalled result is only correct if nothing the program reads outside the submission changed
+        self.ReuseResults = IntVar()
+        Checkbutton(self.MainTab, text="Reuse cached run results", variable=self.ReuseResults, justify=LEFT).grid(row=15, column=6, columnspan=1, padx=0, pady=0, ipady=0, sticky=W)
+        self.ReuseResults.set(self.ag_options['reuse_cached_results'])
         
         self.NoInputCheckBox = IntVar()
         Checkbutton(self.MainTab, text="No Test Data", variable=self.NoInputCheckBox, command=self.NoInputCheckBoxClick).grid(row=1, column=2)
@@ -408,15 +552,38 @@ class Application:
         self.MaxOutputLinesSpinBox.delete(0, END)
         self.MaxOutputLinesSpinBox.insert(0, str(self.ag_options['max_output_lines']))
 
+        Label(self.MainTab, text="Concurrent workers:", font=("Helvetica", 14), justify=LEFT).grid(row=11, column=2, columnspan=2, padx=5, sticky=E)
+        self.NumWorkersSpinBox = Spinbox(self.MainTab, from_=1, to=256, width=10)
+        self.NumWorkersSpinBox.grid(row=11, column=4, columnspan=2)
+        self.NumWorkersSpinBox.delete(0, END)
+        self.NumWorkersSpinBox.insert(0, str(self.ag_options['num_workers']))
+
+        Label(self.MainTab, text="Concurrent tests\nper submission:", font=("Helvetica", 14), justify=LEFT).grid(row=12, column=2, columnspan=2, padx=5, sticky=E)
+        self.TestJobsSpinBox = Spinbox(self.MainTab, from_=1, to=256, width=10)
+        self.TestJobsSpinBox.grid(row=12, column=4, columnspan=2)
+        self.TestJobsSpinBox.delete(0, END)
+        self.TestJobsSpinBox.insert(0, str(self.ag_options['test_jobs']))
+
+        #limits of each run (0: no limit)
+        self.RunLimitSpinBoxes = []
+        for row, key, text in [(13, 'run_max_cpu_time', "Max CPU Time (secs)"), (14, 'run_max_memory_mb', "Max Memory (MB)"),
+                               (15, 'run_max_file_size_mb', "Max File Size (MB)"), (16, 'run_max_processes', "Max Processes")]:
+            Label(self.MainTab, text=text, font=("Helvetica", 14)).grid(row=row, column=2, columnspan=2, padx=5, sticky=E)
+            spinBox = Spinbox(self.MainTab, from_=0, to=65536, width=10)
+            spinBox.grid(row=row, column=4, columnspan=2)
+            spinBox.delete(0, END)
+            spinBox.insert(0, str(self.ag_options[key]))
+            self.RunLimitSpinBoxes.append((key, spinBox))
+
         #Create the Python options notebook tab
         self.PythonOptionsTab = Frame(self.nb, bg=self.PYTHON_WND_COLOR)
         self.nb.add(self.PythonOptionsTab, text='Options')
 
         self.pyAutoUnzip = IntVar()
-        Checkbutton(self.PythonOptionsTab, text="Automatically uncompress Zip files", variable=self.pyAutoUnzip, command=lambda : 0, bg=self.PYTHON_WND_COLOR, fg=self.PYTHON_TEXT_COLOR, justify=LEFT).grid(row=5, column=1, columnspan=1, padx=5, sticky=W)
+        Checkbutton(self.PythonOptionsTab, text="Automatically uncompress archives", variable=self.pyAutoUnzip, command=lambda : 0, bg=self.PYTHON_WND_COLOR, fg=self.PYTHON_TEXT_COLOR, justify=LEFT).grid(row=5, column=1, columnspan=1, padx=5, sticky=W)
         self.pyAutoUnzip.set(self.ag_options['py_auto_unzip'])
         
-        Label(self.PythonOptionsTab, text='Files with a .zip extension will be automatically uncompressed to a directory with the same name as the zip file.\n', font=("Helvetica", 12, "italic"), bg=self.PYTHON_WND_COLOR, fg=self.PYTHON_TEXT_COLOR, justify=LEFT).grid(row=6, column=1, columnspan=3, padx=5, sticky=W)
+        Label(self.PythonOptionsTab, text='Zip, tar and gzip files will be automatically uncompressed to a directory with the same name as the archive file.\n', font=("Helvetica", 12, "italic"), bg=self.PYTHON_WND_COLOR, fg=self.PYTHON_TEXT_COLOR, justify=LEFT).grid(row=6, column=1, columnspan=3, padx=5, sticky=W)
         
         Label(self.PythonOptionsTab, text="When a student's submission consists of multiple .py files, you must specify the top level module.\nNote: Students must be told what to name their top-level module.  Executes (default interpreter config)\nwith 'python <TopModule.py>'\n", font=("Helvetica", 12, "italic"), bg=self.PYTHON_WND_COLOR, fg=self.PYTHON_TEXT_COLOR, justify=LEFT).grid(row=14, column=1, columnspan=3, padx=5, sticky=W)
 
@@ -434,15 +601,25 @@ class Application:
         self.EntryPythonInterpreter.grid(row=16, column=2, ipady=0, ipadx=0, padx=5, columnspan=2, sticky=W)
         Label(self.PythonOptionsTab, text='Specify the python interpreter and command line options here. Example: "/usr/bin/python -v -3"\n', font=("Helvetica", 12, "italic"), bg=self.PYTHON_WND_COLOR, fg=self.PYTHON_TEXT_COLOR, justify=LEFT).grid(row=17, column=1, columnspan=3, padx=5, sticky=W)
 
+        self.pySyntaxCheck = IntVar()
+        Checkbutton(self.PythonOptionsTab, text="Check syntax before running", variable=self.pySyntaxCheck, command=lambda : 0, bg=self.PYTHON_WND_COLOR, fg=self.PYTHON_TEXT_COLOR, justify=LEFT).grid(row=18, column=1, columnspan=1, padx=5, sticky=W)
+        self.pySyntaxCheck.set(self.ag_options['py_syntax_check'])
+        Label(self.PythonOptionsTab, text='Submissions whose top-level module does not compile are reported once; their test data is not run.\n', font=("Helvetica", 12, "italic"), bg=self.PYTHON_WND_COLOR, fg=self.PYTHON_TEXT_COLOR, justify=LEFT).grid(row=19, column=1, columnspan=3, padx=5, sticky=W)
+
+        self.pyForkServer = IntVar()
+        Checkbutton(self.PythonOptionsTab, text="Run programs from a warm interpreter (fork server)", variable=self.pyForkServer, command=lambda : 0, bg=self.PYTHON_WND_COLOR, fg=self.PYTHON_TEXT_COLOR, justify=LEFT).grid(row=20, column=1, columnspan=2, padx=5, sticky=W)
+        self.pyForkServer.set(self.ag_options['py_fork_server'])
+        Label(self.PythonOptionsTab, text='Each run is forked from an interpreter that has already imported the common standard modules (Python 3 only).\n', font=("Helvetica", 12, "italic"), bg=self.PYTHON_WND_COLOR, fg=self.PYTHON_TEXT_COLOR, justify=LEFT).grid(row=21, column=1, columnspan=3, padx=5, sticky=W)
+
         #Create the C++ options notebook tab
         self.CppOptionsTab = Frame(self.nb, bg=self.CPP_WND_COLOR)
         self.nb.add(self.CppOptionsTab, text='Options')
 
         self.cppAutoUnzip = IntVar()
-        Checkbutton(self.CppOptionsTab, text="Automatically uncompress Zip files", variable=self.cppAutoUnzip, command=lambda : 0, bg=self.CPP_WND_COLOR, fg=self.CPP_TEXT_COLOR, justify=LEFT).grid(row=5, column=1, columnspan=1, padx=5, sticky=W)
+        Checkbutton(self.CppOptionsTab, text="Automatically uncompress archives", variable=self.cppAutoUnzip, command=lambda : 0, bg=self.CPP_WND_COLOR, fg=self.CPP_TEXT_COLOR, justify=LEFT).grid(row=5, column=1, columnspan=1, padx=5, sticky=W)
         self.cppAutoUnzip.set(self.ag_options['cpp_auto_unzip'] )
         
-        Label(self.CppOptionsTab, text='Files with a .zip extension will be automatically uncompressed to a directory with the same name as the zip file.\n', font=("Helvetica", 12, "italic"), bg=self.CPP_WND_COLOR, fg=self.CPP_TEXT_COLOR, justify=LEFT).grid(row=6, column=1, columnspan=3, padx=5, sticky=W)
+        Label(self.CppOptionsTab, text='Zip, tar and gzip files will be automatically uncompressed to a directory with the same name as the archive file.\n', font=("Helvetica", 12, "italic"), bg=self.CPP_WND_COLOR, fg=self.CPP_TEXT_COLOR, justify=LEFT).grid(row=6, column=1, columnspan=3, padx=5, sticky=W)
 
         Label(self.CppOptionsTab, text='C++ command-line compiler:', bg=self.CPP_WND_COLOR).grid(row=16, column=1, columnspan=1, padx=5, sticky=W)
         self.cppInterpreter = StringVar()
@@ -450,6 +627,31 @@ class Application:
         self.cppInterpreter.set(self.ag_options['cpp_compiler'])
         self.EntryCppInterpreter.grid(row=16, column=2, ipady=0, ipadx=0, padx=5, columnspan=2, sticky=W)
         Label(self.CppOptionsTab, text='Specify the C++ compiler with optioal command line options here. Example: "/usr/bin/g++ -lm"\n', font=("Helvetica", 12, "italic"), bg=self.CPP_WND_COLOR, fg=self.CPP_TEXT_COLOR, justify=LEFT).grid(row=17, column=1, columnspan=3, padx=5, sticky=W)
+
+        Label(self.CppOptionsTab, text='Concurrent compiler jobs:', bg=self.CPP_WND_COLOR).grid(row=18, column=1, columnspan=1, padx=5, sticky=W)
+        self.CompileJobsSpinBox = Spinbox(self.CppOptionsTab, from_=0, to=256, width=10)
+        self.CompileJobsSpinBox.grid(row=18, column=2, padx=5, sticky=W)
+        self.CompileJobsSpinBox.delete(0, END)
+        self.CompileJobsSpinBox.insert(0, str(self.ag_options['cpp_compile_jobs']))
+        Label(self.CppOptionsTab, text='Submissions are compiled ahead of the test runs, this many at a time (0: one per CPU).\n', font=("Helvetica", 12, "italic"), bg=self.CPP_WND_COLOR, fg=self.CPP_TEXT_COLOR, justify=LEFT).grid(row=19, column=1, columnspan=3, padx=5, sticky=W)
+
+        self.cppPrecompiledHeaders = IntVar()
+        Checkbutton(self.CppOptionsTab, text="Use precompiled headers", variable=self.cppPrecompiledHeaders, command=lambda : 0, bg=self.CPP_WND_COLOR, fg=self.CPP_TEXT_COLOR, justify=LEFT).grid(row=20, column=1, columnspan=1, padx=5, sticky=W)
+        self.cppPrecompiledHeaders.set(self.ag_options['cpp_precompiled_headers'])
+        Label(self.CppOptionsTab, text='The standard headers shared by several submissions are compiled once; the time saved is shown in the report.\n', font=("Helvetica", 12, "italic"), bg=self.CPP_WND_COLOR, fg=self.CPP_TEXT_COLOR, justify=LEFT).grid(row=21, column=1, columnspan=3, padx=5, sticky=W)
+
+        Label(self.CppOptionsTab, text='Maximum compile time (sec.):', bg=self.CPP_WND_COLOR).grid(row=22, column=1, columnspan=1, padx=5, sticky=W)
+        self.MaxCompileTimeSpinBox = Spinbox(self.CppOptionsTab, from_=0, to=3600, width=10)
+        self.MaxCompileTimeSpinBox.grid(row=22, column=2, padx=5, sticky=W)
+        self.MaxCompileTimeSpinBox.delete(0, END)
+        self.MaxCompileTimeSpinBox.insert(0, str(self.ag_options['cpp_max_compile_time']))
+
+        Label(self.CppOptionsTab, text='Maximum compiler memory (MB):', bg=self.CPP_WND_COLOR).grid(row=23, column=1, columnspan=1, padx=5, sticky=W)
+        self.MaxCompileMemorySpinBox = Spinbox(self.CppOptionsTab, from_=0, to=65536, width=10)
+        self.MaxCompileMemorySpinBox.grid(row=23, column=2, padx=5, sticky=W)
+        self.MaxCompileMemorySpinBox.delete(0, END)
+        self.MaxCompileMemorySpinBox.insert(0, str(self.ag_options['cpp_max_compile_memory_mb']))
+        Label(self.CppOptionsTab, text='A compiler exceeding these limits is stopped and the submission is reported as not compiled (0: no limit).\n', font=("Helvetica", 12, "italic"), bg=self.CPP_WND_COLOR, fg=self.CPP_TEXT_COLOR, justify=LEFT).grid(row=24, column=1, columnspan=3, padx=5, sticky=W)
         
 
         #Create the 'no language selected' options notebook tab
@@ -497,7 +699,26 @@ class Application:
             'version': AUTO_GRADER_APP_VERSION,
             'max_run_time': self.DEFAULT_MAX_RUN_TIME,
             'max_output_lines': self.DEFAULT_MAX_OUTPUT_LINES,
+            'num_workers': self.DEFAULT_NUM_WORKERS,
+            'test_jobs': self.DEFAULT_TEST_JOBS,
+            'run_max_cpu_time': 0,
+            'run_max_memory_mb': 0,
+            'run_max_file_size_mb': 0,
+            'run_max_processes': 0,
+            'cpp_compile_jobs': self.DEFAULT_COMPILE_JOBS,
+            'cpp_precompiled_headers': 0,
+            'cpp_max_compile_time': self.DEFAULT_MAX_COMPILE_TIME,
+            'cpp_max_compile_memory_mb': self.DEFAULT_MAX_COMPILE_MEMORY_MB,
+            'cache_directory': self.DEFAULT_CACHE_DIRECTORY,
+            'max_cache_size_mb': self.DEFAULT_MAX_CACHE_SIZE_MB,
+            'reuse_cached_results': 0,
+            'skip_dirs': list(AutoGrader.Const.DEFAULT_SKIP_DIRS),
             'include_source_in_output': 1,
+            'lean_report': 0,
+            'compress_report': 0,
+            'pre_highlight': 0,
+            'lazy_report': 0,
+            'shard_report': 0,
             'top_level_directory': '',
             'test_data_directory': '',
             'cpp_auto_unzip': 1,
@@ -506,6 +727,8 @@ class Application:
             'py_auto_unzip': 1,
             'py_top_level_module': 'main.py',
             'py_interpreter': 'python',
+            'py_syntax_check': 1,
+            'py_fork_server': 0,
         }
             
         #load options from file which may overwrite the defaults
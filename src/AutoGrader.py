@@ -4,11 +4,55 @@ import time
 import sys
 #import thread
 #from threading import Thread
+import threading
 import subprocess
 import signal
+import tempfile
+import shutil
+import stat
+import hashlib
+import json
+import io
+import tokenize
+import keyword
+import re
+import fnmatch
+import multiprocessing
+import socket
+import array
+import shlex
+import zipfile
+import tarfile
+import gzip
+import bz2
 from syntaxhighlighter_3_0_83 import *
 
-AUTO_GRADER_VERSION = "0.94"
+try:
+    import concurrent.futures
+except ImportError:     #Python2 without the 'futures' backport: batches of files are always analyzed serially
+    concurrent = None
+
+try:
+    import queue
+except ImportError:     #Python2
+    import Queue as queue
+
+try:
+    import builtins
+except ImportError:     #Python2
+    import __builtin__ as builtins
+
+try:
+    import lzma
+except ImportError:     #Python2: no .xz archives
+    lzma = None
+
+try:
+    import resource
+except ImportError:     #Windows: no resource usage or limits
+    resource = None
+
+AUTO_GRADER_VERSION = "1.19"
 
 """
 0.8 - Initial separation from AutoGrader App
@@ -23,9 +67,1614 @@ AUTO_GRADER_VERSION = "0.94"
 0.92 - Python3 support added
 0.93 - monolithic html output files now contain all JS and CSS content
 0.94 - javascript grade entry added
+0.95 - submissions may be graded concurrently by a pool of workers (numWorkers)
+0.96 - blocking wait with a deadline replaces the busy-poll in _shellExec(); rate-limited progress reports (progressHook)
+0.97 - each run gets its own process group, which is killed as a whole on timeout (replaces pkill); unique executable per C++ build
+0.98 - program and compiler output captured from pipes into a bounded in-memory buffer (replaces the .AB temp file and head);
+       programs exceeding the output limit are terminated
+0.99 - report written through a single buffered ReportWriter; submissions are collected in in-memory ReportFragments
+1.00 - persistent content-addressed cache of compiled C++ executables and compiler output (FileCache)
+1.01 - persistent cache of run results: only changed submission x test data pairs are executed; render only mode
+1.02 - Python analytics computed in a single pass over the tokenizer output; batch analytics in a process pool
+1.03 - C/C++ analytics computed by a lexer: block comments, literals and preprocessor lines handled; code lines and functions reported
+1.04 - submissions discovered by a single walk of the source directory (SubmissionIndex), persisted with directory mtimes;
+       __pycache__, .git and *_output directories skipped; C++ projects with both .cpp and .cc files are no longer listed twice
+1.05 - submissions stream through a discover -> analyze -> build -> run -> render Pipeline; the report is written while later
+       submissions are still running
+1.06 - C++ submissions are compiled ahead of the runs by their own pool of compileJobs concurrent compiler processes
+1.07 - multi-file C++ projects are built per translation unit (compiled concurrently, then linked); object files are cached
+       by the contents of the unit and of the local headers it includes (tracked through compiler depfiles)
+1.08 - optional precompiled headers for the standard headers that submissions include (precompiledHeaders)
+1.09 - compilers run under wall-clock, CPU time and memory limits (maxCompileTime, maxCompileCpuTime, maxCompileMemory)
+1.10 - optional syntax check of Python submissions before they are run (syntaxCheck); results cached by interpreter and file contents
+1.11 - optional fork server: Python programs run in children forked from a warm interpreter (forkServer)
+1.12 - the test data files of a submission can be run concurrently (testJobs), each run in a scratch copy of its working directory
+1.13 - programs started without a shell; CPU time, peak memory and terminating signal reported from wait4(); optional
+       per run CPU time, memory, file size and process limits (maxCpuTime, maxMemory, maxFileSize, maxProcesses)
+1.14 - every run executes in its own scratch directory (on tmpfs when available); created files are moved to <student>_output
+       in-process
+1.15 - archives of submissions (.zip, tar, gzip, bzip2, xz) extracted in-process and concurrently, nested archives included;
+       extracted again only when their contents change; limits on the # of bytes and files extracted (ArchiveExtractor)
+1.16 - optional lean report (leanReport): highlighter assets in shared, content-named files; optional gzip report (compressReport)
+1.17 - optional source listings highlighted by the grader (preHighlight): no highlighter script runs in the browser; listings are
+       cached by their contents.  Source listings are fully html escaped
+1.18 - optional lazy report (lazyReport): submissions embedded as json and rendered when they scroll into view or are
+       selected in a navigation list
+1.19 - optional report shards (shardReport): a report per submission written by the grading workers, and an index page with
+       the status of each submission; regrading of selected submissions (regrade) rewrites only their shards and the index
 
 """
 
+class OutputCapture:
+    """class that drains a child process' output pipe into memory on a background thread.  Only the first
+    maxNumLines lines or maxNumBytes bytes (whichever is smaller) are kept.  As soon as more output arrives,
+    bLimitExceeded is set and onLimitExceeded() is called (once).  Output past the limit is read and discarded
+    so the child never blocks on a full pipe."""
+    READ_SIZE = 65536       #max # of bytes read from the pipe at once
+
+    def __init__(self, stream, maxNumLines, maxNumBytes, onLimitExceeded=None):
+        self.stream = stream
+        self.maxNumLines = maxNumLines
+        self.maxNumBytes = maxNumBytes
+        self.onLimitExceeded = onLimitExceeded
+        self.chunks = []
+        self.numBytes = 0
+        self.numLines = 0
+        self.bLimitExceeded = False
+        self.thread = threading.Thread(target=self._drain)
+        self.thread.daemon = True
+        self.thread.start()
+
+    def _drain(self):
+        """thread function: read the pipe until every writer has closed it"""
+        fd = self.stream.fileno()
+        while True:
+            chunk = os.read(fd, OutputCapture.READ_SIZE)
+            if not chunk:
+                break
+            if not self.bLimitExceeded:
+                self._keep(chunk)
+        self.stream.close()
+
+    def _keep(self, chunk):
+        """append the part of chunk that fits within the limits to the buffer"""
+        kept = chunk[:self.maxNumBytes - self.numBytes]
+        numLines = kept.count(b'\n')
+        if self.numLines + numLines >= self.maxNumLines:
+            #cut the chunk right after the last line allowed
+            end = -1
+            for i in range(self.maxNumLines - self.numLines):
+                end = kept.find(b'\n', end + 1)
+            kept = kept[:end + 1]
+            numLines = self.maxNumLines - self.numLines
+
+        self.chunks.append(kept)
+        self.numBytes += len(kept)
+        self.numLines += numLines
+
+        if len(kept) < len(chunk):
+            self.bLimitExceeded = True
+            if self.onLimitExceeded != None:
+                self.onLimitExceeded()
+
+    def join(self, timeout=None):
+        """wait for the end of the output.  Returns True if the whole output has been read."""
+        self.thread.join(timeout)
+        return not self.thread.is_alive()
+
+    def getvalue(self):
+        """return the captured output as bytes"""
+        return b''.join(self.chunks)
+
+
+class ReportFragment:
+    """class that collects the html written for one submission in memory.  It supports the write()
+    operation of a file object, so all of the AutoGrader report functions can write to it."""
+    def __init__(self):
+        self.parts = []
+        self.title = None       #name of the submission in the navigation list of a lazy report
+        self.feedback = None    #initial text of the instructor feedback box, if the submission has one
+
+    def write(self, text):
+        self.parts.append(text)
+
+    def getvalue(self):
+        """return everything written to the fragment as a single string"""
+        return ''.join(self.parts)
+
+
+class ReportWriter:
+    """class that owns the single buffered file handle to the html report for a whole grading run.
+    The report functions write to it like a file; complete submissions are added with writeFragment(),
+    which flushes the report so that it grows one submission at a time.
+    In a lazy report (bLazy), the html of a submission is not part of the page: it is embedded as a json string
+    next to an empty placeholder section, and writeIndex() adds the index of the submissions and the script
+    that renders a section when it scrolls into view or is selected in the navigation list."""
+    BUFFER_SIZE = 1<<20     #size of the report file buffer in bytes
+
+    def __init__(self, outputFile, openFile, bCompress=False, bLazy=False):
+        self.outputFile = outputFile
+        self.bLazy = bLazy
+        self.index = []         #lazy report: title and initial feedback of each section
+        if not bCompress:
+            self.f = openFile(outputFile, "w", ReportWriter.BUFFER_SIZE)
+        elif sys.version_info >= (3, 0):
+            self.f = io.TextIOWrapper(io.BufferedWriter(gzip.open(outputFile, "wb"), ReportWriter.BUFFER_SIZE), encoding='utf-8')
+        else:
+            self.f = gzip.open(outputFile, "wb")
+
+    def write(self, text):
+        self.f.write(text)
+
+    def writeFragment(self, fragment):
+        """append a completed ReportFragment to the report and flush it (submission boundary)"""
+        if self.bLazy:
+            n = str(len(self.index))
+            html = fragment.getvalue()
+            self.index.append({'title': fragment.title or 'Submission ' + n, 'feedback': fragment.feedback})
+            #the placeholder reserves about the height of the section, so the scroll bar does not jump much
+            height = 1.2 * max(4, html.count('\n') + html.count('<br'))
+            self.f.write('<div class="AG_section" id="AG_section_' + n + '" data-n="' + n + '" style="min-height: ' + str(height) + 'em"></div>\n')
+            self.f.write('<script type="application/json" id="AG_data_' + n + '">' + ReportWriter._scriptJson(html) + '</script>\n')
+        else:
+            self.f.write(fragment.getvalue())
+        self.f.flush()
+
+    def writeIndex(self):
+        """lazy report: append the index of the sections and the script that renders them"""
+        self.f.write('<script type="application/json" id="AG_index">' + ReportWriter._scriptJson(self.index) + '</script>\n')
+        self.f.write(LAZY_REPORT_SCRIPT)
+
+    @staticmethod
+    def _scriptJson(value):
+        """return value as json that can be embedded in a <script> element: no '<' can end the element"""
+        return json.dumps(value).replace('<', '\\u003c')
+
+    def close(self):
+        """close the report file (a compressed report gets its gzip trailer).  Further calls do nothing."""
+        if not self.f.closed:
+            self.f.close()
+
+
+class ReportShards:
+    """class that keeps the report of a grading run as one html file (shard) per submission in shardDirectory, for an
+    index page that links to the shards and shows the status of every submission.  The index entries are saved in
+    shardDirectory (INDEX_FILE) by save(), so a run that regrades some of the submissions (bKeep) only replaces their
+    shards and entries; the others are kept.  Without bKeep, the shards of submissions that were not graded again
+    are removed by save().  add() may be called by concurrent workers."""
+    INDEX_FILE = 'AG_shards.json'
+    FORMAT = 1      #version of the index file format
+
+    def __init__(self, shardDirectory, bKeep=False):
+        self.shardDirectory = shardDirectory
+        self.lock = threading.Lock()
+        if not os.path.isdir(shardDirectory):
+            os.makedirs(shardDirectory)
+        self.previous = self._load()
+        self.entries = dict(self.previous) if bKeep else {}     #relative path of the submission -> index entry
+
+    def _load(self):
+        """return the entries of the saved index, or an empty dictionary"""
+        try:
+            with open(self.shardDirectory + '/' + ReportShards.INDEX_FILE, 'rb') as f:
+                saved = json.loads(f.read().decode('utf-8'))
+        except (IOError, OSError, ValueError):
+            return {}
+        if saved.get('format') != ReportShards.FORMAT:
+            return {}
+        return saved['entries']
+
+    def shardName(self, relPath, extension):
+        """return the file name of the shard of the submission relPath (relative to the source directory)"""
+        name = re.sub(r'[^A-Za-z0-9._-]+', '_', relPath).strip('_')[:80]
+        return name + '_' + FileCache.makeKey(relPath)[:8] + extension
+
+    def add(self, relPath, entry):
+        """set the index entry of the submission relPath; entry['shard'] is the name of its shard"""
+        with self.lock:
+            self.entries[relPath] = entry
+
+    def sortedEntries(self):
+        """return the index entries in the order of the submissions in a report"""
+        return [self.entries[relPath] for relPath in sorted(self.entries)]
+
+    def save(self):
+        """remove the shards that no entry refers to any more and save the index"""
+        shards = set(entry['shard'] for entry in self.entries.values())
+        for entry in self.previous.values():
+            if entry['shard'] not in shards:
+                try:
+                    os.remove(self.shardDirectory + '/' + entry['shard'])
+                except OSError:
+                    pass
+        #write a temporary file and rename it, so the index is never partially written
+        fd, tempPath = tempfile.mkstemp(prefix='.' + ReportShards.INDEX_FILE, dir=self.shardDirectory)
+        with os.fdopen(fd, 'wb') as f:
+            f.write(json.dumps({'format': ReportShards.FORMAT, 'entries': self.entries}).encode('utf-8'))
+        os.chmod(tempPath, 0o644)
+        os.rename(tempPath, self.shardDirectory + '/' + ReportShards.INDEX_FILE)
+
+
+class FileCache:
+    """class that implements a persistent, content-addressed cache of files on disk.  Each entry is a
+    directory named after a key computed from everything the entry depends on (see makeKey()), so an
+    entry never has to be invalidated: changed inputs simply produce a different key.  Once the cache
+    grows beyond maxBytes, evict() removes the least recently used entries.  Safe to use from
+    concurrent workers and concurrent graders."""
+
+    def __init__(self, directory, maxBytes):
+        self.directory = directory
+        self.maxBytes = maxBytes
+        if not os.path.isdir(directory):
+            try:
+                os.makedirs(directory)
+            except OSError:     #created by a concurrent grader
+                pass
+
+    @staticmethod
+    def makeKey(*parts):
+        """return the key (a hex string) for the supplied parts.  Parts may be strings or bytes."""
+        h = hashlib.sha256()
+        for part in parts:
+            if not isinstance(part, bytes):
+                part = part.encode('utf-8')
+            #prefix each part with its length so that no two lists of parts produce the same stream
+            h.update(str(len(part)).encode('utf-8') + b':')
+            h.update(part)
+        return h.hexdigest()
+
+    @staticmethod
+    def hashFile(filename):
+        """return the sha256 digest (a hex string) of the contents of filename"""
+        h = hashlib.sha256()
+        with open(filename, 'rb') as f:
+            for block in iter(lambda: f.read(1<<16), b''):
+                h.update(block)
+        return h.hexdigest()
+
+    def lookup(self, key):
+        """return the directory of the entry for key or None if there is no such entry"""
+        entry = self.directory + '/' + key
+        if not os.path.isdir(entry):
+            return None
+        try:
+            os.utime(entry, None)   #mark the entry as recently used
+        except OSError:             #evicted by a concurrent grader
+            return None
+        return entry
+
+    def store(self, key, files=None, texts=None, bReplace=False):
+        """create the entry for key.  files is a dictionary that maps names in the entry to the paths
+        of the files to copy; texts maps names in the entry to the text to store.  An existing entry for key
+        is kept, unless bReplace is True (for entries that are not determined by their key, such as a manifest).
+        Returns the entry directory."""
+        entry = self.directory + '/' + key
+        tmpEntry = tempfile.mkdtemp(prefix='.tmp_', dir=self.directory)
+        for name in (files or {}):
+            shutil.copy2(files[name], tmpEntry + '/' + name)
+        for name in (texts or {}):
+            with open(tmpEntry + '/' + name, 'wb') as f:
+                f.write(texts[name].encode('utf-8'))
+        if bReplace and os.path.isdir(entry):
+            #move the old entry out of the way; lookups in between miss
+            oldEntry = tempfile.mkdtemp(prefix='.old_', dir=self.directory)
+            try:
+                os.rename(entry, oldEntry + '/entry')
+            except OSError:                 #replaced or evicted by a concurrent worker
+                pass
+            shutil.rmtree(oldEntry, ignore_errors=True)
+        try:
+            os.rename(tmpEntry, entry)      #the entry appears atomically
+        except OSError:                     #stored by a concurrent worker in the meantime
+            shutil.rmtree(tmpEntry, ignore_errors=True)
+        return entry
+
+    def readText(self, entry, name):
+        """return the text of the file name in the entry directory"""
+        with open(entry + '/' + name, 'rb') as f:
+            return f.read().decode('utf-8')
+
+    def evict(self):
+        """remove the least recently used entries until the cache holds no more than maxBytes"""
+        entries = []
+        totalBytes = 0
+        try:
+            names = os.listdir(self.directory)
+        except OSError:     #the cache was removed
+            return
+        for name in names:
+            entry = self.directory + '/' + name
+            #entries (and the files of entries) removed by a concurrent grader while they are scanned are left out
+            size = 0
+            for dirpath, dirnames, filenames in os.walk(entry):
+                for filename in filenames:
+                    try:
+                        size += os.path.getsize(dirpath + '/' + filename)
+                    except OSError:
+                        pass
+            try:
+                mtime = os.path.getmtime(entry)
+            except OSError:
+                continue
+            entries.append((mtime, size, entry))
+            totalBytes += size
+
+        entries.sort()      #oldest first
+        for mtime, size, entry in entries:
+            if totalBytes <= self.maxBytes:
+                break
+            shutil.rmtree(entry, ignore_errors=True)    #an entry already removed is not an error
+            totalBytes -= size
+
+
+class PrecompiledHeaders:
+    """class that shares precompiled headers between the C++ submissions of a grading run.  The block of
+    '#include <...>' lines that opens a translation unit selects its precompiled header: a header holding
+    exactly these includes, compiled once per compiler command line and passed to the compiler with
+    '-include'.  The unit then compiles as it would without the precompiled header, since the headers it
+    includes first are the same (no header a submission forgot to include is added).  A header is
+    precompiled once Const.PCH_MIN_USES units have asked for it (or right away if a previous run cached it).
+    compile(args) runs a compiler command line and returns its output and whether a compile limit stopped it (a header
+    that did not precompile within the limits is not cached); cache is an optional FileCache
+    and directory a scratch directory for headers that are not cached."""
+    HEADER = 'AG_pch.h'
+    _INCLUDE = re.compile(r'#\s*include\s*<([^<>]+)>\s*(?://.*)?$')
+    #compiler messages about a precompiled header that is missing, invalid or not used (gcc and clang)
+    _FAILURE = re.compile(r'\.gch\b|\.pch\b|\bPCH\b|precompiled header|' + re.escape(HEADER) + r': No such file', re.IGNORECASE)
+
+    def __init__(self, compiler, compile, minUses, cache=None, directory=None):
+        self.compiler = compiler
+        self.compile = compile
+        self.minUses = minUses
+        self.cache = cache
+        self.directory = directory
+        #precompiled files are named after the header: .gch for gcc, .pch for clang
+        self.extension = '.pch' if 'clang' in os.path.basename(compiler) else '.gch'
+        self.lock = threading.Lock()
+        self.uses = {}          #key -> # of units that asked for the header
+        self.headers = {}       #key -> name of the header to include (None if it did not precompile)
+        self.building = {}      #key -> threading.Event set once the header is built
+        self.numBuilt = 0
+        self.numUses = 0        ## of compilations that used a precompiled header
+        self.buildCosts = {}    #key -> # of seconds spent precompiling the header in this run
+        #key -> [# of successful compilations with the precompiled header, their # of seconds, the same without it]
+        self.timings = {}
+
+    @staticmethod
+    def leadingIncludes(unit):
+        """return the list of headers of the '#include <...>' lines that open the unit (blank lines and comments may
+        come in between)"""
+        headers = []
+        bComment = False
+        with io.open(unit, encoding='utf-8', errors='replace') as f:
+            for line in f:
+                line = line.strip()
+                if bComment:
+                    bComment = '*/' not in line
+                    continue
+                if line == '' or line.startswith('//'):
+                    continue
+                if line.startswith('/*'):
+                    bComment = '*/' not in line
+                    continue
+                m = PrecompiledHeaders._INCLUDE.match(line)
+                if m == None:
+                    break
+                headers.append(m.group(1).strip())
+        return headers
+
+    def headerFor(self, unit):
+        """return the key of the block of includes that opens unit (None if there is none) and the name of the header
+        to '-include' when compiling unit, or None if the unit cannot use a precompiled header (yet)"""
+        headers = self.leadingIncludes(unit)
+        if not headers:
+            return None, None
+        key = FileCache.makeKey(self.compiler, 'pch', *headers)
+        with self.lock:
+            self.uses[key] = self.uses.get(key, 0) + 1
+            if key in self.headers:
+                return key, self.headers[key]
+            if key in self.building:
+                event = self.building[key]
+            else:
+                entry = self.cache.lookup(key) if self.cache != None else None
+                if entry != None:   #precompiled in a previous run
+                    self.headers[key] = entry + '/' + PrecompiledHeaders.HEADER if os.path.isfile(entry + '/' + PrecompiledHeaders.HEADER + self.extension) else None
+                    return key, self.headers[key]
+                if self.uses[key] < self.minUses:
+                    return key, None
+                event = None
+                self.building[key] = threading.Event()
+
+        if event != None:   #another unit is precompiling the header
+            event.wait()
+            return key, self.headers[key]
+
+        header = None
+        try:
+            header = self._build(key, headers)
+        finally:
+            with self.lock:
+                self.headers[key] = header
+                self.building.pop(key).set()
+        return key, header
+
+    def _build(self, key, headers):
+        """precompile the header holding the '#include' lines of headers.  Returns the name of the header or None."""
+        directory = tempfile.mkdtemp(prefix='AG_pch_', dir=self.directory)
+        header = directory + '/' + PrecompiledHeaders.HEADER
+        with open(header, 'w') as f:
+            for name in headers:
+                f.write('#include <' + name + '>\n')
+
+        start_time = time.time()
+        output, bLimitExceeded = self.compile('"' + self.compiler + '" -x c++-header "' + header + '" -o "' + header + self.extension + '"')
+        buildTime = time.time() - start_time
+        bBuilt = os.path.isfile(header + self.extension)
+        with self.lock:
+            self.buildCosts[key] = self.buildCosts.get(key, 0.0) + buildTime
+            if bBuilt:
+                self.numBuilt += 1
+
+        if self.cache != None and not bLimitExceeded:
+            files = {PrecompiledHeaders.HEADER: header}
+            if bBuilt:
+                files[PrecompiledHeaders.HEADER + self.extension] = header + self.extension
+            entry = self.cache.store(key, files)
+            shutil.rmtree(directory, ignore_errors=True)
+            header = entry + '/' + PrecompiledHeaders.HEADER
+        if bBuilt:
+            print ("precompiled " + ', '.join(headers) + " ({0:.2f} secs.)".format(buildTime))
+            return header
+        return None
+
+    def recordCompile(self, key, header, seconds):
+        """record a successful compilation of a unit opening with the includes of key (see headerFor()) that took seconds,
+        with the precompiled header (or without one if header is None)"""
+        with self.lock:
+            if header != None:
+                self.numUses += 1
+            if key == None:
+                return
+            timing = self.timings.setdefault(key, [0, 0.0, 0, 0.0])
+            if header != None:
+                timing[0] += 1
+                timing[1] += seconds
+            else:
+                timing[2] += 1
+                timing[3] += seconds
+
+    def isFailure(self, header, output):
+        """return True if a compilation with the precompiled header failed because of it (rather than because of the unit):
+        the header or its precompiled file is gone, or the compiler output mentions a precompiled header"""
+        return (not os.path.isfile(header) or not os.path.isfile(header + self.extension) or
+                PrecompiledHeaders._FAILURE.search(output) != None)
+
+    def summary(self):
+        """return a one-line description of the use of precompiled headers in this run.  The time saved is estimated per
+        block of includes, from the average durations of its compilations with the precompiled header and of the first
+        ones (before the header was precompiled) without it, less the time spent precompiling it.  Blocks that were
+        precompiled in a previous run have no compilations without the header and are left out.  The estimate is only given
+        when some time was saved."""
+        text = ('Precompiled headers: ' + str(self.numUses) + ' compilation(s) used ' +
+            str(len([key for key in self.headers if self.headers[key] != None])) + ' precompiled header(s) (' + str(self.numBuilt) +
+            ' built in this run)')
+        savedTime = 0.0
+        numMeasured = 0
+        for key in self.timings:
+            numWith, timeWith, numWithout, timeWithout = self.timings[key]
+            if numWith > 0 and numWithout > 0:
+                savedTime += numWith * (timeWithout / numWithout - timeWith / numWith) - self.buildCosts.get(key, 0.0)
+                numMeasured += 1
+        if numMeasured == 0 or savedTime <= 0:
+            return text + '.'
+        return (text + '; estimated compile time saved: ' + format("%0.2f" % savedTime) + ' sec. (' + str(numMeasured) +
+            ' precompiled header(s) measured)')
+
+
+class ForkedProcess:
+    """class that stands for a program run by a ForkServer.  Like a Popen object, it has the pid of the
+    child (which leads its own process group), its stdout pipe and, once it has terminated, its returncode,
+    endTime and resourceUsage (see AutoGrader._startProcess())."""
+    def __init__(self):
+        self.pid = None
+        self.stdout = None
+        self.returncode = None
+        self.endTime = None
+        self.resourceUsage = None
+        self.started = threading.Event()    #set once the child has been forked (pid is None if it could not be)
+        self.done = threading.Event()       #set once the child has terminated
+
+
+class ForkServer:
+    """class that runs Python programs in children forked from a warm interpreter.  The server is started
+    once with the student's interpreter and imports the modules of preload; every run is then a fork of
+    the server instead of a shell plus a fresh interpreter.  The child starts a new session, gets the test
+    data file as stdin and a pipe to the grader as stdout and stderr (both passed through a Unix socket),
+    changes to the working directory and runs the top-level module as __main__.  Preloaded modules that the
+    submission shadows with its own modules are dropped and the random module is reseeded, so the program
+    sees the same modules as in a fresh interpreter.
+    The server needs a Python 3 interpreter (socket.recvmsg) on a system with fork(); start() returns False
+    when it cannot be used."""
+    START_TIMEOUT = 10      ## of seconds the interpreter has to import the preloaded modules and report it is ready
+    POLL_INTERVAL = 1.0     ## of seconds between two checks that the server is still alive while no reply arrives
+    START_POLL_INTERVAL = 0.05  ## of seconds between two checks that the starting server is still alive
+
+    #the server: argv[1] is the file descriptor of its end of the socket, argv[2] the comma separated modules to preload
+    SCRIPT = r'''
+import os, sys, json, socket, select, signal, array, fcntl, resource, runpy, pkgutil, atexit, gc, traceback
+
+def serve(fd, preload):
+    for name in preload:
+        try:
+            __import__(name)
+        except ImportError:
+            pass
+    sock = socket.socket(socket.AF_UNIX, socket.SOCK_DGRAM, 0, fd)
+    wakeR, wakeW = os.pipe()
+    fcntl.fcntl(wakeW, fcntl.F_SETFL, fcntl.fcntl(wakeW, fcntl.F_GETFL) | os.O_NONBLOCK)
+    signal.set_wakeup_fd(wakeW)
+    signal.signal(signal.SIGCHLD, lambda signum, frame: None)
+    children = {}
+    if hasattr(gc, 'freeze'):
+        gc.freeze()
+    sock.send(json.dumps({'ready': True}).encode('utf-8'))
+    while True:
+        try:
+            readable = select.select([0, sock, wakeR], [], [])[0]
+        except (select.error, OSError):
+            continue
+        if 0 in readable and not os.read(0, 512):
+            return None
+        if wakeR in readable:
+            os.read(wakeR, 512)
+            while children:
+                try:
+                    pid, status, usage = os.wait4(-1, os.WNOHANG)
+                except OSError:
+                    break
+                if pid == 0:
+                    break
+                if pid in children:
+                    sock.send(json.dumps({'id': children.pop(pid), 'status': status,
+                        'usage': [usage.ru_utime, usage.ru_stime, usage.ru_maxrss]}).encode('utf-8'))
+        if sock in readable:
+            fds = array.array('i')
+            msg, ancdata, flags, address = sock.recvmsg(65536, socket.CMSG_LEN(2 * fds.itemsize))
+            for level, kind, data in ancdata:
+                if level == socket.SOL_SOCKET and kind == socket.SCM_RIGHTS:
+                    fds.frombytes(data[:len(data) - len(data) % fds.itemsize])
+            request = json.loads(msg.decode('utf-8'))
+            try:
+                pid = os.fork()
+            except OSError as e:
+                sock.send(json.dumps({'id': request['id'], 'error': str(e)}).encode('utf-8'))
+                pid = -1
+            if pid == 0:
+                signal.set_wakeup_fd(-1)
+                signal.signal(signal.SIGCHLD, signal.SIG_DFL)
+                os.setsid()
+                for name, value in request['limits']:
+                    limit = getattr(resource, name)
+                    hard = resource.getrlimit(limit)[1]
+                    if hard != resource.RLIM_INFINITY and value >= hard:
+                        resource.setrlimit(limit, (hard, hard))
+                    else:
+                        resource.setrlimit(limit, (value, value + 1 if name == 'RLIMIT_CPU' else value))
+                os.dup2(fds[0], 0)
+                os.dup2(fds[1], 1)
+                os.dup2(fds[1], 2)
+                for fd in list(fds) + [wakeR, wakeW]:
+                    os.close(fd)
+                sock.close()
+                return request
+            if pid > 0:
+                children[pid] = request['id']
+                sock.send(json.dumps({'id': request['id'], 'pid': pid}).encode('utf-8'))
+            for fd in fds:
+                os.close(fd)
+
+request = serve(int(sys.argv[1]), [name for name in sys.argv[2].split(',') if name])
+if request is None:
+    sys.exit(0)
+del serve
+
+path = request['module']
+os.chdir(request['cwd'])
+sys.argv = [path]
+sys.path[0] = os.path.dirname(path)
+for name in list(sys.modules):
+    top = name.split('.')[0]
+    if top not in sys.builtin_module_names and (os.path.isfile(os.path.join(sys.path[0], top + '.py')) or
+            os.path.isdir(os.path.join(sys.path[0], top))):
+        del sys.modules[name]
+if 'random' in sys.modules:
+    sys.modules['random'].seed()
+
+status = 0
+try:
+    runpy.run_path(path, run_name='__main__')
+except SystemExit as e:
+    status = e.code
+    if status is None:
+        status = 0
+    elif not isinstance(status, int):
+        sys.stderr.write(str(status) + '\n')
+        status = 1
+except BaseException:
+    etype, value, tb = sys.exc_info()
+    while tb is not None and tb.tb_frame.f_code.co_filename != path:
+        tb = tb.tb_next
+    traceback.print_exception(etype, value, tb)
+    status = 1
+
+# shut down like the interpreter does, without tearing down the modules inherited from the server
+if 'threading' in sys.modules:
+    threading = sys.modules['threading']
+    for thread in threading.enumerate():
+        if thread is not threading.current_thread() and not thread.daemon:
+            thread.join()
+atexit._run_exitfuncs()
+for stream in (sys.stdout, sys.stderr):
+    try:
+        stream.flush()
+    except Exception:
+        pass
+os._exit(status & 0xff)
+'''
+
+    def __init__(self, interpreter, preload):
+        self.interpreter = interpreter
+        self.preload = list(preload)
+        self.server = None
+        self.sock = None
+        self.runs = {}          #request id -> ForkedProcess
+        self.nextId = 0
+        self.lock = threading.Lock()
+
+    def start(self):
+        """start the server.  Returns True once it is ready, False if it cannot be used."""
+        if not hasattr(socket, 'AF_UNIX') or not hasattr(socket.socket, 'sendmsg') or not hasattr(os, 'fork'):
+            return False
+        self.sock, serverSock = socket.socketpair(socket.AF_UNIX, socket.SOCK_DGRAM)
+        try:
+            self.server = subprocess.Popen([self.interpreter, '-c', ForkServer.SCRIPT, str(serverSock.fileno()), ','.join(self.preload)],
+                stdin=subprocess.PIPE, stdout=subprocess.DEVNULL, pass_fds=(serverSock.fileno(),))
+        except OSError:
+            self.server = None
+        serverSock.close()
+        if self.server == None:
+            self.close()
+            return False
+
+        #wait for the server to report it is ready; give up at once if the interpreter exits (e.g. it cannot run the server)
+        self.sock.settimeout(ForkServer.START_POLL_INTERVAL)
+        deadline = time.time() + ForkServer.START_TIMEOUT
+        bReady = False
+        while True:
+            try:
+                bReady = json.loads(self.sock.recv(65536).decode('utf-8')).get('ready', False)
+                break
+            except socket.timeout:
+                if self.server.poll() != None or time.time() > deadline:
+                    break
+            except (socket.error, ValueError):
+                break
+        if not bReady:
+            self.close()
+            return False
+        self.sock.settimeout(ForkServer.POLL_INTERVAL)
+
+        reader = threading.Thread(target=self._read)
+        reader.daemon = True
+        reader.start()
+        return True
+
+    def _read(self):
+        """thread function: dispatch the replies of the server to the runs waiting for them"""
+        while True:
+            try:
+                reply = json.loads(self.sock.recv(65536).decode('utf-8'))
+            except socket.timeout:
+                server = self.server
+                if server != None and server.poll() == None:
+                    continue
+                reply = None
+            except (socket.error, ValueError):
+                reply = None
+            with self.lock:
+                if reply == None or self.server == None:
+                    #the server is gone: release every run that waits for it
+                    runs = list(self.runs.values())
+                    self.runs = {}
+                    self.server = None
+                    for run in runs:
+                        run.started.set()
+                        run.done.set()
+                    return
+                run = self.runs.get(reply['id'])
+                if run == None:
+                    continue
+                if 'pid' in reply:
+                    run.pid = reply['pid']
+                    run.started.set()
+                elif 'status' in reply:
+                    status = reply['status']
+                    run.endTime = time.time()
+                    run.returncode = -os.WTERMSIG(status) if os.WIFSIGNALED(status) else os.WEXITSTATUS(status)
+                    userTime, systemTime, maxRss = reply['usage']
+                    #the child is a copy of the server: its peak includes the interpreter and the modules the server preloaded,
+                    #whether the program uses them or not, so it is an upper bound
+                    run.resourceUsage = (userTime, systemTime, maxRss * AutoGrader.Const.MAXRSS_UNIT, True, False)
+                    del self.runs[reply['id']]
+                    run.done.set()
+                else:       #the server could not fork
+                    del self.runs[reply['id']]
+                    run.started.set()
+
+    def run(self, sourceFile, dataFile, cwd, limits=None):
+        """fork a child that runs sourceFile in the directory cwd with its stdin redirected from dataFile
+        ('' for no input) and the resource limits (list of (name of the resource.RLIMIT_ constant, value); None for none).  Returns the ForkedProcess and its done event (see AutoGrader._startProcess()),
+        or None if the server cannot run it (the caller then runs the program the usual way)."""
+        try:
+            stdinFd = os.open(dataFile if dataFile != '' else os.devnull, os.O_RDONLY)
+        except OSError:     #leave the error message to the caller
+            return None
+        r, w = os.pipe()
+
+        process = ForkedProcess()
+        with self.lock:
+            if self.server == None:
+                bSent = False
+            else:
+                requestId = self.nextId
+                self.nextId += 1
+                self.runs[requestId] = process
+                msg = json.dumps({'id': requestId, 'module': sourceFile, 'cwd': cwd, 'limits': limits or []}).encode('utf-8')
+                try:
+                    self.sock.sendmsg([msg], [(socket.SOL_SOCKET, socket.SCM_RIGHTS, array.array('i', [stdinFd, w]))])
+                    bSent = True
+                except socket.error:
+                    del self.runs[requestId]
+                    bSent = False
+        os.close(stdinFd)
+        os.close(w)
+
+        if bSent:
+            process.started.wait()
+        if process.pid == None:
+            os.close(r)
+            return None
+        process.stdout = os.fdopen(r, 'rb')
+        return process, process.done
+
+    def close(self):
+        """stop the server.  Programs that are still running are not affected."""
+        with self.lock:
+            server = self.server
+            self.server = None
+        if server != None:
+            server.stdin.close()    #the server exits at the end of its input
+            server.wait()
+        if self.sock != None:
+            self.sock.close()
+            self.sock = None
+
+
+class ArchiveError(Exception):
+    """exception raised when an archive cannot be extracted safely"""
+    pass
+
+
+class ArchiveExtractor:
+    """class that extracts the archives of submissions (.zip, tar files, and single files compressed with gzip, bzip2
+    or xz) with the standard library.  An archive is extracted to the path of the archive without its extension:
+    a directory for .zip and tar files, a file for a compressed single file.  Archives found in the extracted tree
+    are extracted next to themselves, up to maxDepth levels of nesting.
+    The hash of an extracted archive is kept in a hidden marker file next to it, so an archive is extracted again
+    only when its contents change; the new tree replaces the old one.  An archive that holds more than maxBytes
+    (uncompressed, nested archives included) or more than maxFiles files, or names outside of its target, is not
+    extracted at all."""
+    EXTENSIONS = ['.zip', '.tar', '.tgz', '.tbz2', '.txz', '.gz', '.bz2', '.xz']
+    READ_SIZE = 1<<16       #max # of bytes copied at once
+
+    def __init__(self, maxBytes, maxFiles, maxDepth):
+        self.maxBytes = maxBytes
+        self.maxFiles = maxFiles
+        self.maxDepth = maxDepth
+
+    @staticmethod
+    def isArchive(name):
+        """return True if the name of a file has one of the archive extensions"""
+        return any(name.endswith(extension) for extension in ArchiveExtractor.EXTENSIONS)
+
+    @staticmethod
+    def targetPath(archive):
+        """return the path an archive is extracted to: the path of the archive without its extension(s)"""
+        for extension in ['.tar.gz', '.tar.bz2', '.tar.xz']:
+            if archive.endswith(extension):
+                return archive[:-len(extension)]
+        return os.path.splitext(archive)[0]
+
+    @staticmethod
+    def _markerFile(archive):
+        directory, name = os.path.split(archive)
+        return os.path.join(directory, '.' + name + '.extracted')
+
+    def isCurrent(self, archive):
+        """return True if archive has been extracted and has not changed since.  A target that was extracted by other
+        means (no marker) is taken as current unless the archive is newer; it is then marked as extracted."""
+        target = ArchiveExtractor.targetPath(archive)
+        if not os.path.exists(target):
+            return False
+        stat = os.stat(archive)
+        try:
+            with open(ArchiveExtractor._markerFile(archive)) as f:
+                marker = json.load(f)
+        except (IOError, OSError, ValueError):
+            if stat.st_mtime > os.stat(target).st_mtime:
+                return False
+            self._mark(archive, FileCache.hashFile(archive))
+            return True
+        #the hash is only computed when the size or the modification time of the archive changed
+        if marker.get('size') == stat.st_size and marker.get('mtime') == stat.st_mtime:
+            return True
+        if marker.get('hash') == FileCache.hashFile(archive):
+            self._mark(archive, marker['hash'])
+            return True
+        return False
+
+    def _mark(self, archive, archiveHash):
+        stat = os.stat(archive)
+        with open(ArchiveExtractor._markerFile(archive), 'w') as f:
+            json.dump({'hash': archiveHash, 'size': stat.st_size, 'mtime': stat.st_mtime}, f)
+
+    def extract(self, archive):
+        """extract archive (unless it is current, see isCurrent()) and return a message that tells what was done"""
+        if self.isCurrent(archive):
+            return 'unchanged: ' + archive
+        archiveHash = FileCache.hashFile(archive)
+        target = ArchiveExtractor.targetPath(archive)
+        parent, name = os.path.split(target)
+        #extract next to the target, then swap the new tree in
+        scratch = tempfile.mkdtemp(prefix='.AG_extract_', dir=parent or '.')
+        try:
+            budget = {'bytes': 0, 'files': 0}
+            newTarget = os.path.join(scratch, name)
+            self._extract(archive, newTarget, budget, 0)
+            if os.path.exists(target):
+                os.rename(target, os.path.join(scratch, name + '.old'))
+            os.rename(newTarget, target)
+        except (ArchiveError, IOError, OSError, EOFError, zipfile.BadZipfile, tarfile.TarError) as e:
+            return 'not extracted: ' + archive + ' (' + str(e) + ')'
+        finally:
+            shutil.rmtree(scratch, ignore_errors=True)
+        self._mark(archive, archiveHash)
+        return 'extracted: ' + archive + ' (' + str(budget['files']) + ' files, ' + str(budget['bytes']) + ' bytes)'
+
+    def _extract(self, archive, target, budget, depth):
+        """extract archive to target (which does not exist) and the archives it holds, charging budget"""
+        if zipfile.is_zipfile(archive):
+            os.makedirs(target)
+            with zipfile.ZipFile(archive) as z:
+                for info in z.infolist():
+                    path = self._safePath(target, info.filename)
+                    if info.filename.endswith('/'):
+                        if not os.path.isdir(path):
+                            os.makedirs(path)
+                        continue
+                    src = z.open(info)
+                    try:
+                        self._copy(src, path, budget)
+                    finally:
+                        src.close()
+        elif not archive.endswith(('.gz', '.bz2', '.xz')) or tarfile.is_tarfile(archive):
+            os.makedirs(target)
+            with tarfile.open(archive, 'r:*') as t:
+                for member in t:
+                    path = self._safePath(target, member.name)
+                    if member.isdir():
+                        if not os.path.isdir(path):
+                            os.makedirs(path)
+                    elif member.isfile():      #links and special files are skipped
+                        src = t.extractfile(member)
+                        try:
+                            self._copy(src, path, budget)
+                        finally:
+                            src.close()
+        else:
+            #a single compressed file
+            if archive.endswith('.gz'):
+                src = gzip.open(archive, 'rb')
+            elif archive.endswith('.bz2'):
+                src = bz2.BZ2File(archive, 'rb')
+            elif lzma != None:
+                src = lzma.open(archive, 'rb')
+            else:
+                raise ArchiveError('xz is not supported by this version of Python')
+            try:
+                self._copy(src, target, budget)
+            finally:
+                src.close()
+            return
+
+        #nested archives
+        if depth + 1 < self.maxDepth:
+            for directory, dirNames, fileNames in os.walk(target):
+                for fileName in fileNames:
+                    path = os.path.join(directory, fileName)
+                    if ArchiveExtractor.isArchive(fileName) and not os.path.exists(ArchiveExtractor.targetPath(path)):
+                        self._extract(path, ArchiveExtractor.targetPath(path), budget, depth + 1)
+
+    def _safePath(self, target, name):
+        """return the path of the archive member name within target; members outside of target are refused"""
+        parts = [part for part in name.replace('\\', '/').split('/') if part not in ('', '.')]
+        if name.startswith('/') or '..' in parts or not parts:
+            raise ArchiveError('unsafe member name ' + repr(name))
+        return os.path.join(target, *parts)
+
+    def _copy(self, src, path, budget):
+        """copy the stream src to the new file path, within the budget of files and bytes"""
+        budget['files'] += 1
+        if budget['files'] > self.maxFiles:
+            raise ArchiveError('more than ' + str(self.maxFiles) + ' files')
+        directory = os.path.dirname(path)
+        if not os.path.isdir(directory):
+            os.makedirs(directory)
+        with open(path, 'wb') as dst:
+            for block in iter(lambda: src.read(ArchiveExtractor.READ_SIZE), b''):
+                budget['bytes'] += len(block)
+                if budget['bytes'] > self.maxBytes:
+                    raise ArchiveError('more than ' + str(self.maxBytes) + ' bytes')
+                dst.write(block)
+
+
+class SubmissionIndex:
+    """class that indexes the files of a source directory tree in a single walk.  Every directory is
+    listed once (with os.scandir() where available) and the names of its regular, non-hidden files and
+    of its sub-directories are recorded; directories matching one of the skipDirs patterns are not
+    entered.  The index can be saved to indexFile together with the modification time of each directory:
+    the next time, a directory whose mtime has not changed is not listed again (its sub-directories are
+    still checked, since their changes do not change the mtime of their parent).
+    With bScan=False, the tree is indexed while the caller iterates scan()."""
+    FORMAT = 1      #version of the index file format
+
+    def __init__(self, topLevelDirectory, skipDirs, indexFile=None, bScan=True):
+        self.topLevelDirectory = topLevelDirectory
+        self.skipDirs = list(skipDirs)
+        self.indexFile = indexFile
+        self.dirs = {}      #directory path relative to topLevelDirectory ('' for the top) -> entry dictionary
+
+        if bScan:
+            for relPath in self.scan():
+                pass
+
+    def scan(self):
+        """generator that indexes the tree.  It yields the relative path of each directory as soon as the
+        directory is indexed (a directory before its sub-directories) and saves the index at the end."""
+        previous = self._load()
+        self.scanTime = time.time()
+        for relPath in self._scan('', previous):
+            yield relPath
+        self._save()
+
+    def _load(self):
+        """return the directory entries of the saved index, or an empty dictionary"""
+        if not self.indexFile:
+            return {}
+        try:
+            with open(self.indexFile) as f:
+                saved = json.load(f)
+        except (IOError, OSError, ValueError):  #no index yet or a damaged one
+            return {}
+        if saved.get('format') != SubmissionIndex.FORMAT or saved.get('skipDirs') != self.skipDirs:
+            return {}
+        return saved.get('dirs', {})
+
+    def _save(self):
+        """write the index to indexFile (if any).  The file is replaced atomically."""
+        if not self.indexFile:
+            return
+        directory = os.path.dirname(self.indexFile)
+        try:
+            if not os.path.isdir(directory):
+                os.makedirs(directory)
+            fd, tmpFile = tempfile.mkstemp(prefix='.tmp_', dir=directory)
+            with os.fdopen(fd, 'w') as f:
+                json.dump({'format': SubmissionIndex.FORMAT, 'skipDirs': self.skipDirs, 'dirs': self.dirs}, f)
+            os.rename(tmpFile, self.indexFile)
+        except (IOError, OSError):      #the index is only an optimization
+            pass
+
+    def _skip(self, name):
+        """return True if the directory name matches one of the skipDirs patterns"""
+        for pattern in self.skipDirs:
+            if fnmatch.fnmatch(name, pattern):
+                return True
+        return False
+
+    def _list(self, path):
+        """return the lists of regular, non-hidden file names and of sub-directory names in path"""
+        files = []
+        dirs = []
+        if hasattr(os, 'scandir'):
+            for entry in os.scandir(path):
+                if entry.is_dir(follow_symlinks=False):
+                    if not self._skip(entry.name):
+                        dirs.append(entry.name)
+                elif entry.name[0:1] != '.' and entry.is_file():
+                    files.append(entry.name)
+        else:   #Python 2
+            for name in os.listdir(path):
+                if os.path.isdir(path + '/' + name) and not os.path.islink(path + '/' + name):
+                    if not self._skip(name):
+                        dirs.append(name)
+                elif name[0:1] != '.' and os.path.isfile(path + '/' + name):
+                    files.append(name)
+        return files, dirs
+
+    def _scan(self, relPath, previous):
+        """generator that indexes the directory relPath and its sub-directories, reusing the entries of
+        previous when a directory's mtime has not changed.  Yields the relative path of every directory indexed."""
+        path = self.path(relPath)
+        try:
+            mtime = os.stat(path).st_mtime
+        except OSError:     #removed while indexing
+            return
+        entry = previous.get(relPath)
+        if entry == None or entry['mtime'] != mtime:
+            try:
+                files, dirs = self._list(path)
+            except OSError:
+                return
+            #a directory changed within the last second may change again without a new mtime; list it again next time
+            entry = {'mtime': mtime if mtime < self.scanTime - 1 else None, 'files': files, 'dirs': dirs}
+        self.dirs[relPath] = entry
+        yield relPath
+        for name in entry['dirs']:
+            for subPath in self._scan(relPath + '/' + name if relPath else name, previous):
+                yield subPath
+
+    def path(self, relPath):
+        """return the path of the indexed directory relPath"""
+        return self.topLevelDirectory + '/' + relPath if relPath else self.topLevelDirectory
+
+    def files(self, directory, extensions):
+        """return the paths of the files in directory (a path returned by one of the functions of the
+        index) with one of the supplied extensions, grouped by extension in the order of extensions"""
+        relPath = directory[len(self.topLevelDirectory) + 1:] if directory != self.topLevelDirectory else ''
+        entry = self.dirs.get(relPath)
+        if entry == None:
+            return []
+        return [directory + '/' + name for extension in extensions for name in entry['files'] if name.endswith(extension)]
+
+    def topLevelFiles(self, extensions):
+        """return the paths of the files in the top-level directory with one of the supplied extensions"""
+        return self.files(self.topLevelDirectory, extensions)
+
+    def subDirsWithFiles(self, extensions):
+        """return the paths of the sub-directories (at any depth) that hold a file with one of the supplied extensions"""
+        return [self.path(relPath) for relPath in sorted(self.dirs) if relPath != '' and self.files(self.path(relPath), extensions)]
+
+    def dirsWithFile(self, filename):
+        """return the paths of the directories (including the top-level directory) that hold a file named filename"""
+        return [self.path(relPath) for relPath in sorted(self.dirs) if filename in self.dirs[relPath]['files']]
+
+
+class Submission:
+    """class that holds a submission (a single-file program or a project directory) while it moves
+    through the grading Pipeline.  Every stage appends its part of the report to the submission's
+    fragment, so the fragment is complete when the submission leaves the last stage."""
+    def __init__(self, n, path, kind):
+        self.n = n                  #discovery order; makes temporary file names unique
+        self.path = path            #name of the file or of the directory
+        self.kind = kind            #'file' or 'dir'
+        self.sourceFiles = []
+        self.fragment = ReportFragment()
+        self.topLevelModule = None  #Python module executed
+        self.exeFile = None         #C++ executable
+        self.bCompiled = False
+        self.syntaxErrors = {}      #Python syntax check: source file -> syntax error message (None: no syntax error found)
+        self.results = []           #result dictionaries of the runs, in the order of the test data (None: not run)
+
+    def sortKey(self):
+        """return the key that orders submissions in the report"""
+        return (self.path, self.kind)
+
+
+class Pipeline:
+    """class that streams items through a sequence of stages.  A stage is a function applied to every item
+    by its own pool of worker threads; each stage reads from its own bounded queue, so a stage never gets
+    far ahead of the next one and all of the stages work at the same time.  The items of source are produced
+    on a thread of their own.  results() returns the items in the order in which they leave the last stage."""
+    _END = object()     #marks the end of the items in a queue
+
+    class _Failure:
+        """an exception raised by a stage, passed on to results()"""
+        def __init__(self, exception):
+            self.exception = exception
+
+    def __init__(self, source, stages):
+        """source - iterable of the items to process
+        stages - list of (function, numWorkers) or (function, numWorkers, maxQueued) tuples; function(item) is
+            called for every item.  At most maxQueued items (default: 2 x numWorkers, 0 for no limit) wait for the stage."""
+        self.done = queue.Queue()
+        self.bFinished = False              #the end of the items has been read from done
+        self.cancelled = threading.Event()  #set by close(): the remaining items are dropped
+        queues = [queue.Queue(stage[2] if len(stage) > 2 else 2 * stage[1]) for stage in stages] + [self.done]
+        numReaders = [stage[1] for stage in stages] + [1]
+        self.threads = [threading.Thread(target=self._produce, args=(source, queues[0], numReaders[0]))]
+        for i, stage in enumerate(stages):
+            function, numWorkers = stage[0], stage[1]
+            remaining = [numWorkers]    #workers of the stage still running
+            lock = threading.Lock()
+            for worker in range(numWorkers):
+                self.threads.append(threading.Thread(target=self._work,
+                    args=(function, queues[i], queues[i + 1], numReaders[i + 1], remaining, lock)))
+        for thread in self.threads:
+            thread.daemon = True
+            thread.start()
+
+    def _produce(self, source, outQueue, numReaders):
+        """thread function: feed the items of source to the first stage"""
+        try:
+            for item in source:
+                if self.cancelled.is_set():
+                    break
+                outQueue.put(item)
+        except Exception as e:
+            self.done.put(Pipeline._Failure(e))
+        for reader in range(numReaders):
+            outQueue.put(Pipeline._END)
+
+    def _work(self, function, inQueue, outQueue, numReaders, remaining, lock):
+        """thread function: apply function to the items of inQueue and pass them on to outQueue.  The last
+        worker of a stage to finish tells the workers of the next stage that there are no more items."""
+        while True:
+            item = inQueue.get()
+            if item is Pipeline._END:
+                with lock:
+                    remaining[0] -= 1
+                    bLast = remaining[0] == 0
+                if bLast:
+                    for reader in range(numReaders):
+                        outQueue.put(Pipeline._END)
+                return
+            if self.cancelled.is_set():
+                continue
+            try:
+                function(item)
+            except Exception as e:
+                self.done.put(Pipeline._Failure(e))
+                continue
+            outQueue.put(item)
+
+    def results(self):
+        """generator of the processed items, in the order in which they are done.  An exception raised
+        by a stage is raised again here."""
+        while True:
+            item = self.done.get()
+            if item is Pipeline._END:
+                self.bFinished = True
+                return
+            if isinstance(item, Pipeline._Failure):
+                raise item.exception
+            yield item
+
+    def close(self):
+        """stop the pipeline: the items that are not being processed are dropped, and the call returns when the
+        stages have finished the items they are working on.  Items and exceptions that were not read are discarded."""
+        self.cancelled.set()
+        while not self.bFinished:
+            if self.done.get() is Pipeline._END:
+                self.bFinished = True
+
+
+def _readSource(sourceFile):
+    """function that returns the text of sourceFile"""
+    with io.open(sourceFile, encoding='utf-8', errors='replace') as f:
+        return f.read()
+
+
+def _countLines(text):
+    """function that returns the # of lines in text (a last line without a newline counts)"""
+    numLines = text.count('\n')
+    if text != '' and not text.endswith('\n'):
+        numLines += 1
+    return numLines
+
+
+def analyzePythonFile(sourceFile):
+    """function that counts linenumbers, comments, docstrings, functions and classes in the supplied
+    Python sourceFile in a single pass over its tokens, so '#' characters and triple quotes inside of
+    strings are not miscounted.  Only the strings that are the first statement of a module, class or
+    function count as docstrings.  If the file does not tokenize (a syntax error), the counts stop at
+    the error.  The function returns a tuple with the format (numLines, numDocStr, numComments, numDefs, numClasses).
+    This is a module level function so that it can be run in a process pool."""
+    text = _readSource(sourceFile)
+    numDocStr = 0       # Number of doc strings in code
+    numComments = 0     # Number of comments in the code
+    numDefs = 0         # Number of functions
+    numClasses = 0      # Number of classes
+
+    bLineStart = True           #the next token starts a logical line
+    bExpectDocStr = True        #the next logical line is the first statement of a module, class or function
+    bDocStrLine = False         #the current logical line consists of strings only
+    bHeaderLine = False         #the current logical line is a def or class statement
+    bHeaderEnded = False        #the previous logical line was a def or class statement
+    try:
+        for token in tokenize.generate_tokens(io.StringIO(text).readline):
+            tokenType, tokenString = token[0], token[1]
+            if tokenType == tokenize.COMMENT:
+                numComments += 1
+            elif tokenType == tokenize.NL or tokenType == tokenize.DEDENT:
+                pass
+            elif tokenType == tokenize.INDENT:
+                bExpectDocStr = bHeaderEnded    #first statement of the body of a def or class
+                bHeaderEnded = False
+            elif tokenType == tokenize.NEWLINE or tokenType == tokenize.ENDMARKER:
+                if bDocStrLine:
+                    numDocStr += 1
+                bHeaderEnded = bHeaderLine
+                bLineStart = True
+                bDocStrLine = False
+                bHeaderLine = False
+            else:
+                if bLineStart:
+                    bDocStrLine = bExpectDocStr and tokenType == tokenize.STRING
+                    bExpectDocStr = False
+                    bHeaderEnded = False
+                    bLineStart = False
+                elif tokenType != tokenize.STRING:     #adjacent strings are concatenated: "a" "b" is a single string
+                    bDocStrLine = False
+
+                if tokenType == tokenize.NAME and tokenString == 'def':
+                    numDefs += 1
+                    bHeaderLine = True
+                elif tokenType == tokenize.NAME and tokenString == 'class':
+                    numClasses += 1
+                    bHeaderLine = True
+    except (tokenize.TokenError, SyntaxError):
+        pass
+
+    return _countLines(text), numDocStr, numComments, numDefs, numClasses
+
+
+#tokens of the C/C++ lexer.  The whole file is scanned by a single regular expression, so the per
+#character work is done by the regular expression engine.  Blanks, numbers and operators other than
+#the ones that matter for function detection are skipped without producing a token.
+_CPP_TOKEN = re.compile(r"""
+    (?P<blockComment>/\*.*?(?:\*/|\Z))
+  | (?P<lineComment>//(?:\\\n|[^\n])*)
+  | (?P<rawString>\b(?:u8|u|U|L)?R"(?P<delimiter>[^()\\\s"]{0,16})\(.*?\)(?P=delimiter)")
+  | (?P<string>"(?:\\.|\\\n|[^"\\\n])*"?)
+  | (?P<char>'(?:\\.|[^'\\\n])*'?)
+  | (?P<preprocessor>^[ \t]*\#(?:\\\n|\\.|[^\n/\\]|/(?![/*]))*)
+  | (?P<word>[A-Za-z_]\w*)
+  | (?P<punct>[{}();=])
+  | (?P<other>[^\s"'/{}();=A-Za-z_]+|/)
+""", re.VERBOSE | re.DOTALL | re.MULTILINE)
+
+#words that may precede '(' ... ')' '{' without the braces being the body of a function
+_CPP_CONTROL_WORDS = frozenset(['if', 'for', 'while', 'switch', 'catch', 'do', 'else', 'return', 'sizeof', 'decltype', 'alignof', 'defined'])
+
+
+def analyzeCppFile(sourceFile):
+    """function that counts linenumbers, comments, lines of code and function definitions in the supplied
+    C/C++ sourceFile.  The lexer handles // and /* */ comments, string (including raw string) and
+    character literals, and preprocessor lines: comment markers inside of literals do not count, and
+    neither do '#include' or '#define'.  A line of code is a line holding anything other than comments and
+    blanks.  A function definition is a name followed by a parameter list and a body outside of any other
+    function body (lambdas and local blocks do not count).  The function returns a tuple with the format
+    (numLines, numComments, numCodeLines, numFunctions).
+    This is a module level function so that it can be run in a process pool."""
+    text = _readSource(sourceFile)
+    numComments = 0     # Number of comments in the code
+    numCodeLines = 0    # Number of lines holding code
+    numFunctions = 0    # Number of function definitions
+
+    line = 1                #line number of the current token
+    pos = 0                 #position up to which lines have been counted
+    lastCodeLine = 0        #last line counted as a line of code
+    braces = []             #stack of open braces: True for the body of a function
+    functionDepth = 0       #number of function bodies the current token is in
+    parenDepth = 0
+    name = None             #the word preceding the last '(' at parenthesis depth 0
+    bSignature = False      #a parameter list has been closed; a '{' now opens a function body
+    prevWord = None         #the previous token if it was a word
+
+    for m in _CPP_TOKEN.finditer(text):
+        kind = m.lastgroup
+        start = m.start()
+        line += text.count('\n', pos, start)
+        pos = start
+
+        if kind == 'blockComment' or kind == 'lineComment':
+            numComments += 1
+            continue
+
+        #every line spanned by a code token is a line of code
+        endLine = line + text.count('\n', start, m.end())
+        if endLine > lastCodeLine:
+            numCodeLines += endLine - max(line, lastCodeLine + 1) + 1
+            lastCodeLine = endLine
+
+        if functionDepth > 0 and kind != 'punct':
+            continue                #only the braces matter inside of a function body
+        if kind == 'word':
+            prevWord = m.group()
+            continue
+        if kind == 'punct':
+            token = m.group()
+            if token == '{':
+                bBody = functionDepth == 0 and bSignature and parenDepth == 0
+                if bBody:
+                    numFunctions += 1
+                    functionDepth += 1
+                braces.append(bBody)
+                bSignature = False
+            elif token == '}':
+                if braces and braces.pop():
+                    functionDepth -= 1
+                bSignature = False
+            elif functionDepth > 0:
+                pass
+            elif token == '(':
+                if parenDepth == 0:
+                    name = prevWord
+                parenDepth += 1
+            elif token == ')':
+                if parenDepth > 0:
+                    parenDepth -= 1
+                    if parenDepth == 0 and name != None and name not in _CPP_CONTROL_WORDS:
+                        bSignature = True
+            elif parenDepth == 0:   #';' or '=': a declaration or an initialization, not a definition
+                bSignature = False
+        prevWord = None
+
+    return _countLines(text), numComments, numCodeLines, numFunctions
+
+
+def analyzeFiles(analyzer, sourceFiles, numWorkers=1, executor=None):
+    """function that applies analyzer (a module level function such as analyzePythonFile or analyzeCppFile) to every file
+    in sourceFiles.  With an executor (a process pool, e.g. the one shared by the workers of a grading run), or with more
+    than one worker, the files are analyzed in a process pool.  The function returns a dictionary that maps each source
+    file to its analytics."""
+    results = None
+    if executor != None and len(sourceFiles) > 0:
+        try:
+            results = list(executor.map(analyzer, sourceFiles))
+        except (OSError, RuntimeError):     #the process pool broke: analyze serially
+            results = None
+    elif numWorkers > 1 and len(sourceFiles) > 1 and concurrent != None:
+        chunkSize = max(1, len(sourceFiles) // (numWorkers * 4))
+        try:
+            with concurrent.futures.ProcessPoolExecutor(max_workers=numWorkers) as executor:
+                results = list(executor.map(analyzer, sourceFiles, chunksize=chunkSize))
+        except (OSError, RuntimeError):     #no process pool available here (or it broke): analyze serially
+            results = None
+
+    if results == None:
+        results = [analyzer(sourceFile) for sourceFile in sourceFiles]
+    return dict(zip(sourceFiles, results))
+
+
+#highlighted source listings (see highlightSource()).  The classes of the spans are styled by HIGHLIGHT_CSS.
+HIGHLIGHT_CSS = """pre.AG_source { font-family: Consolas, "Bitstream Vera Sans Mono", "Courier New", Courier, monospace; font-size: 1em;
+    line-height: 1.1em; background: white; border-left: 3px solid #6ce26c; padding: 0.3em 0; margin: 1em 0; overflow: auto; }
+pre.AG_source .ln:before { content: attr(data-n); display: inline-block; width: 3em; padding-right: 0.5em; margin-right: 0.8em;
+    text-align: right; color: #afafaf; }
+pre.AG_source .kw { color: #006699; font-weight: bold; }
+pre.AG_source .cm { color: #008200; }
+pre.AG_source .st { color: blue; }
+pre.AG_source .nu { color: #009900; }
+pre.AG_source .bi { color: #ff1493; }
+pre.AG_source .sp { color: gray; }
+pre.AG_source .pp { color: gray; }
+"""
+
+#script of a lazy report (see ReportWriter).  The sections are rendered from their json data when they come near the
+#window (or all at once by browsers without IntersectionObserver) and stay rendered, so the feedback typed into them is kept.
+LAZY_REPORT_SCRIPT = """
+<style type="text/css">
+body { margin-right: 17em; }
+#AG_nav { position: fixed; top: 0; right: 0; width: 15em; height: 100%; overflow: auto; padding: 0.5em; background: #f4f4f4;
+    border-left: 1px solid #cccccc; font-size: 0.8em; }
+#AG_nav a { display: block; overflow: hidden; white-space: nowrap; text-overflow: ellipsis; color: blue; text-decoration: none; }
+</style>
+<script type="text/javascript">
+var AG_index = JSON.parse(document.getElementById("AG_index").textContent);
+
+function AG_render(n)
+{
+  var section = document.getElementById("AG_section_" + n);
+  var data = document.getElementById("AG_data_" + n);
+  if (data)
+  {
+    section.innerHTML = JSON.parse(data.textContent);
+    section.style.minHeight = "";
+    data.parentNode.removeChild(data);
+    if (window.SyntaxHighlighter)     //listings left to the syntax highlighter script
+    {
+      var listings = [];
+      var pres = section.getElementsByTagName("pre");
+      for (var i = 0; i < pres.length; i++)
+        if (pres[i].className.indexOf("brush:") >= 0)
+          listings.push(pres[i]);
+      for (var i = 0; i < listings.length; i++)
+        SyntaxHighlighter.highlight({}, listings[i]);
+    }
+  }
+  return section;
+}
+
+function AG_feedbackText()
+{
+  //the feedback of a section that was never rendered is its initial text
+  var msg = "";
+  for (var n = 0; n < AG_index.length; n++)
+  {
+    if (AG_index[n].feedback === null)
+      continue;
+    var box = document.getElementById("AG_section_" + n).querySelector('textarea[name="student"]');
+    msg = msg + (box ? box.value : AG_index[n].feedback);
+    msg = msg + '\\n\\n-------------------------------------------------------\\n';
+  }
+  return msg;
+}
+
+(function()
+{
+  var nav = document.createElement("div");
+  nav.id = "AG_nav";
+  for (var n = 0; n < AG_index.length; n++)
+  {
+    var link = document.createElement("a");
+    link.href = "#AG_section_" + n;
+    link.textContent = AG_index[n].title;
+    link.onclick = (function(n) { return function() { AG_render(n).scrollIntoView(); return false; }; })(n);
+    nav.appendChild(link);
+  }
+  document.body.appendChild(nav);
+
+  if (window.IntersectionObserver)
+  {
+    var observer = new IntersectionObserver(function(entries)
+    {
+      for (var i = 0; i < entries.length; i++)
+      {
+        if (entries[i].isIntersecting)
+        {
+          observer.unobserve(entries[i].target);
+          AG_render(entries[i].target.getAttribute("data-n"));
+        }
+      }
+    }, {rootMargin: "100% 0px"});
+    for (var n = 0; n < AG_index.length; n++)
+      observer.observe(document.getElementById("AG_section_" + n));
+  }
+  else
+  {
+    for (var n = 0; n < AG_index.length; n++)
+      AG_render(n);
+  }
+})();
+</script>
+"""
+
+_PYTHON_BUILTINS = frozenset(name for name in dir(builtins) if not name.startswith('_'))
+_PYTHON_STRING_TOKENS = frozenset([tokenize.STRING] + [getattr(tokenize, name) for name in
+    ('FSTRING_START', 'FSTRING_MIDDLE', 'FSTRING_END') if hasattr(tokenize, name)])
+
+#tokens of the C/C++ highlighter.  Unlike _CPP_TOKEN, numbers are tokens and operators are left as plain text.
+_CPP_HIGHLIGHT_TOKEN = re.compile(r"""
+    (?P<cm>/\*.*?(?:\*/|\Z)|//(?:\\\n|[^\n])*)
+  | (?P<st>\b(?:u8|u|U|L)?R"(?P<delimiter>[^()\\\s"]{0,16})\(.*?\)(?P=delimiter)"
+        |(?:\b(?:u8|u|U|L))?"(?:\\.|\\\n|[^"\\\n])*"?
+        |(?:\b(?:u8|u|U|L))?'(?:\\.|[^'\\\n])*'?)
+  | (?P<pp>^[ \t]*\#(?:\\\n|\\.|[^\n/\\]|/(?![/*]))*)
+  | (?P<nu>(?:\b\d|\.\d)(?:[eEpP][+-]|[\w.]|'(?=\w))*)
+  | (?P<word>[A-Za-z_]\w*)
+""", re.VERBOSE | re.DOTALL | re.MULTILINE)
+
+_CPP_KEYWORDS = frozenset('''alignas alignof and and_eq asm auto bitand bitor bool break case catch char char16_t char32_t class
+    compl const constexpr const_cast continue decltype default delete do double dynamic_cast else enum explicit export extern
+    false float for friend goto if inline int long mutable namespace new noexcept not not_eq nullptr operator or or_eq private
+    protected public register reinterpret_cast return short signed sizeof static static_assert static_cast struct switch
+    template this thread_local throw true try typedef typeid typename union unsigned using virtual void volatile wchar_t
+    while xor xor_eq'''.split())
+_CPP_LIBRARY_NAMES = frozenset('std string vector map set cin cout cerr endl size_t'.split())
+
+
+def escapeHtml(text):
+    """function that escapes the characters of text that are special in html: &, <, > and \" """
+    return text.replace('&', '&amp;').replace('<', '&lt;').replace('>', '&gt;').replace('"', '&quot;')
+
+
+def _highlightPython(text):
+    """function that returns the list of (start, end, class) spans of the Python tokens in text that are highlighted.
+    If text does not tokenize (a syntax error), the text after the error is left plain."""
+    lineStarts = [0]     #offset of the start of each line (tokenize positions are (line, column))
+    for line in io.StringIO(text):
+        lineStarts.append(lineStarts[-1] + len(line))
+    spans = []
+    try:
+        for token in tokenize.generate_tokens(io.StringIO(text).readline):
+            tokenType, tokenString = token[0], token[1]
+            if tokenType == tokenize.COMMENT:
+                cls = 'cm'
+            elif tokenType in _PYTHON_STRING_TOKENS:
+                cls = 'st'
+            elif tokenType == tokenize.NUMBER:
+                cls = 'nu'
+            elif tokenType == tokenize.NAME and keyword.iskeyword(tokenString):
+                cls = 'kw'
+            elif tokenType == tokenize.NAME and (tokenString == 'self' or tokenString == 'cls'):
+                cls = 'sp'
+            elif tokenType == tokenize.NAME and tokenString in _PYTHON_BUILTINS:
+                cls = 'bi'
+            else:
+                continue
+            (startRow, startCol), (endRow, endCol) = token[2], token[3]
+            spans.append((lineStarts[startRow - 1] + startCol, lineStarts[endRow - 1] + endCol, cls))
+    except (tokenize.TokenError, SyntaxError):
+        pass
+    return spans
+
+
+def _highlightCpp(text):
+    """function that returns the list of (start, end, class) spans of the C/C++ tokens in text that are highlighted"""
+    spans = []
+    for m in _CPP_HIGHLIGHT_TOKEN.finditer(text):
+        cls = m.lastgroup
+        if cls == 'word':
+            word = m.group()
+            if word in _CPP_KEYWORDS:
+                cls = 'kw'
+            elif word in _CPP_LIBRARY_NAMES:
+                cls = 'bi'
+            else:
+                continue
+        spans.append((m.start(), m.end(), cls))
+    return spans
+
+
+def highlightSource(text, language):
+    """function that returns the source code text of the supplied language ('Python' or 'C++') as highlighted html: a
+    <pre class="AG_source"> element with a numbered line per line of text and the tokens wrapped in <span>s
+    styled by HIGHLIGHT_CSS.  All of the text is html escaped.  No script is needed to display the listing."""
+    if language == 'Python':
+        spans = _highlightPython(text)
+    elif language == 'C++':
+        spans = _highlightCpp(text)
+    else:
+        spans = []
+
+    #split the text into pieces that do not span lines, so every line is a complete html fragment
+    lines = [[]]
+    pos = 0
+    for start, end, cls in spans + [(len(text), len(text), None)]:
+        for pieceClass, piece in ((None, text[pos:start]), (cls, text[start:end])):
+            for i, part in enumerate(piece.split('\n')):
+                if i > 0:
+                    lines.append([])
+                if part == '':
+                    pass
+                elif pieceClass == None:
+                    lines[-1].append(escapeHtml(part))
+                else:
+                    lines[-1].append('<span class="' + pieceClass + '">' + escapeHtml(part) + '</span>')
+        pos = end
+    if len(lines) > 1 and lines[-1] == []:     #the text ends with a newline
+        lines.pop()
+
+    html = ['<pre class="AG_source">']
+    for n, line in enumerate(lines):
+        html.append('<span class="ln" data-n="' + str(n + 1) + '"></span>' + ''.join(line) + '\n')
+    html.append('</pre>')
+    return ''.join(html)
+
+
 class AutoGrader:
     """class to automatically analyze Python code by automating the input data and tabulating the output"""
     class Const:
@@ -45,6 +1694,54 @@ class AutoGrader:
         FEEDBACK_COLOR = "purple"   #color of "instructor feedback" text
         LINE_NUMBER_COLOR = "gray"  #color for code line numbers
         #CSS_DIRECTORY = ".css"
+        #progress reporting
+        PROGRESS_INTERVAL = 1.0     #minimum # of seconds between two progress reports
+        KILL_GRACE_PERIOD = 0.25    ## of seconds a timed-out process group has to exit after SIGTERM before SIGKILL is sent
+        MAXRSS_UNIT = 1 if sys.platform == 'darwin' else 1024    ## of bytes in a unit of ru_maxrss (see resource.getrusage())
+        MEMORY_SAMPLE_INTERVAL = 0.05   ## of seconds between two readings of the peak memory of a running program (see _startProcess())
+        SCRATCH_ROOTS = ['/dev/shm']    #preferred (tmpfs) locations of the scratch directories programs run in
+        #caches
+        DEFAULT_MAX_CACHE_SIZE = 512*1024*1024  #default size limit of each on-disk cache (bytes)
+        BUILD_CACHE = 'builds'                  #sub-directory of the cache directory that holds compiled executables
+        PCH_CACHE = 'pch'                       #sub-directory of the cache directory that holds precompiled headers
+        PCH_MIN_USES = 2                        #a header is precompiled once this many translation units of a run can use it
+        #compiler limits (0: no limit)
+        DEFAULT_MAX_COMPILE_TIME = 60                       #wall-clock seconds a compiler command may take
+        DEFAULT_MAX_COMPILE_CPU_TIME = 60                   #CPU seconds each compiler process may use
+        DEFAULT_MAX_COMPILE_MEMORY = 2*1024*1024*1024       #bytes of address space each compiler process may use
+        OBJECT_CACHE = 'objects'                #sub-directory of the cache directory that holds the object files of translation units
+        RESULT_CACHE = 'results'                #sub-directory of the cache directory that holds run results
+        INDEX_CACHE = 'index'                   #sub-directory of the cache directory that holds the submission indexes
+        #modules imported by the warm interpreter of the fork server (see ForkServer)
+        FORK_SERVER_PRELOAD = ['os', 're', 'math', 'random', 'string', 'collections', 'itertools', 'functools', 'time', 'datetime',
+            'json', 'io', 'copy', 'heapq', 'bisect', 'decimal', 'fractions', 'statistics']
+        SYNTAX_CACHE = 'syntax'                 #sub-directory of the cache directory that holds Python syntax check results
+        HIGHLIGHT_CACHE = 'highlight'           #sub-directory of the cache directory that holds highlighted source listings
+        #Python syntax check: the script is read by the student's interpreter from stdin and byte-compiles the files named on
+        #its command line without writing .pyc files.  It writes a json object that maps each file to its syntax error message
+        #(or null).  Compiler warnings are not errors and are not shown.
+        PYTHON_SYNTAX_CHECK = '''import sys, traceback, json, warnings
+warnings.simplefilter('ignore')
+errors = {}
+for name in sys.argv[1:]:
+    f = open(name, 'rb')
+    source = f.read()
+    f.close()
+    try:
+        compile(source, name, 'exec')
+        errors[name] = None
+    except (SyntaxError, ValueError, TypeError):
+        e = sys.exc_info()
+        errors[name] = ''.join(traceback.format_exception_only(e[0], e[1]))
+sys.stdout.write(json.dumps(errors))
+'''
+        SYNTAX_CHECK_MAX_BYTES = 1024*1024      #max # of bytes of the output of one syntax check
+        #archives of submissions (see ArchiveExtractor)
+        MAX_ARCHIVE_BYTES = 1024*1024*1024      #max # of bytes extracted from one archive (nested archives included)
+        MAX_ARCHIVE_FILES = 10000               #max # of files extracted from one archive
+        MAX_ARCHIVE_DEPTH = 3                   #max # of levels of archives within archives
+        #submission discovery
+        DEFAULT_SKIP_DIRS = ['__pycache__', '.git', '*_output']     #directories that never hold submissions
 
     def __init__(self):
         if sys.version_info >= (3, 0):
@@ -52,6 +1749,34 @@ class AutoGrader:
         else:
             self.python2 = True
 
+        #progressHook is called with a progress message while programs run.  Set it to None to silence
+        #the progress reports.  Reports are rate-limited to one every Const.PROGRESS_INTERVAL seconds.
+        self.progressHook = print
+        self._lastProgressTime = 0.0
+        self._progressLock = threading.Lock()
+
+        #limits the # of compiler processes running at the same time (None: no limit).  Set by processFiles().
+        self._compilerSlots = None
+        #(wall-clock seconds, CPU seconds, bytes of memory) allowed to each compiler command.  Set by processFiles().
+        self._compileLimits = (AutoGrader.Const.DEFAULT_MAX_COMPILE_TIME, AutoGrader.Const.DEFAULT_MAX_COMPILE_CPU_TIME,
+            AutoGrader.Const.DEFAULT_MAX_COMPILE_MEMORY)
+        #(CPU seconds, bytes of memory, bytes per file written, # of processes) allowed to each run (0: no limit).  Set by processFiles().
+        self._runLimits = (0, 0, 0, 0)
+        #directory of the scratch directories of the runs (see _scratchRoot())
+        self._scratchRootDirectory = None
+
+    def _reportProgress(self, msg):
+        """function that passes msg to the progressHook unless a progress report was made less than
+        Const.PROGRESS_INTERVAL seconds ago.  Safe to call from concurrent workers."""
+        if self.progressHook == None:
+            return
+        with self._progressLock:
+            now = time.time()
+            if now - self._lastProgressTime < AutoGrader.Const.PROGRESS_INTERVAL:
+                return
+            self._lastProgressTime = now
+        self.progressHook(msg)
+
     def openFile(self, *arg):
         '''create a stub for the file() function which exists in Python2, but is replaced by the open() function in Python3.
         Also, take advantage of this stub to specify the unicode encoding for Python3'''
@@ -61,115 +1786,101 @@ class AutoGrader:
             return open(*arg, encoding='utf-8')
     
     def analyzeCppCode(self, sourceFile):
-        """function that counts linenumbers, and estimates the # of comments in
-        the supplied C++ sourceFile.  The function returns a tuple with the format
-        (numLines, numComments)."""
-        numLines = 0        # Number of lines of code
-        numComments = 0     # Number of comments in the code
-
-        f=self.openFile(sourceFile)
-        for line in f:
-            numLines += 1;
-            loc = 0
-            while (loc != -1):       #count the # of times the '/*' characters appears
-                loc = line.find("#", loc)
-                if (loc != -1):
-                    loc += 1
-                    numComments += 1
-                    
-            loc = 0
-            loc = line.find('//', loc)      #count the # of times the '//' characters appears
-            if (loc != -1):
-                loc += 1
-                numComments += 1
-                       
-        f.close()
-        return numLines, numComments
+        """function that counts linenumbers, comments, lines of code and function definitions in
+        the supplied C/C++ sourceFile (see analyzeCppFile()).  The function returns a tuple with the format
+        (numLines, numComments, numCodeLines, numFunctions)."""
+        return analyzeCppFile(sourceFile)
 
-
-
-        
+    def analyzeCppFiles(self, sourceFiles, numWorkers=1, executor=None):
+        """function that analyzes all of the supplied C/C++ source files in one call; the files of a
+        submission or of the whole class (see analyzeFiles()).  Returns a dictionary that maps each file to
+        the tuple returned by analyzeCppCode()."""
+        return analyzeFiles(analyzeCppFile, sourceFiles, numWorkers, executor)
 
     def analyzePythonCode(self, sourceFile):
-        """function that counts linenumbers, and estimates the # of comments and # of tokens in
-        the supplied Python sourceFile.  The function returns a tuple with the format
+        """function that counts linenumbers, comments, docstrings, functions and classes in
+        the supplied Python sourceFile (see analyzePythonFile()).  The function returns a tuple with the format
         (numLines, numDocStr, numComments, numDefs, numClasses)."""
-        numLines = 0        # Number of lines of code
-        numDocStr = 0       # Number of doc strings in code
-        numComments = 0     # Number of comments in the code
-        numDefs = 0         # Number of functions
-        numClasses = 0      # Number of classes
-        f=self.openFile(sourceFile)
-        for line in f:
-            numLines += 1;
-            loc = 0
-            while (loc != -1):       #count the # of times the '#' characters appears
-                loc = line.find("#", loc)
-                if (loc != -1):
-                    loc += 1
-                    numComments += 1
-            loc = 0
-            while (loc != -1):
-                loc = line.find('"#', loc)      #discount the # of times the '#' char appears as the 1st char in double quotes (skip hex constants)
-                if (loc != -1):
-                    loc += 1
-                    numComments -= 1
-            loc = 0
-            while (loc != -1):
-                loc = line.find("'#", loc)      #discount the # of times the '#' char appears as the 1st char in single quotes (skip hex constants)
-                if (loc != -1):
-                    loc += 1
-                    numComments -= 1
-            loc = 0
-            while (loc != -1):                  #count the # of ''' found
-                loc = line.find("'''", loc)
-                if (loc != -1):
-                    loc += 1
-                    numDocStr += 1
-            loc = 0
-            while (loc != -1):                  #count the # of """ found
-                loc = line.find('"""', loc)
-                if (loc != -1):
-                    loc += 1
-                    numDocStr += 1
-
-            if line.strip(AutoGrader.Const.PYTHON_WHITE_SPACES) != '':
-                if line.strip(AutoGrader.Const.PYTHON_WHITE_SPACES).split()[0] == 'def':              #count # of defs
-                    numDefs += 1
-                if line.strip(AutoGrader.Const.PYTHON_WHITE_SPACES).split()[0] == 'class':            #count # of classes
-                    numClasses += 1
-                       
-        f.close()
-        numDocStr /= 2       #assume that the """ and ''' chars appear in pairs   
-        return numLines, numDocStr, numComments, numDefs, numClasses
-
-    def _MakeHtmlHeader(self, outputFile, language, title="AutoGrader", header_text=""):
-        """create the html header in the supplied outputFile"""
+        return analyzePythonFile(sourceFile)
+
+    def analyzePythonFiles(self, sourceFiles, numWorkers=1, executor=None):
+        """function that analyzes all of the supplied Python source files in one call; the files of a
+        submission or of the whole class (see analyzeFiles()).  Returns a dictionary that maps each file to
+        the tuple returned by analyzePythonCode()."""
+        return analyzeFiles(analyzePythonFile, sourceFiles, numWorkers, executor)
+
+    def _startAnalysisPool(self, numWorkers):
+        """function that returns a process pool of numWorkers processes in which the workers of a grading run analyze
+        their source files (see analyzeFiles()), or None for a single worker or without concurrent.futures.  The
+        processes are started right away, before the grading threads are, so that none of them is forked while a
+        grading thread holds a lock.  The caller shuts the pool down."""
+        if numWorkers <= 1 or concurrent == None:
+            return None
+        try:
+            executor = concurrent.futures.ProcessPoolExecutor(max_workers=numWorkers)
+            executor.submit(len, '').result()
+        except (OSError, RuntimeError, NotImplementedError):    #no process pool available here
+            return None
+        return executor
+
+    def _MakeHtmlHeader(self, report, language, title="AutoGrader", header_text="", assetDirectory=None, bHighlighted=False):
+        """create the html header in the supplied report.  With an assetDirectory (the directory of the report), the
+        highlighter scripts and style sheet are not inlined: the report refers to shared asset files (see _writeAsset()).
+        With bHighlighted, the listings are highlighted ahead of time (see highlightSource()): only their style sheet is
+        included and no script runs when the report is opened."""
 
         if language == 'C++':
             brush = shBrushCpp_js
         if language == 'Python':
             brush = shBrushPython_js
+
+        if bHighlighted and assetDirectory == None:
+            assets = '''
+	<style type="text/css" rel="stylesheet">''' + HIGHLIGHT_CSS + '''</style>'''
+        elif bHighlighted:
+            assets = '''
+	<link type="text/css" rel="stylesheet" href="''' + self._writeAsset(assetDirectory, HIGHLIGHT_CSS, '.css') + '''" />'''
+        elif assetDirectory == None:
+            assets = '''
+	<script type="text/javascript">''' + shCore_js + '''</script>
+	<script type="text/javascript">''' + brush + '''</script>
+	<style type="text/css" rel="stylesheet">''' + shCoreDefault_css + '''</style>
+	<script type="text/javascript">SyntaxHighlighter.all();</script>'''
+        else:
+            assets = '''
+	<script type="text/javascript" src="''' + self._writeAsset(assetDirectory, shCore_js + '\n' + brush, '.js') + '''"></script>
+	<link type="text/css" rel="stylesheet" href="''' + self._writeAsset(assetDirectory, shCoreDefault_css, '.css') + '''" />
+	<script type="text/javascript">SyntaxHighlighter.all();</script>'''
             
         html_header = '''
 <!DOCTYPE html PUBLIC "-//W3C//DTD XHTML 1.0 Strict//EN" "http://www.w3.org/TR/xhtml1/DTD/xhtml1-strict.dtd">
 <html xmlns="http://www.w3.org/1999/xhtml" xml:lang="en" lang="en">
 <head>
 	<meta http-equiv="Content-Type" content="text/html; charset=UTF-8" />
-	<title>''' + title + '''</title>
-	<script type="text/javascript">''' + shCore_js + '''</script>
-	<script type="text/javascript">''' + brush + '''</script>
-	<style type="text/css" rel="stylesheet">''' + shCoreDefault_css + '''</style>
-	<script type="text/javascript">SyntaxHighlighter.all();</script>
+	<title>''' + title + '''</title>''' + assets + '''
 </head>
 
 <body style="background: white; font-family: Helvetica">
 <form encrypt="multipart/form-data" action="" method="POST">
 <h1>''' + header_text + '''</h1>
         '''
-        f=self.openFile(outputFile, "a")    #open for appending
-        f.write(html_header)
-        f.close()
+        report.write(html_header)
+
+
+    def _writeAsset(self, directory, text, extension):
+        """function that writes text to the asset file named after its contents (AG_assets_<hash><extension>) in directory,
+        unless the file already exists, and returns the name of the file.  Reports with the same assets share the file."""
+        data = text.encode('utf-8')
+        name = 'AG_assets_' + FileCache.makeKey(data)[:16] + extension
+        path = os.path.join(directory, name)
+        if not os.path.isfile(path):
+            #write a temporary file and rename it, so a concurrent grader never reads a partial asset
+            fd, tempPath = tempfile.mkstemp(prefix='.' + name, dir=directory)
+            with os.fdopen(fd, 'wb') as f:
+                f.write(data)
+            os.chmod(tempPath, 0o644)
+            os.rename(tempPath, path)
+        return name
 
 
     def _removeFile(self, filename):
@@ -182,170 +1893,716 @@ class AutoGrader:
             pass
 
 
-    def _fileHead(self, sourceFile, destFile, maxNumLines, maxNumBytes):
-        """function that appends the first maxNumLines lines or first maxNumBytes bytes (whichever is smaller) from sourceFile to destFile."""
-        #os.system('head -n ' + str(numLines) +' "' + sourceFile +'" >> "' + destFile + '"')
-        os.system('head -c ' + str(maxNumBytes) + ' "' + sourceFile + '" | head -n ' + str(maxNumLines) + ' >> "' + destFile + '"')
+    def _decodeOutput(self, data):
+        """function that converts output captured from a child process (bytes) to text for the report"""
+        if self.python2 == True:
+            return data
+        return data.decode('utf-8', 'replace')
 
 
     def _threadExec(self, cmd):
         os.system(cmd)  #execute the py script in a shell
         return
 
-    def _compileCppFiles(self, compiler, sourceFiles, outputFile, exeFile, maxOutputLines):
-        f=self.openFile(outputFile, "a")    #open for appending
+
+    def _startProcess(self, args, **kwargs):
+        """function that starts a child process (see subprocess.Popen) as the leader of a new session,
+        and therefore of a new process group, so the child and everything it spawns can be killed together.
+        Returns the Popen object and a threading.Event that is set once the child has terminated.
+        A watcher thread sits in the OS wait for the child, so no CPU is used while the child runs.  The child
+        is reaped with os.wait4(): the Popen object gets the time the child terminated (endTime) and the
+        (user CPU seconds, system CPU seconds, peak resident memory in bytes, bMemoryBound, bMemorySampled) it used
+        (resourceUsage).  The peak memory reported by wait4() includes the memory of this process, which the child
+        shares until it executes its program, so it is not used.  Instead the high-water mark of the resident memory of
+        the program (VmHWM, Linux) is read every Const.MEMORY_SAMPLE_INTERVAL seconds while it runs: the last reading is
+        the peak memory, a lower bound (bMemorySampled) as the program may grow after it.  The peak memory is None if the
+        program could not be sampled (no /proc, or it ended within the first interval)."""
+        if self.python2:
+            p = subprocess.Popen(args, preexec_fn=os.setsid, **kwargs)     #Python2 has no start_new_session
+        else:
+            p = subprocess.Popen(args, start_new_session=True, **kwargs)
+        p.endTime = None
+        p.resourceUsage = None
+
+        done = threading.Event()
+        lock = threading.Lock()
+        bSample = hasattr(os, 'waitid') and os.path.isfile('/proc/' + str(p.pid) + '/status')
+        bExited = [False]       #the child has terminated (it is not reaped before the sampler knows)
+        peak = [None]           #last reading of the high-water mark of the program's resident memory
+
+        def sample():
+            #the high-water mark starts over when the child executes its program: the last reading is the peak of the program
+            while not done.wait(AutoGrader.Const.MEMORY_SAMPLE_INTERVAL):
+                with lock:
+                    if bExited[0]:
+                        return
+                    rss = self._peakResidentMemory(p.pid)
+                if rss != None:
+                    peak[0] = rss
+
+        def watch():
+            if bSample:
+                #wait for the child to terminate without reaping it, so that its pid is not reused while it is sampled
+                try:
+                    os.waitid(os.P_PID, p.pid, os.WEXITED | os.WNOWAIT)
+                except OSError:
+                    pass
+                with lock:
+                    bExited[0] = True
+            if hasattr(os, 'wait4'):
+                _, status, usage = os.wait4(p.pid, 0)
+                p.endTime = time.time()
+                p.returncode = -os.WTERMSIG(status) if os.WIFSIGNALED(status) else os.WEXITSTATUS(status)
+                p.resourceUsage = (usage.ru_utime, usage.ru_stime, peak[0], False, peak[0] != None)
+            else:
+                p.wait()
+                p.endTime = time.time()
+            done.set()
+
+        watcher = threading.Thread(target=watch)
+        watcher.daemon = True
+        watcher.start()
+        if bSample:
+            sampler = threading.Thread(target=sample)
+            sampler.daemon = True
+            sampler.start()
+        return p, done
+
+
+    def _peakResidentMemory(self, pid):
+        """function that returns the high-water mark of the resident memory (VmHWM) of the running process pid in bytes,
+        or None if it cannot be read (e.g. the process has terminated)"""
+        try:
+            with open('/proc/' + str(pid) + '/status') as f:
+                for line in f:
+                    if line.startswith('VmHWM:'):
+                        return int(line.split()[1]) * 1024
+        except (IOError, OSError, ValueError, IndexError):
+            pass
+        return None
+
+
+    def _limitedArgs(self, args):
+        """function that returns the argument list args of a program, wrapped so that the program is executed with the resource
+        limits of a run (self._runLimits, see processFiles()).  As for the compilers, the limits are set by the shell (ulimit),
+        which then replaces itself with the program: no Python code runs in the child after the fork.  A limit above the hard
+        limit of the grader is left at the hard limit."""
+        maxCpuTime, maxMemory, maxFileSize, maxProcesses = [int(x) for x in self._runLimits]
+        limits = ''
+        if maxCpuTime > 0:
+            #the CPU time limit sends SIGXCPU (soft limit) before SIGKILL (hard limit)
+            limits += 'ulimit -S -t ' + str(maxCpuTime) + ' 2>/dev/null; ulimit -H -t ' + str(maxCpuTime + 1) + ' 2>/dev/null; '
+        if maxMemory > 0:
+            limits += 'ulimit -v ' + str(max(1, maxMemory // 1024)) + ' 2>/dev/null; '
+        if maxFileSize > 0:
+            limits += 'ulimit -f ' + str((maxFileSize + 511) // 512) + ' 2>/dev/null; '     #512 byte blocks
+        if maxProcesses > 0:
+            #the # of processes is 'ulimit -u' in bash and 'ulimit -p' in dash
+            limits += '{ ulimit -u ' + str(maxProcesses) + ' || ulimit -p ' + str(maxProcesses) + '; } 2>/dev/null; '
+        if limits == '':
+            return args
+        return ['/bin/sh', '-c', limits + 'exec "$@"', 'AG_limits'] + list(args)
+
+
+    def _rlimits(self):
+        """function that returns the resource limits of a run as a list of (name of the resource.RLIMIT_ constant, value)"""
+        if resource == None:
+            return []
+        maxCpuTime, maxMemory, maxFileSize, maxProcesses = self._runLimits
+        limits = [('RLIMIT_CPU', int(maxCpuTime)), ('RLIMIT_AS', int(maxMemory)), ('RLIMIT_FSIZE', int(maxFileSize)),
+            ('RLIMIT_NPROC', int(maxProcesses))]
+        return [(name, value) for name, value in limits if value > 0 and hasattr(resource, name)]
+
+
+    def _killProcessGroup(self, p, done):
+        """function that terminates the process group led by p (see _startProcess()).  The group is sent
+        SIGTERM and given Const.KILL_GRACE_PERIOD seconds to exit before the whole group is sent SIGKILL.
+        The function returns once p has actually been reaped."""
+        for sig in (signal.SIGTERM, signal.SIGKILL):
+            try:
+                os.killpg(p.pid, sig)
+            except OSError:     #the process group no longer exists
+                pass
+            #processes of the group may outlive the group leader, so SIGKILL is always sent
+            done.wait(AutoGrader.Const.KILL_GRACE_PERIOD)
+        done.wait()
+
+
+    def _waitForProcess(self, done, maxRunTime, label):
+        """function that blocks until the done event of a process started by _startProcess() is set or until
+        maxRunTime seconds have elapsed (wait indefinitely if maxRunTime <= 0).  Returns True if the process
+        terminated in time."""
+        start_time = time.time()
+        while not done.is_set():
+            timeout = AutoGrader.Const.PROGRESS_INTERVAL
+            if maxRunTime > 0:
+                remaining = start_time + maxRunTime - time.time()
+                if remaining <= 0:
+                    break
+                timeout = min(timeout, remaining)
+            if not done.wait(timeout):
+                self._reportProgress("still running " + label + " ({0:.0f} secs.)...".format(time.time() - start_time))
+        return done.is_set()
+
+
+    def _finishCapture(self, p, done, capture):
+        """function that waits for capture (see OutputCapture) to reach the end of the output of the process p once
+        p has terminated.  Processes of p's group that outlive p and hold the pipe open are killed."""
+        if not capture.join(AutoGrader.Const.KILL_GRACE_PERIOD):
+            self._killProcessGroup(p, done)
+            capture.join()
+
+
+    def _buildKey(self, compiler, sourceFiles, maxOutputLines):
+        """function that returns the build cache key of a C++ submission: a hash of the compiler command line and limits
+        and of the names and contents of all of the source files (including headers)"""
+        parts = [compiler, str(maxOutputLines), repr(self._compileLimits)]
+        for sourceFile in sourceFiles:
+            parts += [sourceFile, FileCache.hashFile(sourceFile)]
+        return FileCache.makeKey(*parts)
+
+
+    def _linkOrCopy(self, sourceFile, destFile):
+        """function that hard links destFile to sourceFile, or copies sourceFile when a link is not possible"""
+        try:
+            os.link(sourceFile, destFile)
+        except OSError:     #different file systems, etc.
+            shutil.copy2(sourceFile, destFile)
+
+
+    def _limitOutput(self, text, maxNumLines, maxNumBytes):
+        """function that returns the first maxNumLines lines or maxNumBytes characters of text, whichever is
+        shorter (the limits of OutputCapture applied to text that has already been captured)"""
+        text = text[:maxNumBytes]
+        end = -1
+        for i in range(maxNumLines):
+            end = text.find('\n', end + 1)
+            if end == -1:
+                return text
+        return text[:end + 1]
+
+
+    def _runCompiler(self, args, maxOutputLines):
+        """function that runs the compiler command line args (a shell command) and returns the first maxOutputLines
+        lines of its output, and whether the compiler was stopped by one of the compile limits (see processFiles()).
+        The CPU time and memory limits are set by the shell (ulimit) and so apply to every process the compiler
+        starts; a command that exceeds the wall-clock limit is killed with its whole process group.
+        No more than the number of compiler slots (see processFiles()) run at the same time."""
+        maxTime, maxCpuTime, maxMemory = self._compileLimits
+        limits = ''
+        if maxCpuTime > 0:
+            limits += 'ulimit -t ' + str(int(maxCpuTime)) + ' 2>/dev/null; '
+        if maxMemory > 0:
+            limits += 'ulimit -v ' + str(int(maxMemory // 1024)) + ' 2>/dev/null; '
+
+        if self._compilerSlots != None:
+            self._compilerSlots.acquire()
+        try:
+            print ("compiling:" + args)
+            p, done = self._startProcess(limits + args, shell=True, stdout=subprocess.PIPE, stderr=subprocess.STDOUT)
+
+            #keep the first maxOutputLines of the compiler output for the output file
+            #Also, limit the # bytes to 40*maxOutputLines (this avoids large output files due to ridiculously long lines)
+            capture = OutputCapture(p.stdout, maxOutputLines, 40*maxOutputLines)
+            bFinished = self._waitForProcess(done, maxTime, 'compiler')
+            if not bFinished:
+                print ("Killing compiler process group {0}. Compile time exceeds max value of {1} seconds.".format(p.pid, maxTime))
+                self._killProcessGroup(p, done)
+            self._finishCapture(p, done, capture)
+        finally:
+            if self._compilerSlots != None:
+                self._compilerSlots.release()
+
+        output = self._decodeOutput(capture.getvalue())
+        msg = None
+        if not bFinished:
+            msg = "Maximum compile time of {0} seconds exceeded.  Compiler forcefully terminated.".format(maxTime)
+        elif p.returncode < 0 or p.returncode > 128:    #the shell reports a compiler killed by a signal as 128 + signal
+            msg = "Compiler terminated by signal {0} (compile limits: {1} CPU seconds, {2} MB of memory).".format(
+                -p.returncode if p.returncode < 0 else p.returncode - 128, maxCpuTime, maxMemory // (1024*1024))
+        elif maxCpuTime > 0 or maxMemory > 0:
+            #the compiler driver reports the processes it started that were killed (by the CPU time limit) or ran out of memory
+            if 'terminated program' in output or 'memory exhausted' in output or 'out of memory' in output:
+                msg = "Compile limits exceeded ({0} CPU seconds, {1} MB of memory).".format(maxCpuTime, maxMemory // (1024*1024))
+        if msg != None:
+            output += '<font color="' + AutoGrader.Const.ERROR_COLOR + '">' + msg + '</font>\n'
+        return output, msg != None
+
+
+    def _readDepFile(self, depFile):
+        """function that returns the list of files a translation unit depends on (not including the unit itself),
+        read from the make rule written by the compiler option -MMD (or -MD) to depFile"""
+        with open(depFile, 'rb') as f:
+            text = f.read().decode('utf-8', 'replace')
+        text = text.replace('\\\n', ' ')       #join the continuation lines
+        prerequisites = text.split(': ', 1)[1] if ': ' in text else ''
+        #names are separated by blanks; blanks within names are escaped with a '\'
+        names = [name.replace('\\ ', ' ').replace('$$', '$') for name in re.split(r'(?<!\\)\s+', prerequisites.strip()) if name]
+        return names[1:]
+
+
+    def _objectKey(self, compiler, unit, unitHash, dependencies, maxOutputLines):
+        """function that returns the object cache key of a translation unit: a hash of the compiler command line and limits,
+        of maxOutputLines (the cached compiler output is limited to it), and of the names and contents of the unit and of the
+        files it depends on.  Returns None if a dependency no longer exists."""
+        parts = [compiler, str(maxOutputLines), repr(self._compileLimits), unit, unitHash]
+        for dependency in dependencies:
+            if not os.path.isfile(dependency):
+                return None
+            parts += [dependency, FileCache.hashFile(dependency)]
+        return FileCache.makeKey(*parts)
+
+
+    def _compileWithPch(self, makeArgs, unit, outputFile, maxOutputLines, precompiledHeaders):
+        """function that runs the compiler command line makeArgs(options) to compile unit into outputFile, and returns
+        the compiler output and whether the compiler was stopped by a compile limit (see _runCompiler()).  If precompiledHeaders (PrecompiledHeaders) has a precompiled header for the unit, the unit
+        is compiled with it first; should that compilation fail because of the precompiled header (see
+        PrecompiledHeaders.isFailure()), the unit is compiled again without it, so a submission never fails because of the
+        precompiled header.  Other compile errors are reported without compiling the unit twice."""
+        if precompiledHeaders == None:
+            return self._runCompiler(makeArgs(''), maxOutputLines)
+
+        key, header = precompiledHeaders.headerFor(unit)
+        if header != None:
+            start_time = time.time()
+            output, bLimitExceeded = self._runCompiler(makeArgs('-include "' + header + '" '), maxOutputLines)
+            if os.path.isfile(outputFile):
+                precompiledHeaders.recordCompile(key, header, time.time() - start_time)
+                return output, bLimitExceeded
+            if bLimitExceeded or not precompiledHeaders.isFailure(header, output):
+                return output, bLimitExceeded   #the unit itself does not compile (or would exceed the limits again)
+        start_time = time.time()
+        output, bLimitExceeded = self._runCompiler(makeArgs(''), maxOutputLines)
+        if os.path.isfile(outputFile):
+            precompiledHeaders.recordCompile(key, None, time.time() - start_time)
+        return output, bLimitExceeded
+
+
+    def _compileUnit(self, compiler, unit, objFile, maxOutputLines, objectCache, precompiledHeaders=None):
+        """function that compiles the translation unit into an object file.  With an objectCache (FileCache), the object
+        file of an unchanged unit is reused: the unit's manifest (keyed by its contents) lists the local headers it included
+        last time, and the object is looked up under a key covering the unit and these headers (see _objectKey()).
+        Returns the name of the object file (None if the compilation failed), the compiler output and whether the compiler
+        was stopped by a compile limit.  Such a compilation is not cached, as the limit may only have been hit under load."""
+        if objectCache != None:
+            unitHash = FileCache.hashFile(unit)
+            manifestKey = FileCache.makeKey(compiler, 'manifest', unit, unitHash)
+            entry = objectCache.lookup(manifestKey)
+            if entry != None:
+                objectKey = self._objectKey(compiler, unit, unitHash, json.loads(objectCache.readText(entry, 'dependencies.json')),
+                    maxOutputLines)
+                objectEntry = objectCache.lookup(objectKey) if objectKey != None else None
+                if objectEntry != None:
+                    print ("using cached object " + objectKey)
+                    self._linkOrCopy(objectEntry + '/unit.o', objFile)
+                    return objFile, objectCache.readText(objectEntry, 'compiler_output.txt'), False
+
+        depFile = objFile[:-2] + '.d'
+        output, bLimitExceeded = self._compileWithPch(lambda options: '"' + compiler + '" ' + options + '-c -o "' + objFile + '" -MMD -MF "' + depFile + '" "' + unit + '"',
+            unit, objFile, maxOutputLines, precompiledHeaders)
+        if not os.path.isfile(objFile):
+            return None, output, bLimitExceeded     #failed compilations are not cached: the depfile is missing
+
+        if objectCache != None and not bLimitExceeded:
+            dependencies = self._readDepFile(depFile)
+            objectKey = self._objectKey(compiler, unit, unitHash, dependencies, maxOutputLines)
+            if objectKey != None:
+                objectCache.store(objectKey, {'unit.o': objFile}, {'compiler_output.txt': output})
+                #the manifest follows the headers the unit includes now
+                objectCache.store(manifestKey, texts={'dependencies.json': json.dumps(dependencies)}, bReplace=True)
+        return objFile, output, bLimitExceeded
+
+
+    def _buildProject(self, compiler, units, exeFile, maxOutputLines, objectCache, precompiledHeaders=None):
+        """function that builds exeFile from several translation units: each unit is compiled into an object
+        file (see _compileUnit()), the units concurrently, and the object files are then linked.
+        Returns the compiler and linker output, and whether a compiler or the linker was stopped by a compile limit."""
+        objDirectory = tempfile.mkdtemp(prefix='AG_objects_', dir=os.path.dirname(os.path.abspath(exeFile)))
+        try:
+            def compileUnit(i):
+                return self._compileUnit(compiler, units[i], objDirectory + '/' + str(i) + '.o', maxOutputLines, objectCache, precompiledHeaders)
+
+            if concurrent != None:
+                with concurrent.futures.ThreadPoolExecutor(max_workers=len(units)) as executor:
+                    compiled = list(executor.map(compileUnit, range(len(units))))
+            else:
+                compiled = [compileUnit(i) for i in range(len(units))]
+
+            output = ''.join([unitOutput for objFile, unitOutput, bUnitLimitExceeded in compiled])
+            bLimitExceeded = True in [bUnitLimitExceeded for objFile, unitOutput, bUnitLimitExceeded in compiled]
+            if None not in [objFile for objFile, unitOutput, bUnitLimitExceeded in compiled]:
+                link_args = '"' + compiler + '" -o "' + exeFile + '" '
+                for objFile, unitOutput, bUnitLimitExceeded in compiled:
+                    link_args = link_args + '"' + objFile + '" '
+                linkOutput, bLinkLimitExceeded = self._runCompiler(link_args, maxOutputLines)
+                output += linkOutput
+                bLimitExceeded = bLimitExceeded or bLinkLimitExceeded
+        finally:
+            shutil.rmtree(objDirectory, ignore_errors=True)
+
+        return self._limitOutput(output, maxOutputLines, 40*maxOutputLines), bLimitExceeded
+
+
+    def _compileCppFiles(self, compiler, sourceFiles, report, exeFile, maxOutputLines, buildCache=None, bRenderOnly=False, objectCache=None, precompiledHeaders=None):
+        """function that compiles sourceFiles into exeFile and reports the compiler output.  When a buildCache
+        (FileCache) is supplied, unchanged submissions reuse the executable and compiler output of a previous build.
+        With bRenderOnly, the compiler is never run; only the cached compiler output is reported.
+        Projects with several translation units are built one unit at a time (see _buildProject()); with
+        an objectCache (FileCache), only the units that changed are compiled again.  precompiledHeaders (PrecompiledHeaders)
+        supplies precompiled headers for the units that can use one.
+        A build stopped by a compile limit is not cached, as the limit may only have been hit under load.
+        Returns True if the build succeeded."""
         #Delineate the start of the unformatted py code output with a token: PROG_OUTPUT_START_TOKEN.
         #Flank with '\n's to ensure the token is on a line by itself
-        f.write ('<font face="verdana" color=" ' +AutoGrader.Const.HEADER_COLOR2 + '"><br>\n------------- compiler output -------------</font>\n')
-        f.write('<pre><font face="courier" color="' + AutoGrader.Const.OUTPUT_COLOR + '">')
-        f.close()
+        report.write ('<font face="verdana" color=" ' +AutoGrader.Const.HEADER_COLOR2 + '"><br>\n------------- compiler output -------------</font>\n')
+        report.write('<pre><font face="courier" color="' + AutoGrader.Const.OUTPUT_COLOR + '">')
 
-        tmpFile = outputFile.strip() + '.AB'
-        self._removeFile(tmpFile)
         self._removeFile(exeFile)
-        #compile the code
-        compile_args = '"' + compiler + '" -o "' + exeFile +'" '
 
-        for sourceFile in sourceFiles:
-            #include only .cpp files (not .h or .hpp files) on the g++ command line
-            if sourceFile[-4:] == '.cpp' or sourceFile[-3:] == '.cc':
-                compile_args = compile_args + '"' + sourceFile+ '" '
+        if buildCache != None:
+            key = self._buildKey(compiler, sourceFiles, maxOutputLines)
+            entry = buildCache.lookup(key)
+            if entry != None:
+                print ("using cached build " + key)
+                #failed builds are cached without an executable
+                bBuilt = os.path.isfile(entry + '/AG.out')
+                if bBuilt and not bRenderOnly:
+                    self._linkOrCopy(entry + '/AG.out', exeFile)
+                self._writeOutput(buildCache.readText(entry, 'compiler_output.txt'), report)
+                report.write('</font></pre>')
+                return bBuilt
+
+        if bRenderOnly:
+            self._reportErrorMsg("No cached build available (render only).", report)
+            report.write('</font></pre>')
+            return False
+
+        #include only .cpp files (not .h or .hpp files) on the g++ command line
+        units = [sourceFile for sourceFile in sourceFiles if sourceFile[-4:] == '.cpp' or sourceFile[-3:] == '.cc']
+
+        if len(units) > 1:
+            compilerOutput, bLimitExceeded = self._buildProject(compiler, units, exeFile, maxOutputLines, objectCache, precompiledHeaders)
+        elif len(units) == 1:
+            #compile the code
+            compilerOutput, bLimitExceeded = self._compileWithPch(lambda options: '"' + compiler + '" ' + options + '-o "' + exeFile + '" "' + units[0] + '" ',
+                units[0], exeFile, maxOutputLines, precompiledHeaders)
+        else:
+            compilerOutput, bLimitExceeded = self._runCompiler('"' + compiler + '" -o "' + exeFile + '" ', maxOutputLines)
 
-        #store the compiler output to a temp file    
-        compile_args = compile_args + '> "' + tmpFile + '" 2>&1'
+        self._writeOutput(compilerOutput, report)
         
-        print ("compiling:" + compile_args)
-        os.system(compile_args)
+        report.write('</font></pre>')
 
-        #copy the first maxOutputLines from the temp file to the output file
-        #Also, limit the # bytes to 40*maxOutputLines (this avoids large output files due to ridiculously long lines)
-        self._fileHead(tmpFile, outputFile, maxOutputLines, 40*maxOutputLines)
-        self._removeFile(tmpFile)
-        
-        f=self.openFile(outputFile, "a")    #open for appending
-        f.write('</font></pre>')
-        f.close()
+        if buildCache != None and not bLimitExceeded:
+            files = {}
+            if os.path.isfile(exeFile):
+                files['AG.out'] = exeFile
+            buildCache.store(key, files, {'compiler_output.txt': compilerOutput})
+
+        return os.path.isfile(exeFile)
 
 
          
-    def _shellExec(self, interpreter, sourceFile, dataFile, outputFile, maxRunTime, maxOutputLines, topLevelDirectory):
-        """function to execute source code in a shell using a specified interpreter.
-        interpreter = full path or name of script interpreter (examples: python, /usr/bin/python2.7, etc.)
+    def _shellExec(self, interpreter, sourceFile, dataFile, report, maxRunTime, maxOutputLines, topLevelDirectory):
+        """function to execute source code in a shell using a specified interpreter and report its output
+        (see _runProgram() and _reportRunResult()).  Returns the execution time."""
+        result = self._runProgram(interpreter, sourceFile, dataFile, maxRunTime, maxOutputLines, topLevelDirectory)
+        self._reportRunResult(result, report, maxRunTime, maxOutputLines)
+        return result['execTime']
+
+
+    def _reportRunResult(self, result, report, maxRunTime, maxOutputLines):
+        """function that reports the output of a run (a result dictionary returned by _runProgram()).
+        A result of None stands for a run that was not performed in render only mode."""
+        #Delineate the start of the unformatted py code output with a token: PROG_OUTPUT_START_TOKEN.
+        #Flank with '\n's to ensure the token is on a line by itself
+        report.write('<pre><font face="courier" color="' + AutoGrader.Const.OUTPUT_COLOR + '">')
+
+        if result == None:
+            self._reportErrorMsg("No cached result available; the program was not run (render only).", report)
+        else:
+            self._writeOutput(result['output'], report)
+
+            if result['outputLimitExceeded']:
+                self._reportErrorMsg("<br>Maximum output of {0} lines ({1} bytes) exceeded.  Process forcefully terminated.".format(maxOutputLines, 40*maxOutputLines), report)
+
+            if result['timedOut']:
+                self._reportErrorMsg("<br>Maximum execution time of {0} seconds exceeded.  Process forcefully terminated... output may be lost.".format(maxRunTime), report)
+            elif result.get('signal') != None and not result['outputLimitExceeded']:
+                self._reportErrorMsg("<br>Process terminated by signal {0}{1}.".format(result['signal'], self._signalName(result['signal'])), report)
+
+        #Delineate the end of the unformatted py code output with a token: PROG_OUTPUT_END_TOKEN
+        #Flank with '\n's to ensure the token is on a line by itself
+        #report.write('\n' + AutoGrader.Const.PROG_OUTPUT_END_TOKEN + '\n')
+        report.write('</font></pre>')
+
+
+    def _runProgram(self, interpreter, sourceFile, dataFile, maxRunTime, maxOutputLines, topLevelDirectory, forkServer=None, seedPaths=None):
+        """function to execute source code using a specified interpreter.  The program is started directly (not by a
+        shell) with the resource limits of the run (see processFiles() and _limitedArgs()).
+        interpreter = full path or name of script interpreter (examples: python, /usr/bin/python2.7, etc.), quoted as for a shell
         sourceFile = full path of the script to be executed
         dataFile = file from which stdin data will be redirected.  Set to an empty string if the script requires no data input.
-        outputFile = file to which both stdout and stderr will be redirected
-        bRecompile - when using C++, set to True to compile before executing.  When set to False, execute without recompiling."""
-        #Build the shell command to execute the py script or C++ program with appropriate stdin, stdout and stderr redirection
-        #Enclose all file names with double quotes for the shell.
-        #Add a 2>&1 to the command line so that stderr (2) is redirected to stdout (1)
-        #stdin(0) is redirected from dataFile; stdout(1) is redirected to outputFile
-        #stderr(2) is redicted to stdout(1), which is itself redirected to outputFile
+        forkServer = ForkServer (or None) that runs the script in a child forked from a warm interpreter instead of a shell.
+        seedPaths = the files and directories of the submission (and the test data) the program starts with, copied to its
+            scratch directory (see _makeScratchCopy()).  Set to None for sourceFile only.
+        The program runs in a scratch directory of its own.  Files it creates there are moved to <student name>_output in its
+        working directory (the directory of sourceFile).
+        Returns a result dictionary with the (bounded) 'output' of the program (stdout and stderr), its 'execTime'
+        and the 'timedOut' and 'outputLimitExceeded' flags.  The CPU seconds ('userTime', 'systemTime') and peak resident
+        memory in bytes ('maxMemory', None if unknown, an upper bound if 'maxMemoryIsBound', a lower bound if
+        'maxMemoryIsSampled', see _startProcess()) of the program, and the 'signal' that terminated it
+        or its 'exitCode' (None for the other), are reported by the kernel."""
+        #Build the command line to execute the py script or C++ program
+        #stdin(0) is redirected from dataFile; stdout(1) and stderr(2) share a pipe that is read into memory
 
         #print("xxxxxxx", sourceFile)
         #print("xxxxxxx", topLevelDirectory)
         #print("xxxxxxx", dataFile)
-        
-        f=self.openFile(outputFile, "a")    #open for appending
-        #Delineate the start of the unformatted py code output with a token: PROG_OUTPUT_START_TOKEN.
-        #Flank with '\n's to ensure the token is on a line by itself
-        f.write('<pre><font face="courier" color="' + AutoGrader.Const.OUTPUT_COLOR + '">')
-        f.close()
-
-        tmpFile = outputFile.strip() + '.AB'
-        self._removeFile(tmpFile)
 
         #set the working directory to the directory of the source file
         if sourceFile == '':
-            source = ' '
+            _args = shlex.split(interpreter)
             cwd = '.'
         else:
-            source = ' "' + sourceFile + '"'
+            _args = shlex.split(interpreter) + [sourceFile]
             cwd = os.path.split(sourceFile)[0]
-            
-        if dataFile == '':
-            _args = interpreter + source + ' >> "' + tmpFile + '" 2>&1'
-        else:
-            _args = interpreter + source + ' < "' + dataFile + '" >> "' + tmpFile + '" 2>&1'
 
-                
-        #print ("Executing: " + _args)
+        #print ("Executing: " + str(_args))
 
-        #make a note of all files currently in the working directory
-        initialFileList = os.listdir(cwd)
+        #run in a scratch directory; make a note of all files it starts with
+        if seedPaths == None:
+            seedPaths = [sourceFile] if sourceFile != '' else []
+        runDirectory = self._makeScratchCopy(seedPaths)
+        initialFileList = os.listdir(runDirectory)
 
         start_time = time.time()
-        p = subprocess.Popen(args=_args, shell=True, cwd=cwd)    #the pid returned appears to be the pid of the shell
-
-        if maxRunTime > 0:
-            elapsed_time = time.time() - start_time
-            while p.poll() == None and elapsed_time < maxRunTime:
-                elapsed_time = time.time() - start_time
-                print ("*", end='')
-        else:   #user specified 0 or a negative value for the max run time --> wait indefinitely
-            p.wait()    #wait indefinitely for process to terminate
-            elapsed_time = time.time() - start_time
-            
-        #copy the first maxOutputLines from the temp file to the output file
+        started = None
+        if forkServer != None:
+            #the forked child leads its own process group
+            started = forkServer.run(sourceFile, dataFile, runDirectory, self._rlimits())
+        if started != None:
+            p, done = started
+        else:
+            try:
+                stdin = open(dataFile, 'rb') if dataFile != '' else None
+                try:
+                    #the program leads its own process group
+                    p, done = self._startProcess(self._limitedArgs(_args), cwd=runDirectory, stdin=stdin,
+                        stdout=subprocess.PIPE, stderr=subprocess.STDOUT)
+                finally:
+                    if stdin != None:
+                        stdin.close()
+            except (IOError, OSError) as e:     #the data file cannot be read or the program cannot be executed
+                shutil.rmtree(runDirectory, ignore_errors=True)
+                return {'output': str(e) + '\n', 'execTime': 0.0, 'timedOut': False, 'outputLimitExceeded': False,
+                        'userTime': None, 'systemTime': None, 'maxMemory': None, 'maxMemoryIsBound': False, 'maxMemoryIsSampled': False, 'signal': None,
+                        'exitCode': None}
+
+        #keep the first maxOutputLines of the output for the output file
         #Also, limit the # bytes to 40*maxOutputLines (this avoids large output files due to ridiculously long lines)
-        self._fileHead(tmpFile, outputFile, maxOutputLines, 40*maxOutputLines)
-        self._removeFile(tmpFile)
+        #A program that writes past these limits is terminated right away.
+        capture = OutputCapture(p.stdout, maxOutputLines, 40*maxOutputLines, lambda: self._killProcessGroup(p, done))
 
-        #kill the process, if it has exceeded its max run time
-        if elapsed_time >= maxRunTime and maxRunTime > 0:
-            print ("Killing process {0}. Run time exceeds max value of {1} seconds.".format(p.pid, maxRunTime))
-            p.terminate()       #try a s/w termination
-            time.sleep(1)       #wait 1 second
-            p.kill()            #force the termination
+        #a max run time of 0 or a negative value means wait indefinitely
+        bFinished = self._waitForProcess(done, maxRunTime, os.path.split(sourceFile)[1] if sourceFile != '' else interpreter)
+        elapsed_time = (p.endTime if bFinished and p.endTime != None else time.time()) - start_time
 
-            os.system('kill -9 ' + str(p.pid))  #appears to be the pid of the shell
-            
-            #This is a hack.  The pid returned by subprocess.Popen() seems to be the ID of
-            #the shell (the function is called wiht the shell=True option).
-            #We anecdotally add 1 to get the pid of the child process started by the shell.
-            #Look into using subprocess.run() for a better solution.
-            os.system('kill -9 ' + str(p.pid+1))
-
-            #finally, for good measure (C++ only) ...
-            os.system('pkill AG.out')    #just kill all AG.out processes
-           
-            ##wait for child to terminate
-            #maxTimetoWaitForChildTermination = 5.0
-            #start_time = time.time()
-            #elapsed_time2 = 0.0
-            #while p.poll() == None and elapsed_time < maxTimetoWaitForChildTermination:
-            #    elapsed_time2 = time.time() - start_time
-            #    print "*",
-            
-            self._reportErrorMsg("<br>Maximum execution time of {0} seconds exceeded.  Process forcefully terminated... output may be lost.".format(maxRunTime), outputFile)
+        #kill the shell and every process it started, if it has exceeded its max run time
+        if not bFinished:
+            print ("Killing process group {0}. Run time exceeds max value of {1} seconds.".format(p.pid, maxRunTime))
+            self._killProcessGroup(p, done)
 
-        
-        f=self.openFile(outputFile, "a")    #open for appending
-        #Delineate the end of the unformatted py code output with a token: PROG_OUTPUT_END_TOKEN
-        #Flank with '\n's to ensure the token is on a line by itself
-        #f.write('\n' + AutoGrader.Const.PROG_OUTPUT_END_TOKEN + '\n')
-        f.write('</font></pre>')
+        self._finishCapture(p, done, capture)
 
 
-        #make a note of all files currently in the working directory
-        finalFileList = os.listdir(cwd)
-        #create an output directory
+        #move all new files to an output directory based on the student's name
         outputDirectory = cwd + '/' + self._getStudentName(topLevelDirectory, sourceFile) + '_output'
         #print('\noutput directory = ', outputDirectory)
-        #print (initialFileList)
-        #print (finalFileList)
-        os.system('mkdir "' + outputDirectory + '"')
-        #move all new files to an output directory based on the student's name
-        for file in finalFileList:
-            if file not in initialFileList:
-                os.system('mv -f "' + cwd + '/' + file + '" "' + outputDirectory + '"')
-                print('output file ', file)
+        try:
+            self._harvestOutputFiles(runDirectory, initialFileList, outputDirectory)
+        finally:
+            shutil.rmtree(runDirectory, ignore_errors=True)
+
+        userTime, systemTime, maxMemory, bMemoryBound, bMemorySampled = p.resourceUsage if p.resourceUsage != None else (None, None, None, False, False)
+        return {'output': self._decodeOutput(capture.getvalue()), 'execTime': elapsed_time,
+                'timedOut': not bFinished, 'outputLimitExceeded': capture.bLimitExceeded,
+                'userTime': userTime, 'systemTime': systemTime, 'maxMemory': maxMemory, 'maxMemoryIsBound': bMemoryBound,
+                'maxMemoryIsSampled': bMemorySampled,
+                'signal': -p.returncode if p.returncode != None and p.returncode < 0 else None,
+                'exitCode': p.returncode if p.returncode != None and p.returncode >= 0 else None}
+
+
+    def _scratchRoot(self):
+        """function that returns the directory in which scratch directories are created: the first directory of
+        Const.SCRATCH_ROOTS (tmpfs) that can be written, or the default temporary directory"""
+        if self._scratchRootDirectory == None:
+            self._scratchRootDirectory = tempfile.gettempdir()
+            for directory in AutoGrader.Const.SCRATCH_ROOTS:
+                if os.path.isdir(directory) and os.access(directory, os.W_OK | os.X_OK):
+                    self._scratchRootDirectory = directory
+                    break
+        return self._scratchRootDirectory
+
+
+    def _makeScratchCopy(self, seedPaths):
+        """function that creates a scratch directory seeded with the files and directory trees of seedPaths (by name;
+        the first of two paths with the same name is used) and returns its name.  The files a program could overwrite
+        are copied, so that it cannot change the originals; read-only files (no write permission, such as test data an
+        instructor protected) are hard linked instead (see _seedFile()).  The caller removes the scratch directory."""
+        scratchDirectory = tempfile.mkdtemp(prefix='AG_run_', dir=self._scratchRoot())
+        for path in seedPaths:
+            destination = scratchDirectory + '/' + os.path.basename(path)
+            if os.path.lexists(destination):
+                continue
+            if os.path.isdir(path) and not os.path.islink(path):
+                directories = []
+                for dirpath, dirnames, filenames in os.walk(path):
+                    destDirectory = destination + dirpath[len(path):]
+                    os.mkdir(destDirectory)
+                    directories.append((dirpath, destDirectory))
+                    for name in filenames + [x for x in dirnames if os.path.islink(dirpath + '/' + x)]:
+                        self._seedFile(dirpath + '/' + name, destDirectory + '/' + name)
+                #the permissions of a directory are copied once it is filled
+                for dirpath, destDirectory in reversed(directories):
+                    shutil.copystat(dirpath, destDirectory)
+            elif os.path.lexists(path):
+                self._seedFile(path, destination)
+        return scratchDirectory
+
+
+    def _seedFile(self, path, destination):
+        """function that adds the file path to a scratch directory as destination: a symbolic link is copied as a link, a
+        file without write permission is hard linked (a program cannot open it for writing, as it cannot open the
+        original, and removing or renaming the link leaves the original alone), and any other file is copied.  The link
+        falls back to a copy when it is not possible (the scratch directory is on another device, etc.)."""
+        if os.path.islink(path):
+            os.symlink(os.readlink(path), destination)
+        elif os.stat(path).st_mode & (stat.S_IWUSR | stat.S_IWGRP | stat.S_IWOTH) == 0:
+            self._linkOrCopy(path, destination)
+        else:
+            shutil.copy2(path, destination)
+
+
+    def _harvestOutputFiles(self, scratchDirectory, initialFileList, outputDirectory):
+        """function that moves the files a program created in scratchDirectory (all of the entries that are not
+        in initialFileList) to outputDirectory, which is created when there is something to move.  Entries of
+        the same name already in outputDirectory are replaced."""
+        initialFiles = set(initialFileList)
+        for file in os.listdir(scratchDirectory):
+            if file in initialFiles:
+                continue
+            if not os.path.isdir(outputDirectory):
+                os.makedirs(outputDirectory)
+            destination = outputDirectory + '/' + file
+            if os.path.isdir(destination) and not os.path.islink(destination):
+                shutil.rmtree(destination)
+            elif os.path.lexists(destination):
+                os.remove(destination)
+            shutil.move(scratchDirectory + '/' + file, destination)
+            print('output file ', file)
+
+
+    def _submissionKey(self, sourceFiles, interpreter, maxRunTime, maxOutputLines, directory=None, skipDirs=()):
+        """function that returns the part of the result cache key that identifies a submission: a hash of
+        the names and contents of its source files and of the settings that affect its runs.  For a project
+        directory, every regular file in the directory tree (except for the directories matching one of the
+        skipDirs patterns) is part of the key, so changed data files the program reads are run again."""
+        parts = [interpreter, str(maxRunTime), str(maxOutputLines), repr(self._runLimits)]
+        if directory != None:
+            sourceFiles = sorted(set(sourceFiles) | set(self._submissionFiles(directory, skipDirs)))
+        for sourceFile in sourceFiles:
+            parts += [sourceFile, FileCache.hashFile(sourceFile)]
+        return FileCache.makeKey(*parts)
 
-        #attempt to remove the output directory (will only succeed if the directory is empty
-        os.system('rmdir "' + outputDirectory + '"')
 
-        f.close()
-            
-        return elapsed_time
+    def _submissionFiles(self, directory, skipDirs=()):
+        """function that returns the paths of the regular files in the directory tree, without entering the directories
+        that match one of the skipDirs patterns (such as the <student>_output directories of the runs)"""
+        foundFiles = []
+        for dirpath, dirnames, filenames in os.walk(directory):
+            dirnames[:] = [x for x in dirnames if not any(fnmatch.fnmatch(x, pattern) for pattern in skipDirs)]
+            for filename in filenames:
+                path = os.path.join(dirpath, filename)
+                if os.path.isfile(path) and not os.path.islink(path):
+                    foundFiles.append(path)
+        return foundFiles
+
+
+    def _runOrRecall(self, resultCache, submissionKey, dataFile, bRenderOnly, run, bRecall=True):
+        """function that returns the result dictionary of one submission x test data run.  With bRecall (always in
+        render only mode), the result is taken from the resultCache (FileCache or None) when the same run was made
+        before, and is marked 'recalled'; otherwise run() is called and its result is stored.  In render only mode
+        nothing is executed and runs missing from the cache return None."""
+        if resultCache == None:
+            return None if bRenderOnly else run()
+
+        key = FileCache.makeKey(submissionKey, FileCache.hashFile(dataFile) if dataFile != '' else '')
+        entry = resultCache.lookup(key) if bRecall or bRenderOnly else None
+        if entry != None:
+            print ("using cached result " + key)
+            result = json.loads(resultCache.readText(entry, 'result.json'))
+            result['recalled'] = True
+            return result
+        if bRenderOnly:
+            return None
+
+        result = run()
+        resultCache.store(key, texts={'result.json': json.dumps(result)})
+        return result
+
+    def _checkPythonSyntax(self, interpreter, sourceFiles, maxRunTime, syntaxCache=None, bRenderOnly=False):
+        """function that byte-compiles the sourceFiles with the interpreter (the script Const.PYTHON_SYNTAX_CHECK, in a single
+        run of the interpreter) and returns a dictionary that maps each file to its syntax error message, or to None if the
+        file compiles.  The result of each file is kept in the syntaxCache (FileCache or None), keyed by the interpreter and
+        the contents of the file, so an unchanged file is never checked again.  Files for which the check could not be made
+        (render only mode, interpreter not found, time out) are left out: the program is then simply run.
+        interpreter is a command line (see shlex), or the path of an interpreter that contains blanks."""
+        errors = {}
+        keys = {}
+        for sourceFile in sourceFiles:
+            keys[sourceFile] = FileCache.makeKey(interpreter, 'syntax', sourceFile, FileCache.hashFile(sourceFile))
+            entry = syntaxCache.lookup(keys[sourceFile]) if syntaxCache != None else None
+            if entry != None:
+                print ("using cached syntax check " + keys[sourceFile])
+                errors[sourceFile] = json.loads(syntaxCache.readText(entry, 'syntax_check.json'))['error']
+        uncheckedFiles = [sourceFile for sourceFile in sourceFiles if sourceFile not in errors]
+        if bRenderOnly or uncheckedFiles == []:
+            return errors
+
+        #the interpreter reads the check script from stdin ('-'); no shell is involved
+        args = [interpreter] if os.path.isfile(interpreter) else shlex.split(interpreter)
+        devnull = open(os.devnull, 'wb')
+        try:
+            p, done = self._startProcess(args + ['-'] + uncheckedFiles, stdin=subprocess.PIPE, stdout=subprocess.PIPE, stderr=devnull)
+        except (IOError, OSError):     #the interpreter cannot be executed
+            return errors
+        finally:
+            devnull.close()
+        capture = OutputCapture(p.stdout, AutoGrader.Const.SYNTAX_CHECK_MAX_BYTES, AutoGrader.Const.SYNTAX_CHECK_MAX_BYTES)
+        try:
+            p.stdin.write(AutoGrader.Const.PYTHON_SYNTAX_CHECK.encode('utf-8'))
+            p.stdin.close()
+        except (IOError, OSError):     #the interpreter exited early
+            pass
+        bFinished = self._waitForProcess(done, maxRunTime, 'syntax check')
+        if not bFinished:
+            self._killProcessGroup(p, done)
+        self._finishCapture(p, done, capture)
+
+        if not bFinished or p.returncode != 0 or capture.bLimitExceeded:
+            return errors
+        try:
+            checked = json.loads(self._decodeOutput(capture.getvalue()))
+        except ValueError:
+            return errors
+        for sourceFile in uncheckedFiles:
+            if sourceFile in checked:
+                errors[sourceFile] = checked[sourceFile]
+                if syntaxCache != None:
+                    syntaxCache.store(keys[sourceFile], texts={'syntax_check.json': json.dumps({'error': checked[sourceFile]})})
+        return errors
+
 
     def _getStudentName(self, sourceDirectory, sourceFile):
         '''function that attempts to extract the student name from the Moodle-generated student submission file'''
@@ -361,92 +2618,114 @@ class AutoGrader:
         return filename.split('_')[0].strip('/')
 
 
-    def _gradingBox(self, sourceDirectory, sourceFile, outputFile, gradingTextLabel):
+    def _gradingBox(self, sourceDirectory, sourceFile, report, gradingTextLabel):
         '''function that creates the instructor grading box.  This box is pre-polated with the student's name'''
         #extract the student name from the sourceFile name: remove the leading sourcedirectory
         #name and note that Moodle begins the submitted filename with the student's name followed
         #by an '_'
         #student_name = sourceFile.split(sourceDirectory)[1].split('_')[0].strip('/')
         student_name = self._getStudentName(sourceDirectory, sourceFile)
-        f=self.openFile(outputFile, "a")    #open for appending
-        f.write ('<font face="courier" color="' + AutoGrader.Const.FEEDBACK_COLOR + '">')
-        f.write('<br>Instructor Feedback for '+student_name+'</font><br><textarea name="'+gradingTextLabel+'" rows=4 cols=80>'+student_name+'\nGrade: \nComments: </textarea><br><br>')
-        f.close()
+        feedback = student_name+'\nGrade: \nComments: '
+        if isinstance(report, ReportFragment):     #for the index of a lazy report
+            report.title = student_name
+            report.feedback = feedback
+        report.write ('<font face="courier" color="' + AutoGrader.Const.FEEDBACK_COLOR + '">')
+        report.write('<br>Instructor Feedback for '+student_name+'</font><br><textarea name="'+gradingTextLabel+'" rows=4 cols=80>'+feedback+'</textarea><br><br>')
         
 
-    def _reportFileAnalytics(self, sourceFiles, outputFile, language):
+    def _reportFileAnalytics(self, sourceFiles, report, language, analytics=None):
         """function that gets and reports source code analytics to the destination file in the
-        specified format (AutoGrader.Const.TEXT or AutoGrader.Const.HTML)"""
+        specified format (AutoGrader.Const.TEXT or AutoGrader.Const.HTML).
+        analytics - optional dictionary of precomputed analytics (see analyzeCppFiles() and analyzePythonFiles())"""
         
         #is this a single file or a set of files?
         bSingleFile = len(sourceFiles) == 1
         
-        #open the output file for appending
-        f=self.openFile(outputFile, "a")    #open for appending
-        f.write ('<font face="verdana" color="' + AutoGrader.Const.HEADER_COLOR1 + '">')
-        f.write ('<br>\n=======================================================<br>\n')
+        report.write ('<font face="verdana" color="' + AutoGrader.Const.HEADER_COLOR1 + '">')
+        report.write ('<br>\n=======================================================<br>\n')
         if bSingleFile:
-            f.write(sourceFiles[0])    #if this is a single file, simply output its name
+            report.write(sourceFiles[0])    #if this is a single file, simply output its name
         else:   #if these are multiple files, list the directory name in bold
-            f.write('<b>' + os.path.split(sourceFiles[0])[0] + '</b>') #directory name in bold
-        f.write ('<br>\n=======================================================<br>\n</font>')
+            report.write('<b>' + os.path.split(sourceFiles[0])[0] + '</b>') #directory name in bold
+        report.write ('<br>\n=======================================================<br>\n</font>')
 
         #for each file, report the analytics
         for sourceFile in sourceFiles:
             if bSingleFile == False:    #only print the filename if we have more than 1 file in the list
-                f.write ('<font face="verdana" color="' + AutoGrader.Const.HEADER_COLOR1 + '">')
-                f.write(os.path.split(sourceFile)[1] + '</font><br>\n')
+                report.write ('<font face="verdana" color="' + AutoGrader.Const.HEADER_COLOR1 + '">')
+                report.write(os.path.split(sourceFile)[1] + '</font><br>\n')
                     
             if language == 'C++':
-                numLines, numComments = self.analyzeCppCode(sourceFile)
-                f.write ('<font face="courier" color="' + AutoGrader.Const.ANALYTICS_COLOR1 + '">Code Lines: ' + str(numLines))
-                f.write ('<br>\n~#Comments: ' + str(numComments) + '<br>\n')
+                if analytics == None or sourceFile not in analytics:
+                    analytics = self.analyzeCppFiles(sourceFiles)
+                numLines, numComments, numCodeLines, numFunctions = analytics[sourceFile]
+                report.write ('<font face="courier" color="' + AutoGrader.Const.ANALYTICS_COLOR1 + '">Code Lines: ' + str(numLines))
+                report.write (AutoGrader.Const.HTML_TAB_CHAR*2 + 'Non-blank Code Lines: ' + str(numCodeLines))
+                report.write (AutoGrader.Const.HTML_TAB_CHAR*2 + '~#Functions: ' + str(numFunctions))
+                report.write ('<br>\n~#Comments: ' + str(numComments) + '<br>\n')
                 
             if language == 'Python':
-                numLines, numDocStr, numComments, numDefs, numClasses = self.analyzePythonCode(sourceFile)
-                f.write ('<font face="courier" color="' + AutoGrader.Const.ANALYTICS_COLOR1 + '">Code Lines: ' + str(numLines))
-                f.write (AutoGrader.Const.HTML_TAB_CHAR*2 + '~#Functions:  ' + str(numDefs))
-                f.write (AutoGrader.Const.HTML_TAB_CHAR*2 + '~#Classes: ' + str(numClasses))
-                f.write ('<br>\n~#Comments: ' + str(numComments))
-                f.write (AutoGrader.Const.HTML_TAB_CHAR*2 + '~#DocStrs: ' + str(numDocStr) + '<br>\n')
+                if analytics == None or sourceFile not in analytics:
+                    analytics = self.analyzePythonFiles(sourceFiles)
+                numLines, numDocStr, numComments, numDefs, numClasses = analytics[sourceFile]
+                report.write ('<font face="courier" color="' + AutoGrader.Const.ANALYTICS_COLOR1 + '">Code Lines: ' + str(numLines))
+                report.write (AutoGrader.Const.HTML_TAB_CHAR*2 + '~#Functions:  ' + str(numDefs))
+                report.write (AutoGrader.Const.HTML_TAB_CHAR*2 + '~#Classes: ' + str(numClasses))
+                report.write ('<br>\n~#Comments: ' + str(numComments))
+                report.write (AutoGrader.Const.HTML_TAB_CHAR*2 + '~#DocStrs: ' + str(numDocStr) + '<br>\n')
                         
-            f.write('</font><br>') #skip a line between entries
-        f.close()
+            report.write('</font><br>') #skip a line between entries
 
 
-    def _reportExecTime(self, exec_time, outputFile):
+    def _reportRecalled(self, result, report):
+        """function that notes in the report that a result was recalled from the result cache instead of being run"""
+        if result.get('recalled'):
+            report.write ('<font face="verdana" color="' + AutoGrader.Const.ANALYTICS_COLOR2 + '">[Cached result: the program was not run again]</font><br>\n')
+
+
+    def _reportExecTime(self, exec_time, report):
         """function that reports execution time to the output file in the specified
         format (AutoGrader.Const.TEXT or AutoGrader.Const.HTML)"""
-        f=self.openFile(outputFile, "a")    #open for appending
-        f.write ('<font face="verdana" color="' + AutoGrader.Const.ANALYTICS_COLOR2 + '">[Execution Time: ' + format("%0.4f" % exec_time) + ' sec.]</font><br>\n')
-        f.close()
+        report.write ('<font face="verdana" color="' + AutoGrader.Const.ANALYTICS_COLOR2 + '">[Execution Time: ' + format("%0.4f" % exec_time) + ' sec.]</font><br>\n')
+
+
+    def _signalName(self, signum):
+        """function that returns ' (<name of signal signum>)', or '' if the name is not known"""
+        for name in dir(signal):
+            if name.startswith('SIG') and not name.startswith('SIG_') and getattr(signal, name) == signum:
+                return ' (' + name + ')'
+        return ''
 
 
-    def _reportDataFile(self, dataFileName, outputFile):
-        """function that reports the name of the input data file to the outputFile in the specified format.
+    def _reportResourceUsage(self, result, report):
+        """function that reports the CPU time and peak memory of a run (see _runProgram()) next to its execution time.
+        Results without these figures (e.g. cached by an older version) are not reported; neither is a peak memory that was
+        not measured (a run too short to be sampled) or that was taken from wait4() by an older version."""
+        if result.get('userTime') == None:
+            return
+        report.write ('<font face="verdana" color="' + AutoGrader.Const.ANALYTICS_COLOR2 + '">[CPU Time: user ' + format("%0.4f" % result['userTime']) +
+            ' sec., system ' + format("%0.4f" % result['systemTime']) + ' sec.]')
+        if result.get('maxMemory') != None and (result.get('maxMemoryIsSampled') or result.get('maxMemoryIsBound')):
+            report.write (' [Max Memory: ' + ('under ' if result.get('maxMemoryIsBound') else 'at least ') +
+                format("%0.1f" % (result['maxMemory'] / (1024.0*1024.0))) + ' MB]')
+        report.write ('</font><br>\n')
+
+
+    def _reportDataFile(self, dataFileName, report):
+        """function that reports the name of the input data file to the report.
         dataFileName = the name of the data file to be reported in the output file
-        outputfile = the name of the output file (this is the same file that receives stdout and stderr from the executed script
-        outputFileType = format of outputFile (AutoGrader.Const.TEXT or AutoGrader.Const.HTML)"""
-        #subsequent access to the file should be open for "append"-ing
-        f=self.openFile(outputFile, "a")    #open for appending
-        f.write ('<font face="verdana" color=" ' +AutoGrader.Const.HEADER_COLOR2 + '"><br>\n------------- ' + os.path.split(dataFileName)[1] + ' -------------</font>\n')
-        f.close()
+        report = report file object (this is the same object that receives stdout and stderr from the executed script)"""
+        report.write ('<font face="verdana" color=" ' +AutoGrader.Const.HEADER_COLOR2 + '"><br>\n------------- ' + os.path.split(dataFileName)[1] + ' -------------</font>\n')
 
 
-    def _writeOutput(self, msg, outputFile):
-        """print the supplied message in red to the output file.  Use this function
-        when the output file is not already open."""
-        f=self.openFile(outputFile, "a")    #open otuputFile for appending
-        f.write (msg)
-        f.close()
+    def _writeOutput(self, msg, report):
+        """write the supplied message to the report as is."""
+        report.write (msg)
 
 
-    def _reportErrorMsg(self, ErrorMessage, outputFile):
-        """print the supplied message in red to the supplied file.  Use this function
-        when the output file is not already open."""
-        f=self.openFile(outputFile, "a")    #open otuputFile for appending
-        self._insertErrorMsg(ErrorMessage, f)
-        f.close()
+    def _reportErrorMsg(self, ErrorMessage, report):
+        """print the supplied message in red to the supplied report."""
+        self._insertErrorMsg(ErrorMessage, report)
 
                 
     def _insertErrorMsg(self, ErrorMessage, outputFileObject):
@@ -457,9 +2736,10 @@ class AutoGrader:
         outputFileObject.write('</font>')
 
 
-    def _formatSource(self, sourceFiles, outputFile, language):
-        """function that inserts the source code into the output file"""
-        f=self.openFile(outputFile, "a")    #open otuputFile for appending
+    def _formatSource(self, sourceFiles, report, language, bHighlight=False, highlightCache=None):
+        """function that inserts the source code into the output file.  With bHighlight, the listings are highlighted
+        by highlightSource() and need no script in the browser; the html is kept in the highlightCache (FileCache or None),
+        keyed by the language and the contents of the file.  Otherwise they are left to the syntax highlighter script."""
 
         for sourceFile in sourceFiles:                       
             #read in input file
@@ -467,22 +2747,43 @@ class AutoGrader:
                 preprocessedSource = inputFile.read()
                 inputFile.close()
                 
-            #replace every occurence of '<' with '&lt' in the source file for the syntax highlighter
-            source = preprocessedSource.replace('<', '&lt')
-                
-            f.write('<font face="courier" color="' + AutoGrader.Const.HEADER_COLOR2 + '">')
-            f.write ('-------------  BEGIN LISTING: ' + os.path.split(sourceFile)[1] + ' -------------</font><br>\n')
-            if language == 'C++':
-                f.write('<pre class="brush: cpp;">')
-            if language == 'Python':
-                f.write('<pre class="brush: python;">')
-            f.write(source)
-            f.write('</pre>')
-
-            f.write('<font face="courier" color="' + AutoGrader.Const.HEADER_COLOR2 + '">')
-            f.write ('-------------   END LISTING: ' + os.path.split(sourceFile)[1] + ' -------------</font><br>\n')
+            report.write('<font face="courier" color="' + AutoGrader.Const.HEADER_COLOR2 + '">')
+            report.write ('-------------  BEGIN LISTING: ' + os.path.split(sourceFile)[1] + ' -------------</font><br>\n')
+            if bHighlight:
+                report.write(self._highlightedSource(preprocessedSource, language, highlightCache))
+            else:
+                #escape the source file for the syntax highlighter, which reads it back from the html
+                if language == 'C++':
+                    report.write('<pre class="brush: cpp;">')
+                if language == 'Python':
+                    report.write('<pre class="brush: python;">')
+                report.write(escapeHtml(preprocessedSource))
+                report.write('</pre>')
+
+            report.write('<font face="courier" color="' + AutoGrader.Const.HEADER_COLOR2 + '">')
+            report.write ('-------------   END LISTING: ' + os.path.split(sourceFile)[1] + ' -------------</font><br>\n')
+
+
+    def _highlightedSource(self, source, language, highlightCache=None):
+        """function that returns highlightSource(source, language), from the highlightCache (FileCache or None) if it holds it.
+        source is the text read by openFile(): in Python2, utf-8 bytes that are decoded for the lexers, and the html is
+        returned as utf-8 bytes like the rest of the report."""
+        if self.python2 == True:
+            source = source.decode('utf-8', 'replace')
+        key = FileCache.makeKey('highlight', language, source)
+        html = None
+        if highlightCache != None:
+            entry = highlightCache.lookup(key)
+            if entry != None:
+                html = highlightCache.readText(entry, 'source.html')
+        if html == None:
+            html = highlightSource(source, language)
+            if highlightCache != None:
+                highlightCache.store(key, texts={'source.html': html})
+        if self.python2 == True:
+            return html.encode('utf-8')
+        return html
                         
-        f.close()
 
 
     def _printSeparator(self, filePointer, color=Const.HEADER_COLOR1):
@@ -490,11 +2791,9 @@ class AutoGrader:
         filePointer.write ('<font face="verdana" color=" ' + color + '"><br>\n=======================================================</font><br>\n')
 
     
-    def _openFileAndPrintSeparator(self, outputFile, color=Const.HEADER_COLOR1):
-        """function that prints a separator in the output file after opening the file"""
-        f=self.openFile(outputFile, "a")    #open for appending
-        _printSeparator(f, color)
-        f.close()
+    def _openFileAndPrintSeparator(self, report, color=Const.HEADER_COLOR1):
+        """function that prints a separator in the supplied report"""
+        self._printSeparator(report, color)
 
 
     def _findFilesInDir(self, directory, extension=".py", foundFiles=None):
@@ -595,8 +2894,193 @@ class AutoGrader:
                          
         return tempSubDirs.keys()
 
-                
-    def processFiles(self, testDataFiles, sourceDirectory, sourceFilename, outputFile, language, IncludeSourceInOutput, maxRunTime, interpreter, maxOutputLines, AutoGraderVersion):
+
+    def indexSubmissions(self, sourceDirectory, cacheDirectory=None, skipDirs=None, bScan=True):
+        """function that returns the SubmissionIndex of sourceDirectory.  With a cacheDirectory, the
+        index is kept there between runs, so directories that did not change are not listed again.
+        skipDirs - list of patterns of directory names not to enter (default: Const.DEFAULT_SKIP_DIRS)
+        bScan - if False, the tree is indexed while the caller iterates the scan() generator of the index"""
+        if skipDirs == None:
+            skipDirs = AutoGrader.Const.DEFAULT_SKIP_DIRS
+        indexFile = None
+        if cacheDirectory:
+            indexFile = cacheDirectory + '/' + AutoGrader.Const.INDEX_CACHE + '/' + FileCache.makeKey(os.path.abspath(sourceDirectory)) + '.json'
+        return SubmissionIndex(sourceDirectory, skipDirs, indexFile, bScan)
+
+
+    def archiveExtractor(self, maxBytes=Const.MAX_ARCHIVE_BYTES, maxFiles=Const.MAX_ARCHIVE_FILES, maxDepth=Const.MAX_ARCHIVE_DEPTH):
+        """function that returns an ArchiveExtractor with the supplied limits (see ArchiveExtractor)"""
+        return ArchiveExtractor(maxBytes, maxFiles, maxDepth)
+
+
+    def extractArchives(self, archives, numWorkers=1, extractor=None):
+        """function that extracts the archives (see ArchiveExtractor.extract()), numWorkers archives at a time.
+        Returns the list of (archive, message) in the order of archives."""
+        if extractor == None:
+            extractor = self.archiveExtractor()
+        if numWorkers > 1 and len(archives) > 1 and concurrent != None:
+            executor = concurrent.futures.ThreadPoolExecutor(min(numWorkers, len(archives)))
+            try:
+                messages = list(executor.map(extractor.extract, archives))
+            finally:
+                executor.shutdown()
+        else:
+            messages = [extractor.extract(archive) for archive in archives]
+        for message in messages:
+            print (message)
+        return list(zip(archives, messages))
+
+
+    def _processPipeline(self, discover, stages, report, bWriteFragments=True):
+        """function that grades the submissions produced by the discover generator in a Pipeline of the supplied
+        stages and writes their fragments to report (a ReportWriter; not with bWriteFragments False, when the last stage writes them
+        itself) in sorted order.  discover must set bDone in its discovery dictionary when it is finished.  A fragment is written as soon as it is complete
+        and all of the submissions sorted before it have been written, while later submissions are still
+        being graded.  The report does not depend on how the work was scheduled.  Returns the # of submissions.
+        If a stage raises an exception, the pipeline is stopped (see Pipeline.close()), report is closed and the exception is raised again."""
+        discovery = {'submissions': [], 'bDone': False}
+        pipeline = Pipeline(discover(discovery), stages)
+
+        bDone = False
+        try:
+            finished = {}       #sort key -> graded submission waiting for its turn
+            order = None        #sort keys of all of the submissions, known once discovery is done
+            numWritten = 0
+            for submission in pipeline.results():
+                finished[submission.sortKey()] = submission
+                if order == None and discovery['bDone']:
+                    order = sorted([x.sortKey() for x in discovery['submissions']])
+                while order != None and numWritten < len(order) and order[numWritten] in finished:
+                    fragment = finished.pop(order[numWritten]).fragment
+                    if bWriteFragments:
+                        report.writeFragment(fragment)
+                    numWritten += 1
+
+            #every submission has been graded
+            for key in sorted([x.sortKey() for x in discovery['submissions']])[numWritten:]:
+                fragment = finished.pop(key).fragment
+                if bWriteFragments:
+                    report.writeFragment(fragment)
+            bDone = True
+        finally:
+            pipeline.close()
+            if not bDone:
+                report.close()
+        return len(discovery['submissions'])
+
+
+    def _shardEntry(self, submission, title, shard, language):
+        """function that returns the index entry (see ReportShards) of a graded submission: its title, the name of its shard,
+        whether it built (C++: compiled, Python: no syntax error found), and the # of runs, time outs and runs that exceeded
+        the output limit, the exit codes other than 0 and the signals that terminated its runs (other than the grader's own
+        kills, as in _reportRunResult())."""
+        results = [result for result in submission.results if result != None]
+        if language == 'C++':
+            bBuilt, build = submission.bCompiled, 'compiled' if submission.bCompiled else 'compile failed'
+        else:
+            numErrors = len([error for error in submission.syntaxErrors.values() if error != None])
+            bBuilt, build = numErrors == 0, 'ok' if numErrors == 0 else 'syntax error in ' + str(numErrors) + ' file(s)'
+        return {'title': title, 'shard': shard, 'time': time.strftime('%Y-%m-%d %H:%M:%S'), 'bBuilt': bBuilt, 'build': build,
+                'runs': len(results), 'notRun': len(submission.results) - len(results),
+                'timeouts': len([result for result in results if result['timedOut']]),
+                'outputLimits': len([result for result in results if result['outputLimitExceeded']]),
+                'exitCodes': sorted(set(result['exitCode'] for result in results if result.get('exitCode'))),
+                'signals': sorted(set(result['signal'] for result in results if result.get('signal') != None
+                    and not result['timedOut'] and not result['outputLimitExceeded']))}
+
+
+    def _writeShardIndex(self, report, shards):
+        """function that writes the table of the submissions of a sharded report (see ReportShards) to report: a row per
+        submission with its status and a link to its shard.  Problems are shown in the error color."""
+        def cell(text, bProblem=False):
+            if bProblem:
+                text = '<font color="' + AutoGrader.Const.ERROR_COLOR + '">' + text + '</font>'
+            return '<td>' + text + '</td>'
+
+        directory = os.path.split(shards.shardDirectory)[1]
+        report.write('<br><br><table border="1" cellpadding="4" style="border-collapse: collapse; font-family: verdana; font-size: 0.9em;">\n')
+        report.write('<tr><th>Submission</th><th>Build</th><th>Runs</th><th>Time outs</th><th>Output limit</th><th>Exit codes</th>'
+            '<th>Signals</th><th>Graded</th></tr>\n')
+        for entry in shards.sortedEntries():
+            runs = str(entry['runs']) + (' (' + str(entry['notRun']) + ' not run)' if entry['notRun'] else '')
+            report.write('<tr>' + cell('<a href="' + escapeHtml(directory + '/' + entry['shard']) + '">' + escapeHtml(entry['title']) + '</a>')
+                + cell(entry['build'], not entry['bBuilt'])
+                + cell(runs, entry['notRun'] > 0)
+                + cell(str(entry['timeouts']), entry['timeouts'] > 0)
+                + cell(str(entry['outputLimits']), entry['outputLimits'] > 0)
+                + cell(', '.join(str(code) for code in entry['exitCodes']) or '0', len(entry['exitCodes']) > 0)
+                + cell(', '.join(str(signal) + self._signalName(signal) for signal in entry['signals']), len(entry['signals']) > 0)
+                + cell(entry['time']) + '</tr>\n')
+        report.write('</table>\n')
+
+
+    def _writeReportFooter(self, report, language, interpreter, AutoGraderVersion, bFeedback=True):
+        """function that ends the html of the supplied report (a ReportWriter): the versions of the tools and, with
+        bFeedback, the button and the script that download the instructor feedback of the report."""
+        self._reportErrorMsg('<br><font face="verdana">', report)
+        self._reportErrorMsg('Report Generator: AutoGrader v' + AutoGraderVersion  + '<br>', report)
+        if language == 'C++':
+            self._reportErrorMsg('C++ Compiler: ' + interpreter + '<br>', report)
+        elif language == 'Python':
+            self._reportErrorMsg('Python Interpreter: ' + interpreter + '<br>', report)
+        else:
+            self._reportErrorMsg('Compiler/Interpreter: Not Specified <br>', report)
+        self._reportErrorMsg('<br></font>', report)
+
+        if not bFeedback:
+            self._writeOutput('</form></body></html>', report)
+            return
+
+        self._writeOutput('''<font size='+6'><input type="button" style="font-size:20px;width:250px" value="Download Feedback" OnClick="download_feedback_file()">
+        <br><br></font></form>''', report)
+
+        if report.bLazy:
+            report.writeIndex()
+            collect_feedback = '''
+          msg = AG_feedbackText()'''
+        else:
+            collect_feedback = '''
+          x = document.getElementsByName("student").length
+          msg = ""
+          for (i=0; i<x; i++)
+          {
+                msg = msg + document.getElementsByName("student")[i].value
+                msg = msg + '\\n\\n-------------------------------------------------------\\n'
+          }'''
+
+        feedback_filename = 'feedback.txt'
+        download_script = '''
+        <script type="text/javascript">
+
+        function download_feedback_file()
+        {
+        ''' + collect_feedback + '''
+
+          var element = document.createElement('a');
+          element.setAttribute('href', 'data:text/plain;charset=utf-8,' + encodeURIComponent(msg));
+          element.setAttribute('download', "''' + feedback_filename + '''");
+
+          element.style.display = 'none';
+          document.body.appendChild(element);
+
+          element.click();
+
+          document.body.removeChild(element);
+        }
+
+        </script>
+        </body></html>
+
+        '''
+        self._writeOutput(download_script, report)
+
+        self._writeOutput('</body></html>', report)
+
+
+    def processFiles(self, testDataFiles, sourceDirectory, sourceFilename, outputFile, language, IncludeSourceInOutput, maxRunTime, interpreter, maxOutputLines, AutoGraderVersion, numWorkers=1, cacheDirectory=None, maxCacheSize=Const.DEFAULT_MAX_CACHE_SIZE, renderOnly=False, skipDirs=None, compileJobs=None, precompiledHeaders=False,
+                     maxCompileTime=Const.DEFAULT_MAX_COMPILE_TIME, maxCompileCpuTime=Const.DEFAULT_MAX_COMPILE_CPU_TIME, maxCompileMemory=Const.DEFAULT_MAX_COMPILE_MEMORY,
+                     syntaxCheck=False, forkServer=False, testJobs=1, maxCpuTime=0, maxMemory=0, maxFileSize=0, maxProcesses=0,
+                     leanReport=False, compressReport=False, preHighlight=False, lazyReport=False, shardReport=False, regrade=None, reuseResults=False):
         """ TestDataFiles - list of test data files as full path strings
         sourceDirectory - top level directory containing .py files (all sub directories will be searched)
         soruceFilename - specifies the name of the .py file to search and execute.  Set to "" or None to search/execute all .py files in the sourceDirectory.
@@ -604,269 +3088,388 @@ class AutoGrader:
         Language - either "C++" or "Python"
         IncludeSourceInOutput - boolean; if True, output will contain full listing of each source file
         maxRunTime - the maximum execution time in integer seconds.  After this number of seconds, the running code will be forcefully terminated.
-        interpreter - a string representing the tool to use (e.g. 'g++ -Wall' or '/usr/bin/python' """
+        interpreter - a string representing the tool to use (e.g. 'g++ -Wall' or '/usr/bin/python'
+        numWorkers - the number of submissions compiled and run concurrently.  The report is identical for any number of workers.
+        cacheDirectory - directory of the persistent caches (compiled executables, run results).  Set to "" or None to disable caching.
+            With caching and reuseResults, only the submission x test data pairs that changed since the last run are executed.
+        maxCacheSize - size limit of each cache in bytes; least recently used entries are evicted beyond it.
+        renderOnly - boolean; if True, nothing is compiled or executed: the report is rendered from the caches only.
+        skipDirs - list of patterns of directory names that are not searched for submissions (default: Const.DEFAULT_SKIP_DIRS)
+        compileJobs - the number of C++ submissions compiled concurrently (default: the # of CPUs).  Compiling does not wait for the runs.
+        precompiledHeaders - boolean; if True, the standard headers that C++ submissions start with are precompiled once and shared
+            (see PrecompiledHeaders).  The compile time saved is reported.
+        maxCompileTime, maxCompileCpuTime, maxCompileMemory - the wall-clock seconds, CPU seconds and bytes of memory allowed to each
+            compiler command (0 for no limit).  A compiler that exceeds them is killed and the failure is shown with the compiler output.
+        syntaxCheck - boolean; if True, every .py file of a Python submission is byte-compiled by the interpreter before the submission is
+            run (numWorkers submissions at a time).  The syntax errors of a submission are reported once; if the top-level module has
+            one, the test data is not run.
+        forkServer - boolean; if True, Python programs are run in children forked from a warm interpreter that has already imported
+            Const.FORK_SERVER_PRELOAD (see ForkServer), instead of a shell and a fresh interpreter per run.  Falls back to the shell
+            when the interpreter cannot run the server.
+        testJobs - the number of test data files of one submission run concurrently.  Every run works in its own scratch
+            directory (see _runProgram()); the runs are reported in the order of testDataFiles.
+            Up to numWorkers x testJobs programs run at the same time.
+        maxCpuTime, maxMemory, maxFileSize, maxProcesses - the CPU seconds, bytes of memory (address space), bytes per file written
+            and # of processes allowed to each run (0 for no limit), set as resource limits of the program.  The # of processes is
+            counted by the kernel for the whole user account.
+        leanReport - boolean; if True, the syntax highlighter scripts and style sheet are written once to shared asset files next to
+            the report, named after their contents, instead of being inlined in every report.
+        compressReport - boolean; if True, the report is written gzip compressed, to outputFile + '.gz' (unless outputFile ends with '.gz').
+        preHighlight - boolean; if True, the source listings are highlighted and numbered by the grader (see highlightSource()), so
+            the report runs no syntax highlighter script when it is opened.  The listings are cached by their contents.
+        lazyReport - boolean; if True, the html of each submission is embedded as data and only rendered by the browser when it scrolls
+            into view or is selected in a navigation list (see ReportWriter), so the report opens as fast for a large class as for a
+            small one.  The feedback of the sections that were not rendered is downloaded as initially filled in.
+        shardReport - boolean; if True, every submission gets a report of its own (a shard), written by the worker that graded it to the
+            directory <outputFile without extension>_shards together with shared highlighter asset files.  outputFile becomes a small
+            index page with the status of each submission (build, timeouts, exit codes, signals) and a link to its shard.
+        regrade - with shardReport, list of student names or submission paths (relative to sourceDirectory); if not empty, only these
+            submissions are graded: only their shards and the index page are rewritten; the shards of the others are kept.
+            Ignored without shardReport, since a single report would lose the other submissions.
+        reuseResults - boolean; if True (and with a cacheDirectory), a run whose submission files, test data and settings are unchanged
+            is not run again: its cached result is reported and marked as cached.  Results are always stored for renderOnly. """
         
         print ("***Start***")
         self.sourceDirectory = sourceDirectory
+        self._runLimits = (maxCpuTime, maxMemory, maxFileSize, maxProcesses)
         #self.TopLevelFilesFound = []
         #self.subdirs = {}    #dictionary of sbudirectories
         
+        if regrade and not shardReport:
+            print ("Regrading selected submissions requires shardReport; all of the submissions are graded.")
+            regrade = None
 
-        #delete the output file
-        self._removeFile(outputFile)
+        #(re)create the output file.  All of the report is written through this one buffered writer.
+        if compressReport and not outputFile.endswith('.gz'):
+            outputFile += '.gz'
+        report = ReportWriter(outputFile, self.openFile, compressReport, lazyReport and not shardReport)
 
         #create the html header.  Use the name of the source directory as the header text.
-        self._MakeHtmlHeader(outputFile, language, "AutoGrader", os.path.split(sourceDirectory)[-1])
+        if shardReport:
+            #the index page holds no listings: only the (small) style sheet of highlighted listings is included
+            shards = ReportShards(os.path.splitext(re.sub(r'\.gz$', '', outputFile))[0] + '_shards', bool(regrade))
+            self._MakeHtmlHeader(report, language, "AutoGrader", os.path.split(sourceDirectory)[-1], None, True)
+        else:
+            shards = None
+            self._MakeHtmlHeader(report, language, "AutoGrader", os.path.split(sourceDirectory)[-1],
+                os.path.dirname(os.path.abspath(outputFile)) if leanReport else None, preHighlight)
+
+        if cacheDirectory:
+            buildCache = FileCache(cacheDirectory + '/' + AutoGrader.Const.BUILD_CACHE, maxCacheSize)
+            objectCache = FileCache(cacheDirectory + '/' + AutoGrader.Const.OBJECT_CACHE, maxCacheSize)
+            pchCache = FileCache(cacheDirectory + '/' + AutoGrader.Const.PCH_CACHE, maxCacheSize)
+            resultCache = FileCache(cacheDirectory + '/' + AutoGrader.Const.RESULT_CACHE, maxCacheSize)
+            syntaxCache = FileCache(cacheDirectory + '/' + AutoGrader.Const.SYNTAX_CACHE, maxCacheSize)
+            highlightCache = FileCache(cacheDirectory + '/' + AutoGrader.Const.HIGHLIGHT_CACHE, maxCacheSize)
+        else:
+            buildCache = None
+            objectCache = None
+            pchCache = None
+            resultCache = None
+            syntaxCache = None
+            highlightCache = None
+
+        #list the source directory tree once; all of the submissions are found in this index.  Submissions are
+        #graded as soon as they are discovered, while the rest of the tree is still being indexed.
+        index = self.indexSubmissions(sourceDirectory, cacheDirectory, skipDirs, bScan=False)
+
+        def selected(path):
+            #the submissions to regrade are named by student or by path
+            return not regrade or self._getStudentName(sourceDirectory, path) in regrade or os.path.relpath(path, sourceDirectory) in regrade
+
+        def writeShard(submission):
+            relPath = os.path.relpath(submission.path, sourceDirectory)
+            name = shards.shardName(relPath, '.html.gz' if compressReport else '.html')
+            title = submission.fragment.title or os.path.basename(submission.path)
+            shard = ReportWriter(shards.shardDirectory + '/' + name, self.openFile, compressReport)
+            try:
+                self._MakeHtmlHeader(shard, language, title, title, shards.shardDirectory, preHighlight)
+                shard.writeFragment(submission.fragment)
+                self._writeReportFooter(shard, language, interpreter, AutoGraderVersion)
+            finally:
+                shard.close()
+            shards.add(relPath, self._shardEntry(submission, title, name, language))
+
+        def submissionEntries(submission):
+            """return the paths of the entries a submission's programs start with: the submission's file, or the entries of its
+            project directory (except for the directories matching the skipDirs patterns, such as the output of earlier runs)"""
+            if submission.kind == 'file':
+                return [submission.path]
+            return [submission.path + '/' + x for x in sorted(os.listdir(submission.path))
+                    if not (os.path.isdir(submission.path + '/' + x) and index._skip(x))]
+
+        def printHeader(submission):
+            print ('=======================================================')
+            print (submission.path)
+            print ('=======================================================')
+
+        def runTests(submission, submissionKey, run):
+            report = submission.fragment
+            if len(testDataFiles) == 0:     #no input data required
+                result = self._runOrRecall(resultCache, submissionKey, '', renderOnly, lambda: run(''), reuseResults)
+                submission.results.append(result)
+                self._reportRunResult(result, report, maxRunTime, maxOutputLines)
+                if result != None:
+                    print (format("%0.4f" % result['execTime']) + " secs.")
+                    if language == 'Python':
+                        self._reportExecTime(result['execTime'], report)
+                        self._reportResourceUsage(result, report)
+                    self._reportRecalled(result, report)
+            else:
+                futures = None
+                if testJobs > 1 and len(testDataFiles) > 1 and not renderOnly and concurrent != None:
+                    #run the tests concurrently (every run has its own scratch directory); report them in order
+                    executor = concurrent.futures.ThreadPoolExecutor(min(testJobs, len(testDataFiles)))
+                    futures = [executor.submit(self._runOrRecall, resultCache, submissionKey, dataFile, renderOnly,
+                        (lambda dataFile: lambda: run(dataFile))(dataFile), reuseResults) for dataFile in testDataFiles]
+                    executor.shutdown(wait=False)
+
+                for i, dataFile in enumerate(testDataFiles):
+                    self._reportDataFile(dataFile, report)
+                    
+                    #print the name of the datafile to indicate progress.
+                    _, filename =  os.path.split(dataFile)
+                    print ("processing '" + filename + "'...")
+                    if futures != None:
+                        result = futures[i].result()
+                    else:
+                        result = self._runOrRecall(resultCache, submissionKey, dataFile, renderOnly, lambda: run(dataFile), reuseResults)
+                    submission.results.append(result)
+                    self._reportRunResult(result, report, maxRunTime, maxOutputLines)
+
+                    if result != None:
+                        print (format("%0.4f" % result['execTime']) + " secs.")
+                        self._reportExecTime(result['execTime'], report)
+                        self._reportResourceUsage(result, report)
+                        self._reportRecalled(result, report)
+                print ()
 
         #--------- C++ ---------
         if language == 'C++':
-            #call _recursivelyFindFiles to generate the self.TopLevelFilesFound and self.SubDirsFound lists
-            (self.TopLevelFilesFound, self.SubDirsFound) = self._recursivelyFindFiles(sourceDirectory, ".cpp")
-            (tlf, sd) = self._recursivelyFindFiles(sourceDirectory, ".cc")
-
-            self.TopLevelFilesFound += tlf
-            self.SubDirsFound += sd
-
-            exeFile = sourceDirectory + '/' + 'AG.out'
-
+            #single-file programs in the top-level directory and multi-file programs in sub-directories
+            def discoverCpp(discovery):
+                for relPath in index.scan():
+                    if relPath == '':
+                        entries = [(x, 'file') for x in index.topLevelFiles([".cpp", ".cc"])]
+                    elif index.files(index.path(relPath), [".cpp", ".cc"]):
+                        entries = [(index.path(relPath), 'dir')]
+                    else:
+                        entries = []
+                    for x in entries:
+                        if not selected(x[0]):
+                            continue
+                        submission = Submission(len(discovery['submissions']), x[0], x[1])
+                        discovery['submissions'].append(submission)
+                        print (x)
+                        yield submission
+                discovery['bDone'] = True
+
+            def analyzeCpp(submission):
+                printHeader(submission)
+                if submission.kind == 'file':
+                    submission.sourceFiles = [submission.path]
+                else:
+                    #.cpp, .cc, .h and .hpp files, in that order
+                    submission.sourceFiles = index.files(submission.path, [".cpp", ".cc", ".h", ".hpp"])
 
-            def doInnerCppProcessing(sourceFiles, gradingTextLabel): #sourceFiles is a list of filenames
-                #get/report the analytics on the source files
-                self._reportFileAnalytics(sourceFiles, outputFile, language)
+                #get/report the analytics on the source files (computed in the shared process pool)
+                self._reportFileAnalytics(submission.sourceFiles, submission.fragment, language,
+                    self.analyzeCppFiles(submission.sourceFiles, executor=analysisPool))
                 
                 #include source code here if selected
                 if IncludeSourceInOutput == True:
-                    self._formatSource(sourceFiles, outputFile, language)
-
-                #compile the file
-                self._removeFile(exeFile)
-                self._compileCppFiles(interpreter, sourceFiles, outputFile, exeFile, maxOutputLines)
-
-                if os.path.isfile(exeFile): #did the compilation succeed?
+                    self._formatSource(submission.sourceFiles, submission.fragment, language, preHighlight, highlightCache)
+
+            def buildCpp(submission):
+                #every build gets its own executable in the private build directory
+                submission.exeFile = buildDirectory + '/' + 'AG_' + str(submission.n) + '.out'
+                self._removeFile(submission.exeFile)
+                submission.bCompiled = self._compileCppFiles(interpreter, submission.sourceFiles, submission.fragment,
+                    submission.exeFile, maxOutputLines, buildCache, renderOnly, objectCache, pch)
+
+            def runCpp(submission):
+                report = submission.fragment
+                if submission.bCompiled: #did the compilation succeed?
                     print("Compilation succeeded.")
-                    self._reportErrorMsg("Compilation succeeded.<br>", outputFile)                    
-                    if len(testDataFiles) == 0:     #no input data required
-                        exec_time = self._shellExec('"'+exeFile+'"', '', '', outputFile, maxRunTime, maxOutputLines, sourceDirectory)
-                        print (format("%0.4f" % exec_time) + " secs.")
-                    else:
-                        for dataFile in testDataFiles:
-                            self._reportDataFile(dataFile, outputFile)
-                            
-                            #print the name of the datafile to indicate progress.  This is a temporary solution to allow us to identify
-                            #programs that don't end.  Ultimately, we will want to use a fork()/wait() pair and be able to set a max run time.
-                            _, filename =  os.path.split(dataFile)
-                            print ("processing '" + filename + "'...")
-                            exec_time = self._shellExec('"'+exeFile+'"', '', dataFile, outputFile, maxRunTime, maxOutputLines, sourceDirectory)
-
-                            print (format("%0.4f" % exec_time) + " secs.")
-                            self._reportExecTime(exec_time, outputFile)
-                        print ()
+                    self._reportErrorMsg("Compilation succeeded.<br>", report)
+
+                    #runs are identified by the sources and the compiler command line (not by the temporary executable)
+                    submissionKey = self._submissionKey(submission.sourceFiles, interpreter, maxRunTime, maxOutputLines,
+                        submission.path if submission.kind == 'dir' else None, index.skipDirs)
+                    seedPaths = submissionEntries(submission) + testDataFiles
+                    def run(dataFile):
+                        return self._runProgram('"'+submission.exeFile+'"', '', dataFile, maxRunTime, maxOutputLines, sourceDirectory,
+                            None, seedPaths)
+                    runTests(submission, submissionKey, run)
                 else:
                     print("Executable not found. Check compiler output.")
-                    self._reportErrorMsg("Executable not found. Check compiler output.<br>", outputFile)
-
-                self._removeFile(exeFile)
-                self._gradingBox(sourceDirectory, sourceFiles[0], outputFile, gradingTextLabel)
-                return
-
-
-            #compile the names of single-file programs and multi-file programs into a single list to enable sorting.
-            #note that this is a list of tuples.  The first element is the name of the file or directory.
-            #the second element specifies if the first is a filename or directory name.
-            filesAndDirs = []
-            for x in self.TopLevelFilesFound:
-                filesAndDirs.append((x,'file')) #add files
-
-            for x in self.SubDirsFound:
-                filesAndDirs.append((x,'dir'))  #add directories
-
-            filesAndDirs.sort()     #sort the list
-
-            print ("**********************************")
-            for x in filesAndDirs:
-                print (x)
-            print ("**********************************")
-
-            #now, process the sorted list depending on whether it is a single-file or directory.
-            for n, x in enumerate(filesAndDirs):
-                if x[1] == 'file':   #this is a file
-                    #we will process source code in the top-level directory as single-file programs                                                
-                    print ('=======================================================')
-                    print (x[0])
-                    print ('=======================================================')
-                    #doInnerCppProcessing([x[0]], 'student'+str(n))
-                    doInnerCppProcessing([x[0]], 'student')
-                elif x[1] == 'dir':     #this is a directory
-                    #we will process source code in sub-directories of the top-level directory as multi-file programs
-                    print ('=======================================================')
-                    print (x[0])
-                    print ('=======================================================')
-                    sourceFiles = []
-                    self._findFilesInDir(x[0], ".cpp", sourceFiles)  #add .h files to the files list
-                    self._findFilesInDir(x[0], ".cc", sourceFiles)  #add .h files to the files list
-                    self._findFilesInDir(x[0], ".h", sourceFiles)  #add .h files to the files list
-                    self._findFilesInDir(x[0], ".hpp", sourceFiles)  #add .hpp files to the files list
-                    #doInnerCppProcessing(sourceFiles, 'student'+str(n))
-                    doInnerCppProcessing(sourceFiles, 'student')
-                else:
-                    print ("***** EXCEPTION: Entity for processing is neither a file nor a directory. *****")
-                    
-                
-            self._reportErrorMsg('<br><br><b>**** ' + str(len(self.TopLevelFilesFound) + len(self.SubDirsFound)) + ' project(s) processed. ****</b>', outputFile)
+                    self._reportErrorMsg("Executable not found. Check compiler output.<br>", report)
+
+                self._removeFile(submission.exeFile)
+                self._gradingBox(sourceDirectory, submission.sourceFiles[0], report, 'student')
+
+            if not compileJobs:
+                compileJobs = multiprocessing.cpu_count()
+            #the translation units of multi-file projects are compiled concurrently too; keep the total within compileJobs
+            self._compilerSlots = threading.BoundedSemaphore(compileJobs)
+            self._compileLimits = (maxCompileTime, maxCompileCpuTime, maxCompileMemory)
+
+            #the executables wait for the run stage without limit, so that the compilers are never held up by slow runs
+            buildDirectory = tempfile.mkdtemp(prefix='AG_build_')
+            analysisPool = self._startAnalysisPool(numWorkers)
+            pch = None
+            if precompiledHeaders and not renderOnly:
+                pch = PrecompiledHeaders(interpreter, lambda args: self._runCompiler(args, maxOutputLines), AutoGrader.Const.PCH_MIN_USES,
+                    pchCache, buildDirectory)
+            try:
+                stages = [(analyzeCpp, numWorkers), (buildCpp, compileJobs), (runCpp, numWorkers, 0)]
+                if shards != None:
+                    stages.append((writeShard, numWorkers))
+                numProjects = self._processPipeline(discoverCpp, stages, report, shards == None)
+            finally:
+                shutil.rmtree(buildDirectory, ignore_errors=True)
+                self._compilerSlots = None
+                if analysisPool != None:
+                    analysisPool.shutdown()
+
+            self.TopLevelFilesFound = index.topLevelFiles([".cpp", ".cc"])
+            self.SubDirsFound = index.subDirsWithFiles([".cpp", ".cc"])
+            if shards != None:
+                numProjects = len(shards.entries)   #the index of a regrade keeps the entries of the other submissions
+            self._reportErrorMsg('<br><br><b>**** ' + str(numProjects) + ' project(s) processed. ****</b>', report)
+            if pch != None:
+                print (pch.summary())
+                self._reportErrorMsg('<br>' + pch.summary(), report)
 
         #--------- Python ---------
         elif language == 'Python':
-            print ('Find sub dirs')
-            #first, find all the subdirectories that contain a python source file that matches <sourceFilename>
-            #(_, self.SubDirsFound) = self._recursivelyFindFiles(sourceDirectory, sourceFilename)
-            #(_, self.SubDirsFound) = self._recursivelyFindFiles(sourceDirectory, '/' + sourceFilename)
-            self.SubDirsFound = self._recursivelyFindFile(sourceDirectory, sourceFilename)
-
-            print ('Find TLFs')
-            #now, find all .py files in the top level directory.
-            self.TopLevelFilesFound = self._findFilesInDir(sourceDirectory, ".py", [])
-            #(self.TopLevelFilesFound, _) = self._recursivelyFindFiles(sourceDirectory, ".py")
-
-
-            #does this block do anything??? 9/25/16
-            #if sourceFilename == "" or sourceFilename == None:
-                #self._recursivelyFindFiles(sourceDirectory, ".py")
-            #else:
-                #self._recursivelyFindFiles(sourceDirectory, '/' + sourceFilename)
-
+            #all .py files in the top level directory are single-file programs; all of the directories that
+            #contain a python source file that matches <sourceFilename> are multi-file programs
+            def discoverPython(discovery):
+                for relPath in index.scan():
+                    entries = []
+                    if relPath == '':
+                        entries = [(x, 'file') for x in index.topLevelFiles([".py"])]
+                    if sourceFilename and sourceFilename in index.dirs[relPath]['files']:
+                        entries.append((index.path(relPath), 'dir'))
+                    for x in entries:
+                        if not selected(x[0]):
+                            continue
+                        submission = Submission(len(discovery['submissions']), x[0], x[1])
+                        discovery['submissions'].append(submission)
+                        print (x)
+                        yield submission
+                discovery['bDone'] = True
+
+            def analyzePython(submission):
+                printHeader(submission)
+                if submission.kind == 'file':
+                    submission.sourceFiles = [submission.path]
+                    submission.topLevelModule = submission.path
+                else:
+                    submission.sourceFiles = index.files(submission.path, [".py"])
+                    submission.topLevelModule = submission.path + '/' + sourceFilename
 
-            def doInnerPythonProcessing(sourceFiles, topLevelModule, gradingTextLabel): #sourceFiles is a list of filenames
-                #get/report the analytics on the source files
-                self._reportFileAnalytics(sourceFiles, outputFile, language)
+                #get/report the analytics on the source files (computed in the shared process pool)
+                self._reportFileAnalytics(submission.sourceFiles, submission.fragment, language,
+                    self.analyzePythonFiles(submission.sourceFiles, executor=analysisPool))
                 
                 #include source code here if selected
                 if IncludeSourceInOutput == True:
-                    self._formatSource(sourceFiles, outputFile, language)
-
-
-                if len(testDataFiles) == 0:     #no input data required
-                    exec_time = self._shellExec('"'+interpreter+'"', topLevelModule, '', outputFile, maxRunTime, maxOutputLines, sourceDirectory)
-                    print (format("%0.4f" % exec_time) + " secs.")
-                    self._reportExecTime(exec_time, outputFile)
+                    self._formatSource(submission.sourceFiles, submission.fragment, language, preHighlight, highlightCache)
+
+            def checkPython(submission):
+                sourceFiles = [x for x in submission.sourceFiles if os.path.isfile(x)]
+                if submission.topLevelModule not in sourceFiles and os.path.isfile(submission.topLevelModule):
+                    sourceFiles.append(submission.topLevelModule)
+                submission.syntaxErrors = self._checkPythonSyntax(interpreter, sourceFiles, maxRunTime, syntaxCache, renderOnly)
+
+            def runPython(submission):
+                topLevelModule = submission.topLevelModule
+                #the syntax errors of all of the files are reported once
+                errors = [submission.syntaxErrors[x] for x in sorted(submission.syntaxErrors) if submission.syntaxErrors[x] != None]
+                if errors != []:
+                    report = submission.fragment
+                    report.write('<font face="verdana" color=" ' + AutoGrader.Const.HEADER_COLOR2 + '"><br>\n------------- syntax check -------------</font>\n')
+                    report.write('<pre><font face="courier" color="' + AutoGrader.Const.OUTPUT_COLOR + '">')
+                    self._writeOutput(escapeHtml(''.join(errors)), report)
+                    report.write('</font></pre>')
+                #a syntax error in the top-level module stops every run before any code is executed
+                if submission.syntaxErrors.get(topLevelModule) != None:
+                    print("Syntax error. The test data was not run.")
+                    self._reportErrorMsg("Syntax error. The test data was not run.<br>", submission.fragment)
                 else:
-                    for dataFile in testDataFiles:
-                        self._reportDataFile(dataFile, outputFile)
-                        
-                        #print the name of the datafile to indicate progress.  This is a temporary solution to allow us to identify
-                        #programs that don't end.  Ultimately, we will want to use a fork()/wait() pair and be able to set a max run time.
-                        _, filename =  os.path.split(dataFile)
-                        print ("processing '" + filename + "'...")
-                        exec_time = self._shellExec('"'+interpreter+'"', topLevelModule, dataFile, outputFile, maxRunTime, maxOutputLines, sourceDirectory)
-
-                        print (format("%0.4f" % exec_time) + " secs.")
-                        self._reportExecTime(exec_time, outputFile)
-                    print ()
-                    
-                self._gradingBox(sourceDirectory, sourceFiles[0], outputFile, gradingTextLabel)
-                return
-
-
-            #compile the names of single-file programs and multi-file programs into a single list to enable sorting.
-            #note that this is a list of tuples.  The first element is the name of the file or directory.
-            #the second element specifies if the first is a filename or directory name.
-            filesAndDirs = []
-            for x in self.TopLevelFilesFound:
-                filesAndDirs.append((x,'file')) #add files
-
-            for x in self.SubDirsFound:
-                filesAndDirs.append((x,'dir'))  #add directories
-
-            filesAndDirs.sort()     #sort the list
-
-            print ("**********************************")
-            for x in filesAndDirs:
-                print (x)
-            print ("**********************************")
-
-
-            #now, process the sorted list depending on whether it is a single-file or directory
-            for n, x in enumerate(filesAndDirs):
-                if x[1] == 'file':   #this is a file
-                    #we will process source code in the top-level directory as single-file programs                                                
-                    print ('=======================================================')
-                    print (x[0])
-                    print ('=======================================================')
-                    #doInnerPythonProcessing([x[0]], x[0], 'student'+str(n))
-                    doInnerPythonProcessing([x[0]], x[0], 'student')
-                elif x[1] == 'dir':     #this is a directory
-                    #we will process source code in sub-directories of the top-level directory as multi-file programs
-                    print ('=======================================================')
-                    print (x[0])
-                    print ('=======================================================')
-                    #doInnerPythonProcessing(self._findFilesInDir(x[0],".py", []), x[0]+'/'+sourceFilename, 'student'+str(n))
-                    doInnerPythonProcessing(self._findFilesInDir(x[0],".py", []), x[0]+'/'+sourceFilename, 'student')
-                else:
-                    print ("***** EXCEPTION: Entity for processing is neither a file nor a directory. *****")
-                    
-                
-            self._reportErrorMsg('<br><br><b>**** ' + str(len(self.TopLevelFilesFound) + len(self.SubDirsFound)) + ' project(s) processed. ****</b>', outputFile)
+                    submissionKey = self._submissionKey(submission.sourceFiles + [topLevelModule], interpreter, maxRunTime, maxOutputLines,
+                        submission.path if submission.kind == 'dir' else None, index.skipDirs)
+                    #a project directory is copied whole; from the shared top level directory only the submission's file
+                    seedPaths = submissionEntries(submission) + testDataFiles
+                    def run(dataFile):
+                        return self._runProgram('"'+interpreter+'"', topLevelModule, dataFile, maxRunTime, maxOutputLines, sourceDirectory, server,
+                            seedPaths)
+                    runTests(submission, submissionKey, run)
+                self._gradingBox(sourceDirectory, submission.sourceFiles[0], submission.fragment, 'student')
+
+            stages = [(analyzePython, numWorkers), (runPython, numWorkers)]
+            if syntaxCheck:
+                stages.insert(1, (checkPython, numWorkers))
+            if shards != None:
+                stages.append((writeShard, numWorkers))
+
+            #the analysis processes are forked before the fork server's reader thread and the grading threads start
+            analysisPool = self._startAnalysisPool(numWorkers)
+            server = None
+            if forkServer and not renderOnly:
+                server = ForkServer(interpreter, AutoGrader.Const.FORK_SERVER_PRELOAD)
+                if not server.start():
+                    print ("The fork server cannot be started with '" + interpreter + "'; programs are run by the shell.")
+                    server = None
+            try:
+                numProjects = self._processPipeline(discoverPython, stages, report, shards == None)
+            finally:
+                if server != None:
+                    server.close()
+                if analysisPool != None:
+                    analysisPool.shutdown()
+
+            self.TopLevelFilesFound = index.topLevelFiles([".py"])
+            self.SubDirsFound = index.dirsWithFile(sourceFilename)
+            if shards != None:
+                numProjects = len(shards.entries)   #the index of a regrade keeps the entries of the other submissions
+            self._reportErrorMsg('<br><br><b>**** ' + str(numProjects) + ' project(s) processed. ****</b>', report)
 
 
 
         #--------- Unknown language ---------
         else:
             print ('Unknown language choice: ' + language)
+            report.close()
             return
 
         
-        self._reportErrorMsg('<br><font face="verdana">', outputFile)
-        self._reportErrorMsg('Report Generator: AutoGrader v' + AutoGraderVersion  + '<br>', outputFile)
-        if language == 'C++':
-            self._reportErrorMsg('C++ Compiler: ' + interpreter + '<br>', outputFile)
-        elif language == 'Python':
-            self._reportErrorMsg('Python Interpreter: ' + interpreter + '<br>', outputFile)
+        if shards != None:
+            shards.save()
+            self._writeShardIndex(report, shards)
+            self._writeReportFooter(report, language, interpreter, AutoGraderVersion, False)
         else:
-            self._reportErrorMsg('Compiler/Interpreter: Not Specified <br>', outputFile)
-        self._reportErrorMsg('<br></font>', outputFile)
+            self._writeReportFooter(report, language, interpreter, AutoGraderVersion)
+        report.close()
 
-        self._writeOutput('''<font size='+6'><input type="button" style="font-size:20px;width:250px" value="Download Feedback" OnClick="download_feedback_file()">
-        <br><br></font></form>''', outputFile)
-
-
-        feedback_filename = 'feedback.txt'
-        download_script = '''
-        <script type="text/javascript">
-
-        function download_feedback_file()
-        {
-        
-          x = document.getElementsByName("student").length
-          msg = ""
-          for (i=0; i<x; i++)
-          {
-                msg = msg + document.getElementsByName("student")[i].value
-                msg = msg + '\\n\\n-------------------------------------------------------\\n'
-          }
-
-          var element = document.createElement('a');
-          element.setAttribute('href', 'data:text/plain;charset=utf-8,' + encodeURIComponent(msg));
-          element.setAttribute('download', "''' + feedback_filename + '''");
-
-          element.style.display = 'none';
-          document.body.appendChild(element);
-
-          element.click();
-
-          document.body.removeChild(element);
-        }
-
-        </script>
-        </body></html>
-
-        '''
-        self._writeOutput(download_script, outputFile)
-
-        self._writeOutput('</body></html>', outputFile)
+        if cacheDirectory:
+            buildCache.evict()
+            objectCache.evict()
+            pchCache.evict()
+            resultCache.evict()
+            syntaxCache.evict()
+            highlightCache.evict()
 
         
-        #open the output file using the default application
-        cmd = 'open "' + outputFile + '"'
-        os.system(cmd)
+        #open the output file using the default application.  A compressed report is not opened: a browser only displays
+        #it when a web server sends it with Content-Encoding: gzip
+        if compressReport:
+            print ("The compressed report was written to " + outputFile)
+        else:
+            cmd = 'open "' + outputFile + '"'
+            os.system(cmd)
             
         print ("***End***\n")
 
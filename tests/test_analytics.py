@@ -0,0 +1,104 @@
+import io
+
+from AutoGrader import AutoGrader, analyzeCppFile, analyzePythonFile
+
+
+CPP_SOURCE = u'''#include <iostream>   // a comment after an include
+#define TWICE(x) ((x) * 2)
+
+/* block comment
+   over two lines */
+int twice(int n)
+{
+    return TWICE(n);    // "not a string"
+}
+
+struct Point {
+    int x, y;
+    int sum() const { return x + y; }
+};
+
+int main() {
+    const char *s = "// not a comment /* nor this */";
+    auto f = [](int a) { return a; };
+
+    std::cout << twice(f(1)) << s << '\\n';
+}
+'''
+
+
+PYTHON_SOURCE = u'''"""module docstring"""
+import asyncio  # a comment
+
+
+async def fetch(n):
+    """fetch docstring"""
+    s = "# not a comment"
+    return n
+
+
+class Box:
+    """box docstring"""
+    def size(self):
+        x = 1  # trailing comment
+        """not a docstring: not the first statement"""
+        return x
+
+
+def outer():
+    async def inner():
+        pass
+    return inner
+'''
+
+
+def writeSource(path, text):
+    with io.open(str(path), 'w', encoding='utf-8') as f:
+        f.write(text)
+    return str(path)
+
+
+def test_cpp_counts(tmp_path):
+    sourceFile = writeSource(tmp_path / 'sample.cpp', CPP_SOURCE)
+    numLines, numComments, numCodeLines, numFunctions = analyzeCppFile(sourceFile)
+    assert numLines == 21
+    assert numComments == 3         #comment markers inside of literals do not count
+    assert numCodeLines == 15       #blank and comment-only lines are not code
+    assert numFunctions == 3        #twice, Point::sum and main; the lambda does not count
+
+
+def test_cpp_batch_matches_the_single_file_analysis(tmp_path):
+    sourceFiles = [writeSource(tmp_path / ('s' + str(i) + '.cpp'), CPP_SOURCE + u'int f' + str(i) + u'() { return 0; }\n')
+                   for i in range(4)]
+    expected = dict((sourceFile, analyzeCppFile(sourceFile)) for sourceFile in sourceFiles)
+    autoGrader = AutoGrader()
+    assert autoGrader.analyzeCppFiles(sourceFiles) == expected
+    assert autoGrader.analyzeCppFiles(sourceFiles, numWorkers=2) == expected
+    pool = autoGrader._startAnalysisPool(2)
+    try:
+        assert autoGrader.analyzeCppFiles(sourceFiles, executor=pool) == expected
+    finally:
+        if pool != None:
+            pool.shutdown()
+
+
+def test_python_counts(tmp_path):
+    sourceFile = writeSource(tmp_path / 'sample.py', PYTHON_SOURCE)
+    numLines, numDocStr, numComments, numDefs, numClasses = analyzePythonFile(sourceFile)
+    assert numLines == 22
+    assert numDocStr == 3           #module, fetch and Box
+    assert numComments == 2         #the '#' inside of the string literal does not count
+    assert numDefs == 4             #fetch, size, outer and inner; async functions count
+    assert numClasses == 1
+
+
+def test_python_batch_matches_the_single_file_analysis(tmp_path):
+    sourceFiles = [writeSource(tmp_path / ('s' + str(i) + '.py'), PYTHON_SOURCE + u'# file ' + str(i) + u'\n') for i in range(4)]
+    expected = dict((sourceFile, analyzePythonFile(sourceFile)) for sourceFile in sourceFiles)
+    autoGrader = AutoGrader()
+    pool = autoGrader._startAnalysisPool(2)
+    try:
+        assert autoGrader.analyzePythonFiles(sourceFiles, executor=pool) == expected
+    finally:
+        if pool != None:
+            pool.shutdown()
@@ -0,0 +1,90 @@
+import io
+import os
+import tarfile
+import zipfile
+
+from AutoGrader import ArchiveExtractor
+
+
+def makeZip(path, members):
+    """write a .zip file with the supplied name -> bytes members"""
+    with zipfile.ZipFile(path, 'w') as z:
+        for name in members:
+            z.writestr(name, members[name])
+    return path
+
+
+def makeTar(path, members):
+    """write a .tar.gz file with the supplied name -> bytes members"""
+    with tarfile.open(path, 'w:gz') as t:
+        for name in members:
+            info = tarfile.TarInfo(name)
+            info.size = len(members[name])
+            t.addfile(info, io.BytesIO(members[name]))
+    return path
+
+
+def extractor(maxBytes=1<<20, maxFiles=100, maxDepth=3):
+    return ArchiveExtractor(maxBytes, maxFiles, maxDepth)
+
+
+def test_zip_is_extracted_next_to_the_archive(tmp_path):
+    archive = makeZip(str(tmp_path / 'alice.zip'), {'main.py': b'print(1)\n', 'lib/helper.py': b'x = 1\n'})
+    message = extractor().extract(archive)
+    assert message.startswith('extracted: ')
+    assert (tmp_path / 'alice' / 'main.py').read_bytes() == b'print(1)\n'
+    assert (tmp_path / 'alice' / 'lib' / 'helper.py').read_bytes() == b'x = 1\n'
+
+
+def test_unchanged_archive_is_not_extracted_again(tmp_path):
+    archive = makeZip(str(tmp_path / 'alice.zip'), {'main.py': b'print(1)\n'})
+    extractor().extract(archive)
+    assert extractor().extract(archive).startswith('unchanged: ')
+
+
+def test_nested_archive_is_extracted(tmp_path):
+    inner = makeZip(str(tmp_path / 'inner.zip'), {'main.py': b'print(2)\n'})
+    with open(inner, 'rb') as f:
+        outer = makeTar(str(tmp_path / 'bob.tar.gz'), {'inner.zip': f.read()})
+    os.remove(inner)
+    assert extractor().extract(outer).startswith('extracted: ')
+    assert (tmp_path / 'bob' / 'inner' / 'main.py').read_bytes() == b'print(2)\n'
+
+
+def test_parent_directory_member_is_refused(tmp_path):
+    (tmp_path / 'class').mkdir()
+    archive = makeZip(str(tmp_path / 'class' / 'evil.zip'), {'ok.py': b'', '../escaped.py': b'boom'})
+    assert extractor().extract(archive).startswith('not extracted: ')
+    assert not (tmp_path / 'escaped.py').exists()
+    assert not (tmp_path / 'class' / 'evil').exists()
+
+
+def test_absolute_member_is_refused(tmp_path):
+    target = tmp_path / 'absolute.py'
+    archive = makeTar(str(tmp_path / 'evil.tar.gz'), {str(target): b'boom'})
+    assert extractor().extract(archive).startswith('not extracted: ')
+    assert not target.exists()
+    assert not (tmp_path / 'evil').exists()
+
+
+def test_size_limit(tmp_path):
+    archive = makeZip(str(tmp_path / 'big.zip'), {'a.txt': b'x' * 600, 'b.txt': b'x' * 600})
+    assert extractor(maxBytes=1000).extract(archive).startswith('not extracted: ')
+    assert not (tmp_path / 'big').exists()
+    assert extractor(maxBytes=1200).extract(archive).startswith('extracted: ')
+
+
+def test_file_count_limit(tmp_path):
+    archive = makeZip(str(tmp_path / 'many.zip'), dict(('f' + str(i) + '.txt', b'') for i in range(5)))
+    assert extractor(maxFiles=4).extract(archive).startswith('not extracted: ')
+    assert not (tmp_path / 'many').exists()
+    assert extractor(maxFiles=5).extract(archive).startswith('extracted: ')
+
+
+def test_failed_extraction_keeps_the_previous_tree(tmp_path):
+    archive = str(tmp_path / 'alice.zip')
+    makeZip(archive, {'main.py': b'print(1)\n'})
+    extractor().extract(archive)
+    makeZip(archive, {'main.py': b'print(2)\n', '../escaped.py': b''})
+    assert extractor().extract(archive).startswith('not extracted: ')
+    assert (tmp_path / 'alice' / 'main.py').read_bytes() == b'print(1)\n'
@@ -0,0 +1,108 @@
+import os
+import shutil
+import time
+
+from AutoGrader import FileCache
+
+
+def test_keys_depend_on_every_part():
+    assert FileCache.makeKey('a', 'b') == FileCache.makeKey('a', b'b')
+    assert FileCache.makeKey('a', 'b') != FileCache.makeKey('b', 'a')
+    #the parts are length prefixed: moving a boundary changes the key
+    assert FileCache.makeKey('ab', 'c') != FileCache.makeKey('a', 'bc')
+
+
+def test_hash_file_follows_the_contents(tmp_path):
+    a = tmp_path / 'a.txt'
+    b = tmp_path / 'b.txt'
+    a.write_bytes(b'same')
+    b.write_bytes(b'same')
+    assert FileCache.hashFile(str(a)) == FileCache.hashFile(str(b))
+    b.write_bytes(b'other')
+    assert FileCache.hashFile(str(a)) != FileCache.hashFile(str(b))
+
+
+def test_store_and_lookup(tmp_path):
+    cache = FileCache(str(tmp_path / 'cache'), 1<<20)
+    source = tmp_path / 'program.out'
+    source.write_bytes(b'\x7fELF')
+    key = FileCache.makeKey('g++', 'program.cpp')
+    assert cache.lookup(key) == None
+
+    entry = cache.store(key, files={'program.out': str(source)}, texts={'output.txt': u'warning: \u00e9\n'})
+    assert cache.lookup(key) == entry
+    with open(entry + '/program.out', 'rb') as f:
+        assert f.read() == b'\x7fELF'
+    assert cache.readText(entry, 'output.txt') == u'warning: \u00e9\n'
+    #no temporary entries are left behind
+    assert os.listdir(str(tmp_path / 'cache')) == [key]
+
+
+def test_second_store_keeps_the_first_entry(tmp_path):
+    cache = FileCache(str(tmp_path / 'cache'), 1<<20)
+    key = FileCache.makeKey('run')
+    cache.store(key, texts={'result.json': u'1'})
+    entry = cache.store(key, texts={'result.json': u'2'})
+    assert cache.readText(entry, 'result.json') == u'1'
+    assert len(os.listdir(str(tmp_path / 'cache'))) == 1
+
+
+def test_replacing_store_updates_the_entry(tmp_path):
+    cache = FileCache(str(tmp_path / 'cache'), 1<<20)
+    key = FileCache.makeKey('manifest')
+    cache.store(key, texts={'dependencies.json': u'["a.h"]'})
+    entry = cache.store(key, texts={'dependencies.json': u'["b.h"]'}, bReplace=True)
+    assert cache.readText(entry, 'dependencies.json') == u'["b.h"]'
+    #the old entry is not left behind
+    assert os.listdir(str(tmp_path / 'cache')) == [key]
+
+
+def test_evict_removes_the_least_recently_used_entries(tmp_path):
+    cache = FileCache(str(tmp_path / 'cache'), 250)
+    keys = [FileCache.makeKey(str(i)) for i in range(3)]
+    now = time.time()
+    for i, key in enumerate(keys):
+        entry = cache.store(key, texts={'data': u'x' * 100})
+        os.utime(entry, (now - 100 + i, now - 100 + i))
+    #using the oldest entry makes it the most recently used one
+    assert cache.lookup(keys[0]) != None
+
+    cache.evict()
+    assert cache.lookup(keys[1]) == None
+    assert cache.lookup(keys[0]) != None
+    assert cache.lookup(keys[2]) != None
+
+
+def test_evict_keeps_a_cache_within_its_limit(tmp_path):
+    cache = FileCache(str(tmp_path / 'cache'), 1<<20)
+    keys = [FileCache.makeKey(str(i)) for i in range(3)]
+    for key in keys:
+        cache.store(key, texts={'data': u'x' * 100})
+    cache.evict()
+    assert all(cache.lookup(key) != None for key in keys)
+
+
+def test_evict_ignores_entries_removed_while_it_runs(tmp_path, monkeypatch):
+    cache = FileCache(str(tmp_path / 'cache'), 150)
+    keys = [FileCache.makeKey(str(i)) for i in range(4)]
+    now = time.time()
+    entries = []
+    for i, key in enumerate(keys):
+        entries.append(cache.store(key, texts={'data': u'x' * 100}))
+        os.utime(entries[-1], (now - 100 + i, now - 100 + i))
+
+    #another grader evicts an entry while its files are measured, and another one before its mtime is read
+    getsize, getmtime = os.path.getsize, os.path.getmtime
+    def removingGetsize(path):
+        if path.startswith(entries[1] + '/'):
+            shutil.rmtree(entries[1])
+        return getsize(path)
+    def removingGetmtime(path):
+        if path == entries[2]:
+            shutil.rmtree(entries[2])
+        return getmtime(path)
+    monkeypatch.setattr(os.path, 'getsize', removingGetsize)
+    monkeypatch.setattr(os.path, 'getmtime', removingGetmtime)
+
+    cache.evict()
+    assert os.listdir(str(tmp_path / 'cache')) == [keys[3]]
@@ -0,0 +1,58 @@
+import os
+import signal
+import subprocess
+import sys
+
+from AutoGrader import OutputCapture
+
+
+def capturePipe(data, maxNumLines, maxNumBytes):
+    """capture data written to a pipe"""
+    r, w = os.pipe()
+    capture = OutputCapture(os.fdopen(r, 'rb'), maxNumLines, maxNumBytes)
+    os.write(w, data)
+    os.close(w)
+    assert capture.join(10)
+    return capture
+
+
+def test_output_within_the_limits_is_kept():
+    capture = capturePipe(b'a\nb\n', 2, 100)
+    assert capture.getvalue() == b'a\nb\n'
+    assert not capture.bLimitExceeded
+
+
+def test_output_is_cut_after_max_lines():
+    capture = capturePipe(b'a\nb\nc\nd\n', 2, 100)
+    assert capture.getvalue() == b'a\nb\n'
+    assert capture.bLimitExceeded
+
+
+def test_output_is_cut_after_max_bytes():
+    capture = capturePipe(b'x' * 50 + b'\n', 10, 20)
+    assert capture.getvalue() == b'x' * 20
+    assert capture.bLimitExceeded
+
+
+def test_flooding_program_is_killed():
+    p = subprocess.Popen([sys.executable, '-c', 'while True: print("flood")'], stdout=subprocess.PIPE)
+    killed = []
+    def kill():
+        killed.append(True)
+        p.kill()
+    capture = OutputCapture(p.stdout, 100, 4000, kill)
+    assert capture.join(30)
+    assert p.wait() == -signal.SIGKILL
+    assert killed == [True]
+    assert capture.getvalue() == b'flood\n' * 100
+
+
+def test_output_past_the_limit_is_drained():
+    #without a kill, a child writing far more than a pipe holds still runs to its end
+    p = subprocess.Popen([sys.executable, '-c', 'import sys\nfor i in range(20000): sys.stdout.write("x" * 99 + "\\n")\n'
+        'sys.exit(7)'], stdout=subprocess.PIPE)
+    capture = OutputCapture(p.stdout, 10, 10000)
+    assert capture.join(30)
+    assert p.wait() == 7
+    assert capture.bLimitExceeded
+    assert capture.getvalue() == (b'x' * 99 + b'\n') * 10
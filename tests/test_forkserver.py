@@ -0,0 +1,74 @@
+import os
+import signal
+import sys
+import threading
+import time
+
+import pytest
+
+from AutoGrader import ForkServer
+
+
+@pytest.fixture
+def server():
+    server = ForkServer(sys.executable, ['json'])
+    if not server.start():
+        pytest.skip('the fork server cannot run here')
+    yield server
+    server.close()
+
+
+def runToEnd(server, tmp_path, source, dataFile='', limits=None):
+    """run source through server and return the process and its output"""
+    sourceFile = str(tmp_path / 'main.py')
+    with open(sourceFile, 'w') as f:
+        f.write(source)
+    process, done = server.run(sourceFile, dataFile, str(tmp_path), limits)
+    output = process.stdout.read()
+    process.stdout.close()
+    assert done.wait(30)
+    return process, output
+
+
+def test_program_runs_with_its_input(server, tmp_path):
+    dataFile = str(tmp_path / 'data.txt')
+    with open(dataFile, 'w') as f:
+        f.write('21\n')
+    process, output = runToEnd(server, tmp_path, 'import os\nprint(int(input()) * 2)\nprint(os.getcwd())\nraise SystemExit(4)\n',
+        dataFile)
+    assert output.decode('utf-8').split('\n')[:2] == ['42', str(tmp_path)]
+    assert process.returncode == 4
+    userTime, systemTime, maxMemory, bMemoryBound, bMemorySampled = process.resourceUsage
+    assert bMemoryBound and not bMemorySampled
+
+
+def test_program_runs_with_the_limits(server, tmp_path):
+    source = 'open("big.txt", "w").write("x" * 100000)\n'
+    process, output = runToEnd(server, tmp_path, source)
+    assert process.returncode == 0
+    #a file larger than the limit cannot be written (Python ignores SIGXFSZ)
+    process, output = runToEnd(server, tmp_path, source, limits=[('RLIMIT_FSIZE', 1000)])
+    assert process.returncode == 1
+    assert b'File too large' in output
+
+
+def test_dead_server_fails_the_waiting_run_fast(server, tmp_path):
+    sourceFile = str(tmp_path / 'main.py')
+    with open(sourceFile, 'w') as f:
+        f.write('print(1)\n')
+    #the stopped server does not answer; the run waits for it until it dies
+    os.kill(server.server.pid, signal.SIGSTOP)
+    started = []
+    thread = threading.Thread(target=lambda: started.append(server.run(sourceFile, '', str(tmp_path))))
+    thread.daemon = True
+    thread.start()
+    time.sleep(0.2)
+    assert started == []
+
+    server.server.kill()
+    thread.join(ForkServer.POLL_INTERVAL * 5)
+    assert started == [None]
+    #later runs do not wait at all
+    start = time.time()
+    assert server.run(sourceFile, '', str(tmp_path)) == None
+    assert time.time() - start < 1
@@ -0,0 +1,65 @@
+import re
+
+from AutoGrader import escapeHtml, highlightSource
+
+
+def plainText(html):
+    """return the text of a highlighted listing: the html without its tags, unescaped"""
+    text = re.sub(r'<[^>]*>', '', html)
+    return text.replace('&lt;', '<').replace('&gt;', '>').replace('&quot;', '"').replace('&amp;', '&')
+
+
+def test_escape_html():
+    assert escapeHtml('a < b && c > "d"') == 'a &lt; b &amp;&amp; c &gt; &quot;d&quot;'
+    assert escapeHtml('&lt;') == '&amp;lt;'
+    assert escapeHtml('plain') == 'plain'
+
+
+def test_python_tokens():
+    html = highlightSource('x = "<a>"  # note\nif x:\n    print(1)\n', 'Python')
+    assert html.startswith('<pre class="AG_source">') and html.endswith('</pre>')
+    assert '<span class="st">&quot;&lt;a&gt;&quot;</span>' in html
+    assert '<span class="cm"># note</span>' in html
+    assert '<span class="kw">if</span>' in html
+    assert '<span class="bi">print</span>' in html
+    assert '<span class="nu">1</span>' in html
+
+
+def test_cpp_tokens():
+    html = highlightSource('#include <vector>\nint main() { /* a<b */ return 0; } // end\n', 'C++')
+    assert '<span class="pp">#include &lt;vector&gt;</span>' in html
+    assert '<span class="cm">/* a&lt;b */</span>' in html
+    assert '<span class="cm">// end</span>' in html
+    assert '<span class="kw">int</span>' in html
+    assert '<span class="kw">return</span>' in html
+
+
+def test_lines_are_numbered():
+    html = highlightSource('a\n"""one\ntwo"""\n\nb', 'Python')
+    numbers = re.findall(r'<span class="ln" data-n="(\d+)"></span>', html)
+    assert numbers == ['1', '2', '3', '4', '5']
+    #a span that covers several lines is closed and reopened on every line
+    assert '<span class="st">&quot;&quot;&quot;one</span>\n' in html
+    assert '<span class="st">two&quot;&quot;&quot;</span>' in html
+
+
+def test_text_is_kept():
+    sources = {
+        'Python': 'def f(x):\n    """doc <b>"""\n    return x & 1  # a && b\n',
+        'C++': '#include <map>\nint f(int x) { return x < 1 && x > -1 ? \'"\' : "</pre>"; }\n',
+    }
+    for language in sources:
+        html = highlightSource(sources[language], language)
+        assert '</pre>' not in html[:-len('</pre>')]
+        assert plainText(html) == sources[language]
+
+
+def test_syntax_error_leaves_the_rest_plain():
+    html = highlightSource('def f(:\n  <\n', 'Python')
+    assert '<span class="kw">def</span>' in html
+    assert '&lt;' in html
+    assert plainText(html) == 'def f(:\n  <\n'
+
+
+def test_unknown_language_is_escaped_only():
+    assert highlightSource('<x>', 'Text') == '<pre class="AG_source"><span class="ln" data-n="1"></span>&lt;x&gt;\n</pre>'
@@ -0,0 +1,90 @@
+import json
+import os
+import time
+
+from AutoGrader import AutoGrader, SubmissionIndex
+
+
+def writeFile(path, text=''):
+    if not os.path.isdir(os.path.dirname(path)):
+        os.makedirs(os.path.dirname(path))
+    with open(path, 'w') as f:
+        f.write(text)
+
+
+def age(directory):
+    """set the mtime of every directory below directory to a minute ago (an index entry is only reused for a directory
+    that has not changed within the last second)"""
+    then = time.time() - 60
+    for dirpath, dirnames, filenames in os.walk(directory):
+        os.utime(dirpath, (then, then))
+
+
+def makeClass(tmp_path):
+    top = str(tmp_path / 'class')
+    writeFile(top + '/alice_1_main.py')
+    writeFile(top + '/bob_2_project/main.py')
+    writeFile(top + '/bob_2_project/helper.py')
+    writeFile(top + '/bob_2_project/.hidden.py')
+    writeFile(top + '/bob_2_project/__pycache__/helper.pyc')
+    writeFile(top + '/carl_3_project/src/main.cpp')
+    writeFile(top + '/alice_output/result.py')
+    age(top)
+    return top
+
+
+def countLists(monkeypatch):
+    listed = []
+    original = SubmissionIndex._list
+    def list(self, path):
+        listed.append(path)
+        return original(self, path)
+    monkeypatch.setattr(SubmissionIndex, '_list', list)
+    return listed
+
+
+def test_skipped_directories_are_not_indexed(tmp_path):
+    top = makeClass(tmp_path)
+    index = SubmissionIndex(top, AutoGrader.Const.DEFAULT_SKIP_DIRS)
+    assert sorted(index.dirs) == ['', 'bob_2_project', 'carl_3_project', 'carl_3_project/src']
+    assert index.topLevelFiles(['.py']) == [top + '/alice_1_main.py']
+    assert sorted(index.files(top + '/bob_2_project', ['.py'])) == [top + '/bob_2_project/helper.py', top + '/bob_2_project/main.py']
+    assert index.subDirsWithFiles(['.cpp']) == [top + '/carl_3_project/src']
+    assert index.dirsWithFile('main.py') == [top + '/bob_2_project']
+
+
+def test_saved_index_round_trips(tmp_path):
+    top = makeClass(tmp_path)
+    indexFile = str(tmp_path / 'index' / 'index.json')
+    first = SubmissionIndex(top, AutoGrader.Const.DEFAULT_SKIP_DIRS, indexFile)
+    with open(indexFile) as f:
+        assert json.load(f)['dirs'] == first.dirs
+
+    second = SubmissionIndex(top, AutoGrader.Const.DEFAULT_SKIP_DIRS, indexFile)
+    assert second.dirs == first.dirs
+
+
+def test_unchanged_directories_are_not_listed_again(tmp_path, monkeypatch):
+    top = makeClass(tmp_path)
+    indexFile = str(tmp_path / 'index.json')
+    SubmissionIndex(top, AutoGrader.Const.DEFAULT_SKIP_DIRS, indexFile)
+
+    listed = countLists(monkeypatch)
+    SubmissionIndex(top, AutoGrader.Const.DEFAULT_SKIP_DIRS, indexFile)
+    assert listed == []
+    #an index saved with other skipDirs is not used
+    SubmissionIndex(top, ['__pycache__'], indexFile)
+    assert top + '/alice_output' in listed and top in listed
+
+
+def test_new_file_in_a_changed_directory_is_found(tmp_path, monkeypatch):
+    top = makeClass(tmp_path)
+    indexFile = str(tmp_path / 'index.json')
+    SubmissionIndex(top, AutoGrader.Const.DEFAULT_SKIP_DIRS, indexFile)
+
+    writeFile(top + '/carl_3_project/src/extra.cpp')
+    listed = countLists(monkeypatch)
+    index = SubmissionIndex(top, AutoGrader.Const.DEFAULT_SKIP_DIRS, indexFile)
+    assert listed == [top + '/carl_3_project/src']
+    assert sorted(index.files(top + '/carl_3_project/src', ['.cpp'])) == [top + '/carl_3_project/src/extra.cpp',
+        top + '/carl_3_project/src/main.cpp']
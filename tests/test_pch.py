@@ -0,0 +1,75 @@
+import os
+
+import pytest
+
+from AutoGrader import AutoGrader, PrecompiledHeaders
+
+
+HAS_GXX = any(os.access(os.path.join(d, 'g++'), os.X_OK) for d in os.environ.get('PATH', '').split(os.pathsep))
+
+
+def writeUnit(tmp_path, name, text):
+    path = str(tmp_path / name)
+    with open(path, 'w') as f:
+        f.write(text)
+    return path
+
+
+def test_leading_includes(tmp_path):
+    unit = writeUnit(tmp_path, 'a.cpp', '// a comment\n\n#include <vector>\n/* a\nblock */\n#  include <map> // maps\n'
+        '#include "local.h"\n#include <string>\n')
+    assert PrecompiledHeaders.leadingIncludes(unit) == ['vector', 'map']
+
+
+def test_unit_without_leading_includes_gets_no_header(tmp_path):
+    pch = PrecompiledHeaders('g++', None, 1)
+    unit = writeUnit(tmp_path, 'a.cpp', '#include "local.h"\n#include <vector>\n')
+    assert pch.headerFor(unit) == (None, None)
+
+
+@pytest.mark.skipif(not HAS_GXX, reason='g++ is not installed')
+def test_second_unit_with_the_same_includes_uses_the_precompiled_header(tmp_path):
+    grader = AutoGrader()
+    pch = PrecompiledHeaders('g++', lambda args: grader._runCompiler(args, 100), 2, directory=str(tmp_path))
+    first = writeUnit(tmp_path, 'first.cpp', '#include <vector>\n#include <string>\nint first() { return std::vector<int>(1).size(); }\n')
+    second = writeUnit(tmp_path, 'second.cpp', '#include <vector>\n#include <string>\nint second() { return std::string("ab").size(); }\n')
+    other = writeUnit(tmp_path, 'other.cpp', '#include <map>\nint other() { return 0; }\n')
+
+    #the header is precompiled once two units ask for it
+    key, header = pch.headerFor(first)
+    assert header == None
+    assert pch.headerFor(other)[1] == None
+    secondKey, header = pch.headerFor(second)
+    assert secondKey == key and header != None
+    assert os.path.isfile(header + '.gch')
+    assert pch.headerFor(other)[1] != None and pch.numBuilt == 2
+
+    #g++ -H marks the precompiled header it uses with '!'
+    objFile = str(tmp_path / 'second.o')
+    output, bLimitExceeded = grader._compileWithPch(lambda options: 'g++ -H ' + options + '-c -o "' + objFile + '" "' + second + '"',
+        second, objFile, 100, pch)
+    assert os.path.isfile(objFile) and not bLimitExceeded
+    assert '! ' + header + '.gch' in output
+    assert pch.numUses == 1
+
+
+def test_time_saved_is_estimated_per_block_of_includes():
+    pch = PrecompiledHeaders('g++', None, 2)
+    #the first unit compiled without the header, the next two with it
+    pch.recordCompile('a', None, 2.0)
+    pch.recordCompile('a', 'a.h', 0.5)
+    pch.recordCompile('a', 'a.h', 0.5)
+    pch.buildCosts['a'] = 0.5
+    #a header precompiled in a previous run has no compilation without it
+    pch.recordCompile('b', 'b.h', 0.5)
+    #units without a block of includes do not count
+    pch.recordCompile(None, None, 10.0)
+    assert pch.numUses == 3
+    assert pch.summary().endswith('; estimated compile time saved: 2.50 sec. (1 precompiled header(s) measured)')
+
+
+def test_no_estimate_without_a_baseline():
+    pch = PrecompiledHeaders('g++', None, 2)
+    pch.recordCompile('b', 'b.h', 0.5)
+    pch.recordCompile(None, None, 10.0)
+    assert pch.summary() == 'Precompiled headers: 1 compilation(s) used 0 precompiled header(s) (0 built in this run).'
@@ -0,0 +1,124 @@
+import random
+import threading
+import time
+
+import pytest
+
+from AutoGrader import AutoGrader, Pipeline
+
+
+def drain(pipeline):
+    """return the items of pipeline.results() and the exception it raised (None if it did not), failing if it hangs"""
+    outcome = {'items': [], 'exception': None}
+    def read():
+        try:
+            for item in pipeline.results():
+                outcome['items'].append(item)
+        except Exception as e:
+            outcome['exception'] = e
+        pipeline.close()
+    thread = threading.Thread(target=read)
+    thread.daemon = True
+    thread.start()
+    thread.join(30)
+    assert not thread.is_alive(), 'the pipeline hangs'
+    return outcome['items'], outcome['exception']
+
+
+def sleepAWhile(item):
+    time.sleep(random.random() * 0.01)
+
+
+def test_single_worker_stages_keep_the_order():
+    items, exception = drain(Pipeline(range(50), [(sleepAWhile, 1), (sleepAWhile, 1)]))
+    assert exception == None
+    assert items == list(range(50))
+
+
+class Submission:
+    def __init__(self, n):
+        self.n = n
+        self.fragment = 'fragment ' + str(n)
+
+    def sortKey(self):
+        return self.n
+
+
+class Report:
+    def __init__(self):
+        self.fragments = []
+
+    def writeFragment(self, fragment):
+        self.fragments.append(fragment)
+
+    def close(self):
+        pass
+
+
+def test_report_is_written_in_order_by_concurrent_stages():
+    def discover(discovery):
+        for n in random.sample(range(40), 40):
+            submission = Submission(n)
+            discovery['submissions'].append(submission)
+            yield submission
+        discovery['bDone'] = True
+
+    report = Report()
+    assert AutoGrader()._processPipeline(discover, [(sleepAWhile, 4), (sleepAWhile, 3)], report) == 40
+    assert report.fragments == ['fragment ' + str(n) for n in range(40)]
+
+
+def test_slow_stage_bounds_the_items_ahead_of_it():
+    produced = [0]
+    lead = [0]      #max # of items produced ahead of the one the slow stage works on
+    def source():
+        for i in range(20):
+            produced[0] += 1
+            yield i
+    def slow(item):
+        lead[0] = max(lead[0], produced[0] - item)
+        time.sleep(0.01)
+
+    items, exception = drain(Pipeline(source(), [(slow, 1, 1)]))
+    assert exception == None and len(items) == 20
+    #the item being processed, one waiting in the queue and one the source is putting
+    assert lead[0] <= 3
+
+
+def test_source_exception_reaches_results():
+    def source():
+        yield 1
+        yield 2
+        raise ValueError('bad source')
+
+    items, exception = drain(Pipeline(source(), [(sleepAWhile, 2)]))
+    assert isinstance(exception, ValueError) and str(exception) == 'bad source'
+
+
+def test_stage_exception_reaches_results():
+    def check(item):
+        if item == 5:
+            raise KeyError(item)
+
+    items, exception = drain(Pipeline(range(100), [(sleepAWhile, 3), (check, 2), (sleepAWhile, 1)]))
+    assert isinstance(exception, KeyError)
+    assert 5 not in items
+
+
+def test_stage_exception_closes_the_report():
+    def discover(discovery):
+        for n in range(10):
+            submission = Submission(n)
+            discovery['submissions'].append(submission)
+            yield submission
+        discovery['bDone'] = True
+    def fail(submission):
+        if submission.n == 3:
+            raise RuntimeError('stage failed')
+
+    closed = []
+    report = Report()
+    report.close = lambda: closed.append(True)
+    with pytest.raises(RuntimeError):
+        AutoGrader()._processPipeline(discover, [(fail, 2)], report)
+    assert closed == [True]
@@ -0,0 +1,135 @@
+import io
+import json
+import os
+import re
+import sys
+
+import pytest
+
+from AutoGrader import AutoGrader
+
+
+PYTHON_SUBMISSIONS = {
+    'alice_1_main.py': 'n = int(input())\nprint(n * 2)\n',
+    'bob_2_main.py': '#no input read\nprint("hello <world>")\n',
+    'carl_3_main.py': 'import sys\nsys.stderr.write("oops\\n")\nraise SystemExit(3)\n',
+    'dina_4_project/main.py': 'from helper import twice\nprint(twice(int(input())))\n',
+    'dina_4_project/helper.py': 'def twice(n):\n    """return 2n"""\n    return 2 * n\n',
+}
+
+CPP_SUBMISSIONS = {
+    'alice_1_a.cpp': '#include <iostream>\nint main() { int n; std::cin >> n; std::cout << n * 2 << "\\n"; }\n',
+    'bob_2_b.cpp': '#include <iostream>\nint main() { std::cout << "hello <world>\\n"; return 1; }\n',
+    'carl_3_c.cpp': '#include <iostream>\nint main() { undefined(); }\n',
+    'dina_4_project/main.cpp': '#include <iostream>\n#include "twice.h"\nint main() { int n; std::cin >> n; std::cout << twice(n) << "\\n"; }\n',
+    'dina_4_project/twice.h': 'int twice(int n);\n',
+    'dina_4_project/twice.cpp': '#include "twice.h"\nint twice(int n) { return 2 * n; }\n',
+}
+
+
+def writeFiles(directory, files):
+    for name in files:
+        path = os.path.join(directory, name)
+        if not os.path.isdir(os.path.dirname(path)):
+            os.makedirs(os.path.dirname(path))
+        with io.open(path, 'w', encoding='utf-8') as f:
+            f.write(files[name])
+
+
+def grade(tmp_path, language, submissions, interpreter, reportName, **options):
+    """grade the submissions (name -> source) with two test data files and return the report without its timings"""
+    sourceDirectory = str(tmp_path / 'class')
+    if not os.path.isdir(sourceDirectory):
+        writeFiles(sourceDirectory, submissions)
+        writeFiles(str(tmp_path / 'data'), {'t1.txt': '21\n', 't2.txt': '5\n'})
+    outputFile = str(tmp_path / reportName)
+    AutoGrader().processFiles([str(tmp_path / 'data' / 't1.txt'), str(tmp_path / 'data' / 't2.txt')], sourceDirectory,
+        'main.py' if language == 'Python' else '', outputFile, language, True, 10, interpreter, 20, 'test', **options)
+    with io.open(outputFile, encoding='utf-8') as f:
+        report = f.read()
+    report = re.sub(r'\[Execution Time: [0-9.]+ sec\.\]', '[Execution Time]', report)
+    return re.sub(r'\[CPU Time: [^\n]*\n', '[CPU Time]\n', report)
+
+
+@pytest.fixture(autouse=True)
+def noViewer(monkeypatch):
+    #the grader opens the report with the default application when it is done
+    monkeypatch.setattr(os, 'system', lambda cmd: 0)
+
+
+def test_python_report_does_not_depend_on_the_workers(tmp_path):
+    serial = grade(tmp_path, 'Python', PYTHON_SUBMISSIONS, sys.executable, 'serial.html', numWorkers=1)
+    concurrent = grade(tmp_path, 'Python', PYTHON_SUBMISSIONS, sys.executable, 'concurrent.html', numWorkers=4, testJobs=2)
+    assert serial == concurrent
+    assert '42' in serial and '10' in serial
+    assert 'hello &lt;world&gt;' in serial
+    assert 'oops' in serial
+    assert serial.count('[Execution Time]') == 8     #4 programs x 2 test data files
+
+
+@pytest.mark.skipif(not any(os.access(os.path.join(d, 'g++'), os.X_OK) for d in os.environ.get('PATH', '').split(os.pathsep)),
+                    reason='g++ is not installed')
+def test_cpp_report_does_not_depend_on_the_workers(tmp_path):
+    serial = grade(tmp_path, 'C++', CPP_SUBMISSIONS, 'g++', 'serial.html', numWorkers=1, compileJobs=1)
+    concurrent = grade(tmp_path, 'C++', CPP_SUBMISSIONS, 'g++', 'concurrent.html', numWorkers=4, compileJobs=3, testJobs=2)
+    assert serial == concurrent
+    assert '42' in serial and '10' in serial
+    assert 'hello &lt;world&gt;' in serial
+    assert 'undefined' in serial
+
+
+def test_lazy_report_embeds_every_submission(tmp_path):
+    submissions = dict(PYTHON_SUBMISSIONS)
+    submissions['erin_5_main.py'] = 'print("</script><b>")\n'
+    grade(tmp_path, 'Python', submissions, sys.executable, 'lazy.html', lazyReport=True)
+    eager = grade(tmp_path, 'Python', submissions, sys.executable, 'eager.html')
+    #the timings are normalized once the sections are decoded
+    with io.open(str(tmp_path / 'lazy.html'), encoding='utf-8') as f:
+        report = f.read()
+
+    m = re.search(r'<script type="application/json" id="AG_index">(.*?)</script>', report)
+    index = json.loads(m.group(1))
+    assert len(index) == 5
+    sections = re.findall(r'<div class="AG_section" id="AG_section_(\d+)" data-n="(\d+)"', report)
+    assert sections == [(str(n), str(n)) for n in range(5)]
+
+    #the script renders section n from AG_data_n when AG_section_n comes into view
+    assert 'new IntersectionObserver' in report
+    assert 'document.getElementById("AG_section_" + n)' in report
+    assert 'document.getElementById("AG_data_" + n)' in report
+    assert 'getAttribute("data-n")' in report
+
+    html = ''
+    for n in range(5):
+        m = re.search(r'<script type="application/json" id="AG_data_' + str(n) + r'">(.*?)</script>', report)
+        html += json.loads(m.group(1))
+    html = re.sub(r'\[Execution Time: [0-9.]+ sec\.\]', '[Execution Time]', html)
+    html = re.sub(r'\[CPU Time: [^\n]*\n', '[CPU Time]\n', html)
+    #the sections hold the html of the eager report, in the same order
+    assert html in eager
+    assert '42' in html and 'hello &lt;world&gt;' in html and '&lt;/script&gt;&lt;b&gt;' in html
+
+
+def test_syntax_check_stops_only_the_broken_submission(tmp_path):
+    submissions = {
+        'alice_1_main.py': 'n = int(input())\nprint(n * 2)\n',
+        'bob_2_main.py': 'print("never run")\nif True\n    print(1)\n',
+    }
+    report = grade(tmp_path, 'Python', submissions, sys.executable, 'checked.html', syntaxCheck=True)
+    alice, bob = report.split('bob_2_main.py', 1)
+    assert '------------- syntax check -------------' in bob and 'SyntaxError' in bob
+    assert 'Syntax error. The test data was not run.' in bob
+    #the valid submission is checked and run as usual
+    assert '------------- syntax check -------------' not in alice
+    assert '42' in alice
+    #only the valid submission ran its two test data files
+    assert report.count('[Execution Time]') == 2 and alice.count('[Execution Time]') == 2
+
+
+def test_syntax_check_results(tmp_path):
+    valid = str(tmp_path / 'valid.py')
+    broken = str(tmp_path / 'broken.py')
+    writeFiles(str(tmp_path), {'valid.py': 'print(1)\n', 'broken.py': 'def f(:\n    pass\n'})
+    errors = AutoGrader()._checkPythonSyntax(sys.executable, [valid, broken], 10)
+    assert errors[valid] == None
+    assert 'broken.py' in errors[broken] and 'SyntaxError' in errors[broken]
@@ -0,0 +1,51 @@
+import os
+import stat
+import sys
+
+from AutoGrader import AutoGrader
+
+
+def writeFile(path, text):
+    if not os.path.isdir(os.path.dirname(path)):
+        os.makedirs(os.path.dirname(path))
+    with open(path, 'w') as f:
+        f.write(text)
+
+
+def test_created_files_are_moved_to_the_output_directory(tmp_path):
+    classDirectory = str(tmp_path / 'class')
+    sourceFile = classDirectory + '/alice_1_main.py'
+    writeFile(sourceFile, 'open("result.txt", "w").write(open("data.txt").read() * 2)\n'
+        'open("data.txt", "w").write("changed")\nprint("done")\n')
+    dataFile = str(tmp_path / 'data.txt')
+    writeFile(dataFile, 'ab')
+
+    grader = AutoGrader()
+    result = grader._runProgram('"' + sys.executable + '"', sourceFile, '', 10, 20, classDirectory,
+        seedPaths=[sourceFile, dataFile])
+    assert result['output'] == 'done\n' and result['exitCode'] == 0
+    #only the new file is harvested; the seeds are left alone
+    assert os.listdir(classDirectory + '/alice_output') == ['result.txt']
+    with open(classDirectory + '/alice_output/result.txt') as f:
+        assert f.read() == 'abab'
+    with open(dataFile) as f:
+        assert f.read() == 'ab'
+    assert sorted(os.listdir(classDirectory)) == ['alice_1_main.py', 'alice_output']
+
+
+def test_read_only_seeds_are_linked(tmp_path):
+    project = str(tmp_path / 'project')
+    writeFile(project + '/main.py', 'print(1)\n')
+    writeFile(project + '/data/input.txt', '1 2 3\n')
+    os.chmod(project + '/data/input.txt', stat.S_IRUSR)
+    os.symlink('data/input.txt', project + '/input.txt')
+
+    grader = AutoGrader()
+    grader._scratchRootDirectory = str(tmp_path)    #the same device as the seeds
+    scratch = grader._makeScratchCopy([project])
+    copy = scratch + '/project'
+    assert os.path.samefile(copy + '/data/input.txt', project + '/data/input.txt')
+    assert not os.path.samefile(copy + '/main.py', project + '/main.py')
+    assert os.readlink(copy + '/input.txt') == 'data/input.txt'
+    with open(copy + '/main.py') as f:
+        assert f.read() == 'print(1)\n'
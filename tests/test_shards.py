@@ -0,0 +1,86 @@
+import io
+import json
+import os
+import sys
+
+import pytest
+
+from AutoGrader import AutoGrader, ReportShards
+from test_report import PYTHON_SUBMISSIONS, writeFiles
+
+
+@pytest.fixture(autouse=True)
+def noViewer(monkeypatch):
+    monkeypatch.setattr(os, 'system', lambda cmd: 0)
+
+
+def test_save_removes_the_shards_of_submissions_not_graded_again(tmp_path):
+    directory = str(tmp_path / 'shards')
+    shards = ReportShards(directory)
+    for relPath in ['a.py', 'b.py']:
+        name = shards.shardName(relPath, '.html')
+        writeFiles(directory, {name: relPath})
+        shards.add(relPath, {'shard': name})
+    shards.save()
+
+    #a regrade keeps the other entries and shards
+    regrade = ReportShards(directory, True)
+    assert sorted(regrade.entries) == ['a.py', 'b.py']
+    regrade.add('a.py', {'shard': regrade.shardName('a.py', '.html'), 'title': 'again'})
+    regrade.save()
+    assert ReportShards(directory, True).entries['a.py']['title'] == 'again'
+    assert len(os.listdir(directory)) == 3
+
+    #a full run replaces the index
+    full = ReportShards(directory)
+    full.add('b.py', {'shard': full.shardName('b.py', '.html')})
+    full.save()
+    assert sorted(os.listdir(directory)) == sorted([ReportShards.INDEX_FILE, full.shardName('b.py', '.html')])
+
+
+def test_shard_names_are_unique_and_safe(tmp_path):
+    shards = ReportShards(str(tmp_path))
+    assert shards.shardName('a b/c.py', '.html').startswith('a_b_c.py_')
+    assert shards.shardName('a b/c.py', '.html') != shards.shardName('a_b/c.py', '.html')
+
+
+def gradeSharded(tmp_path, **options):
+    AutoGrader().processFiles([str(tmp_path / 'data' / 't1.txt')], str(tmp_path / 'class'), 'main.py', str(tmp_path / 'report.html'),
+        'Python', True, 10, sys.executable, 20, 'test', shardReport=True, **options)
+    with io.open(str(tmp_path / 'report.html'), encoding='utf-8') as f:
+        return f.read()
+
+
+def readShards(directory):
+    shards = {}
+    for name in os.listdir(directory):
+        with open(directory + '/' + name, 'rb') as f:
+            shards[name] = f.read()
+    return shards
+
+
+def test_regrade_rewrites_one_shard_and_keeps_the_others(tmp_path):
+    writeFiles(str(tmp_path / 'class'), PYTHON_SUBMISSIONS)
+    writeFiles(str(tmp_path / 'data'), {'t1.txt': '21\n'})
+    directory = str(tmp_path / 'report_shards')
+    index = gradeSharded(tmp_path)
+    assert '4 project(s) processed' in index
+    before = readShards(directory)
+
+    writeFiles(str(tmp_path / 'class'), {'alice_1_main.py': 'print("regraded")\n'})
+    index = gradeSharded(tmp_path, regrade=['alice'])
+    #the count covers the whole index, not only the regraded submission
+    assert '4 project(s) processed' in index
+    after = readShards(directory)
+    assert sorted(after) == sorted(before)
+
+    with open(directory + '/' + ReportShards.INDEX_FILE, 'rb') as f:
+        entries = json.loads(f.read().decode('utf-8'))['entries']
+    assert len(entries) == 4
+    alice = entries['alice_1_main.py']['shard']
+    assert b'regraded' in after[alice] and b'regraded' not in before[alice]
+    for name in after:
+        if name not in (alice, ReportShards.INDEX_FILE):
+            assert after[name] == before[name]
+    for entry in entries.values():
+        assert entry['shard'] in index